@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -7,8 +8,9 @@ from schools.views import SchoolListView, SchoolViewSet
 from classrooms.views import ClassroomViewSet
 from students.views import StudentViewSet
 from tags.views import TagViewSet
-from materials.views import DocumentViewSet
+from materials.views import DocumentViewSet, UploadSessionViewSet
 from terms.views import TermsViewSet
+from translations.views import TranslationJobViewSet, translate_view
 
 router = DefaultRouter()
 router.register(r'items', ItemViewSet)
@@ -16,9 +18,11 @@ router.register(r'users', UserViewSet)
 router.register(r'schools', SchoolViewSet, basename='schools')
 router.register(r'students', StudentViewSet, basename='students')
 router.register(r'classrooms', ClassroomViewSet, basename='classroom')
+router.register(r'materials/uploads', UploadSessionViewSet, basename='material-uploads')
 router.register(r'materials', DocumentViewSet, basename='materials')
 router.register(r'tags', TagViewSet, basename='tags')
 router.register(r'terms', TermsViewSet, basename='terms')
+router.register(r'translations/jobs', TranslationJobViewSet, basename='translation-jobs')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -36,3 +40,8 @@ urlpatterns = [
     path('classrooms/<int:pk>/delete/', ClassroomViewSet.as_view({'delete': 'destroy'})),
     path('students/by-classroom/', StudentViewSet.as_view({'get': 'by_classroom'})),
 ]
+
+if settings.TRANSLATION_ASYNC_VIEW:
+    # Translation runs as a native async view instead of on the thread that
+    # sync views share
+    urlpatterns.insert(0, path('materials/translate/', translate_view))
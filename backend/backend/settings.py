@@ -54,13 +54,50 @@ INSTALLED_APPS = [
     'users',
     'classrooms',
     'tags',
+    'common',
     'materials',
     'terms',
+    'translations',
 ]
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Store materials and terms files once per distinct content (see common.storage)
+MEDIA_DEDUPLICATE = True
+
+# Keep text-like files compressed at rest: 'auto' uses zstd when the
+# zstandard package is installed and gzip otherwise; None stores them as sent.
+# Compressed files are only decoded when served through Django (the
+# materials file/pdf endpoints, or MEDIA_URL under DEBUG), so enable it only
+# when the front server hands MEDIA_COMPRESS_EXTENSIONS files to Django
+MEDIA_COMPRESSION = None
+MEDIA_COMPRESS_EXTENSIONS = ['txt', 'md', 'tex']
+
+# Delegate file transfers to the front server: 'nginx' (X-Accel-Redirect to
+# MEDIA_SENDFILE_URL, an internal location aliased to MEDIA_ROOT) or 'apache'
+# (X-Sendfile). None streams the file from Django.
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_SENDFILE_URL = '/protected-media/'
+
+# Resumable chunked uploads (materials/uploads/): largest accepted file, and
+# how long an unfinished session is kept before clear_upload_sessions drops it
+MATERIALS_UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+MATERIALS_UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# Deleted files are queued and removed in batches (materials.media_gc), in the
+# background after each delete and by the sweep_media command. Reconciliation
+# leaves files younger than MEDIA_GC_GRACE_SECONDS alone.
+MEDIA_GC_SWEEP_AFTER_DELETE = True
+MEDIA_GC_BATCH_SIZE = 200
+MEDIA_GC_GRACE_SECONDS = 60 * 60
+
+# Hash, sniff and measure uploads while they are received (materials.upload_handlers)
+FILE_UPLOAD_HANDLERS = [
+    'materials.upload_handlers.IngestMemoryFileUploadHandler',
+    'materials.upload_handlers.IngestTemporaryFileUploadHandler',
+]
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -162,3 +199,103 @@ REST_FRAMEWORK = {
 AUTH_USER_MODEL = 'users.CustomUser'
 
 MAX_FILES_PER_CLASSROOM = 10
+
+# Post-upload processing of materials (hashing, type sniffing, text extraction)
+# runs on a background thread pool unless MATERIALS_PROCESSING_ASYNC is False
+MATERIALS_PROCESSING_ASYNC = True
+MATERIALS_PROCESSING_WORKERS = 2
+
+# PDF text extraction: selections of at least PDF_PARALLEL_MIN_PAGES pages are
+# split into PDF_PAGES_PER_TASK page batches and parsed on a process pool
+# (PDF_EXTRACTION_WORKERS processes, None means one per CPU)
+PDF_EXTRACTION_WORKERS = None
+PDF_PARALLEL_MIN_PAGES = 40
+PDF_PAGES_PER_TASK = 20
+
+# Batch text extraction: maximum materials per request and parser threads
+MATERIALS_BATCH_EXTRACTION_MAX = 50
+MATERIALS_BATCH_EXTRACTION_WORKERS = 4
+
+# Characters of extracted text kept in the full-text search index per material
+MATERIALS_SEARCH_MAX_CHARS = 200000
+
+# Passage retrieval for exam-maker prompts: approximate tokens per passage and
+# number of classroom BM25 indexes kept in memory per process
+MATERIALS_PASSAGE_TOKENS = 200
+MATERIALS_RETRIEVAL_CACHE_SIZE = 32
+
+# Translation results are cached per process in an LRU of at most
+# TRANSLATION_CACHE_MAX_BYTES and in the database for every worker
+TRANSLATION_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# googletrans runs on one long-lived client per process (see translations.client):
+# connection pool size, per-call timeout in seconds (for any backend) and an
+# optional base URL replacing Google's, e.g. a local stand-in server for benchmarks
+TRANSLATION_MAX_CONNECTIONS = 20
+TRANSLATION_TIMEOUT = 10
+TRANSLATION_SERVICE_URL = None
+
+# Serve api/materials/translate/ with the natively async translations.views.
+# translate_view instead of the DRF action; turn on when running under an ASGI
+# server (backend/asgi.py), where it awaits translations without holding a thread
+TRANSLATION_ASYNC_VIEW = False
+
+# Translation backend by name (translations.backends; 'standin' translates
+# offline, for CI and load tests) and an optional fallback used when it fails.
+# After TRANSLATION_BREAKER_FAILURES consecutive failures a backend is skipped
+# for TRANSLATION_BREAKER_RESET_TIMEOUT seconds before it is tried again
+TRANSLATION_BACKEND = 'googletrans'
+TRANSLATION_FALLBACK_BACKEND = None
+TRANSLATION_BREAKER_FAILURES = 5
+TRANSLATION_BREAKER_RESET_TIMEOUT = 30
+TRANSLATION_STANDIN_LATENCY = 0
+
+# Batch translation: maximum segments per request, maximum characters per
+# segment and upstream requests in flight per batch. Segments of a batch
+# request not translated within TRANSLATION_BATCH_TIMEOUT seconds in all are
+# reported as timed out, so one request cannot hold a worker much longer
+TRANSLATION_BATCH_MAX = 200
+TRANSLATION_SEGMENT_MAX_CHARS = 5000
+TRANSLATION_BATCH_CONCURRENCY = 8
+TRANSLATION_BATCH_TIMEOUT = 30
+
+# Whole-document translation jobs run on TRANSLATION_JOB_WORKERS background
+# threads (inline when TRANSLATION_JOBS_ASYNC is False), saving progress every
+# TRANSLATION_JOB_BATCH_SIZE segments. resume_translation_jobs retries jobs
+# that failed for a transient reason until they have run
+# TRANSLATION_JOB_MAX_ATTEMPTS times
+TRANSLATION_JOBS_ASYNC = True
+TRANSLATION_JOB_WORKERS = 2
+TRANSLATION_JOB_BATCH_SIZE = 50
+TRANSLATION_JOB_MAX_ATTEMPTS = 5
+
+# Translate texts of several sentences sentence by sentence, so sentences
+# already translated inside other texts come from the cache (translations.memory)
+TRANSLATION_MEMORY = True
+
+# Resolve src='auto' with the local detector (translations.detection) when it
+# is at least TRANSLATION_DETECTION_MIN_CONFIDENCE sure, and return texts
+# already in the destination language without translating them
+TRANSLATION_DETECTION = True
+TRANSLATION_DETECTION_MIN_CONFIDENCE = 0.9
+
+# Identical translations and extractions in flight at the same time run once
+# (common.singleflight): other threads wait for the running one. With
+# SINGLE_FLIGHT_CACHE set to the alias of a cache shared by all workers, such
+# as 'shared', other workers wait on a lease in it too, polling for the stored
+# result every SINGLE_FLIGHT_POLL_INTERVAL seconds. Leases expire after
+# SINGLE_FLIGHT_LEASE_TIMEOUT seconds in case their worker dies. The 'shared'
+# database cache needs "python manage.py createcachetable" before it is used;
+# with the default None calls are only coalesced within each process
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
+}
+SINGLE_FLIGHT_CACHE = None
+SINGLE_FLIGHT_LEASE_TIMEOUT = 120
+SINGLE_FLIGHT_POLL_INTERVAL = 0.1
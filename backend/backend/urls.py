@@ -15,10 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+from django.urls import path, include, re_path
 from rest_framework.authtoken.views import obtain_auth_token
 from django.conf import settings
-from django.conf.urls.static import static
+from materials.serving import media_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,4 +28,9 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Like the static view, but files kept compressed at rest are decoded or
+    # sent with Content-Encoding. Outside DEBUG, media URLs are not served by
+    # Django; use the permission-checked file endpoints of the API instead
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), media_view, name='media'),
+    ]
@@ -0,0 +1,98 @@
+"""
+Compression at rest for text-like media files.
+
+Files are recognised by their magic bytes rather than by name, so a stored
+file keeps its usual name and extension. Plain text never starts with these
+bytes (uploads are checked by validate_file_signature), and files written
+before compression was enabled are simply read as they are.
+"""
+import gzip
+import os
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_codec():
+    """The codec new files are written with, or None when compression is off."""
+    codec = getattr(settings, 'MEDIA_COMPRESSION', None)
+    if codec == 'auto':
+        return 'zstd' if zstandard is not None else 'gzip'
+    if codec == 'zstd' and zstandard is None:
+        return 'gzip'
+    return codec
+
+
+def is_compressible(name):
+    extension = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+    return extension in getattr(settings, 'MEDIA_COMPRESS_EXTENSIONS', [])
+
+
+def detect_codec(head):
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if head.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    return None
+
+
+def stored_codec(path):
+    """Codec a file on disk was compressed with, or None for a plain file."""
+    try:
+        with open(path, 'rb') as file_obj:
+            return detect_codec(file_obj.read(4))
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def compress_chunks(chunks, destination, codec):
+    """Write the compressed form of chunks to a binary file object."""
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstd compression needs the zstandard package')
+        writer = zstandard.ZstdCompressor(level=10).stream_writer(destination, closefd=False)
+    else:
+        # mtime=0 keeps the output identical for identical input, so
+        # compressed files still deduplicate
+        writer = gzip.GzipFile(fileobj=destination, mode='wb', compresslevel=6, mtime=0)
+    with writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+
+def open_original(path):
+    """Open a media file by path, decompressing it if it was stored compressed."""
+    codec = stored_codec(path)
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('Reading zstd files needs the zstandard package')
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+def iter_original_blocks(path, block_size=CHUNK_SIZE):
+    with open_original(path) as stream:
+        while True:
+            block = stream.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def original_size(path):
+    """Size of the original content of a media file, decompressing only if needed."""
+    codec = stored_codec(path)
+    if codec is None:
+        return os.path.getsize(path)
+    return sum(len(block) for block in iter_original_blocks(path))
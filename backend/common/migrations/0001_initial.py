@@ -0,0 +1,45 @@
+# Generated by Django 4.2.18 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('materials', '0018_move_stored_files_to_common'),
+    ]
+
+    # The tables were created by materials; this only takes over the models
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='StoredBlob',
+                    fields=[
+                        ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                        ('size', models.PositiveBigIntegerField()),
+                        ('ref_count', models.PositiveIntegerField(default=0)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        'db_table': 'materials_storedblob',
+                    },
+                ),
+                migrations.CreateModel(
+                    name='StoredFile',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('name', models.CharField(max_length=255, unique=True)),
+                        ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='files', to='common.storedblob')),
+                    ],
+                    options={
+                        'db_table': 'materials_storedfile',
+                    },
+                ),
+            ],
+            database_operations=[],
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class StoredBlob(models.Model):
+    """A distinct file content kept once by the content-addressed media storage."""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Created by the materials app before the storage was shared
+        db_table = 'materials_storedblob'
+
+    def __str__(self):
+        return self.sha256
+
+
+class StoredFile(models.Model):
+    """A storage name handed out for an upload, pointing at the blob holding its content."""
+    name = models.CharField(max_length=255, unique=True)
+    blob = models.ForeignKey(StoredBlob, on_delete=models.PROTECT, related_name='files')
+
+    class Meta:
+        db_table = 'materials_storedfile'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,163 @@
+"""
+Single-flight execution of identical concurrent calls.
+
+SingleFlight.do(key, fn, lookup) runs fn once for all the callers asking
+for the same key at the same time. Within a process, the first caller runs
+fn and the others wait for its result (or exception). Across workers, the
+caller running fn holds a lease in the SINGLE_FLIGHT_CACHE cache; callers
+in other workers poll lookup, which reads the store fn writes its result
+to (ExtractedText, CachedTranslation), until the result shows up. If the
+lease is released or expires first, they run fn themselves.
+
+Lease queries on a database cache run in a savepoint, so a failed one
+does not abort a transaction the caller is in (PostgreSQL refuses every
+later query of an aborted transaction).
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import router, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.remote_hits = 0
+
+    def _join(self, key):
+        """Return (future, leader): leader is True for the caller that has to run the call."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def _lease_cache(self):
+        alias = getattr(settings, 'SINGLE_FLIGHT_CACHE', None)
+        return caches[alias] if alias else None
+
+    def _savepoint(self, cache):
+        if not isinstance(cache, DatabaseCache):
+            return nullcontext()
+        return transaction.atomic(using=router.db_for_write(cache.cache_model_class))
+
+    def _acquire(self, cache, lease, token):
+        try:
+            with self._savepoint(cache):
+                return cache.add(lease, token, settings.SINGLE_FLIGHT_LEASE_TIMEOUT)
+        except Exception:
+            # Without the shared cache calls are still coalesced within the process
+            logger.warning('Single-flight cache unavailable, running %s without a lease', lease, exc_info=True)
+            return True
+
+    def _release(self, cache, lease, token):
+        try:
+            with self._savepoint(cache):
+                if cache.get(lease) == token:
+                    cache.delete(lease)
+        except Exception:
+            logger.warning('Could not release single-flight lease %s', lease, exc_info=True)
+
+    def _run_shared(self, key, fn, lookup):
+        cache = self._lease_cache()
+        if lookup is None or cache is None:
+            return fn()
+        lease, token = f'single-flight:{self.name}:{key}', uuid.uuid4().hex
+        while not self._acquire(cache, lease, token):
+            # Another worker is running the call
+            time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+            result = lookup()
+            if result is not None:
+                with self._lock:
+                    self.remote_hits += 1
+                return result
+        try:
+            # The previous holder may have stored its result just before releasing the lease
+            result = lookup()
+            return fn() if result is None else result
+        finally:
+            self._release(cache, lease, token)
+
+    async def _arun_shared(self, key, fn, lookup):
+        cache = self._lease_cache()
+        if lookup is None or cache is None:
+            return await fn()
+        lease, token = f'single-flight:{self.name}:{key}', uuid.uuid4().hex
+        while not await sync_to_async(self._acquire)(cache, lease, token):
+            await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+            result = await lookup()
+            if result is not None:
+                with self._lock:
+                    self.remote_hits += 1
+                return result
+        try:
+            result = await lookup()
+            return await fn() if result is None else result
+        finally:
+            await sync_to_async(self._release)(cache, lease, token)
+
+    def do(self, key, fn, lookup=None):
+        """
+        Return fn(), sharing one run among identical concurrent calls of key.
+        lookup() returns the stored result of a run in another worker, or
+        None while there is none; without it calls are only coalesced
+        within the process.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = self._run_shared(key, fn, lookup)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key, fn, lookup=None):
+        """do() for coroutine functions fn and lookup; waiting never blocks the event loop."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await self._arun_shared(key, fn, lookup)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'remote_hits': self.remote_hits,
+                'in_flight': len(self._calls),
+            }
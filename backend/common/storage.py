@@ -0,0 +1,211 @@
+"""
+Content-addressed storage for uploaded files.
+
+Every distinct file content is written once under blobs/<aa>/<bb>/<sha256>.
+Each upload still gets its own name (documents/syllabus.pdf, ...), which is a
+hard link to the blob, so paths, URLs and static serving keep working. The
+database keeps the name → blob mapping and a reference count per blob; the
+blob is removed when the last name pointing to it is deleted. Blobs are
+keyed by the digest of the original bytes, like Document.content_hash, even
+when they are stored compressed.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+
+from .compression import compress_chunks, get_codec, is_compressible, open_original
+
+BLOB_DIR = 'blobs'
+
+
+def blob_name_for(digest):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def link_or_copy(source, destination):
+    """Hard link source to destination, copying where links are not supported."""
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        raise
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def _save(self, name, content):
+        from .models import StoredBlob, StoredFile
+
+        blob_tmp_dir = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(blob_tmp_dir, exist_ok=True)
+
+        digest = getattr(content, 'sha256', None)
+        if digest and hasattr(content, 'temporary_file_path'):
+            # Already hashed on disk (chunked uploads): link it instead of copying
+            temp_path = os.path.join(blob_tmp_dir, uuid.uuid4().hex)
+            link_or_copy(content.temporary_file_path(), temp_path)
+            size = os.path.getsize(temp_path)
+        else:
+            temp_path, written_digest, size = self._write_hashed(content, blob_tmp_dir)
+            if digest is None:
+                digest = written_digest
+            # Compressed content carries the size of the original bytes
+            size = getattr(content, 'original_size', size)
+
+        try:
+            with transaction.atomic():
+                blob, _ = StoredBlob.objects.select_for_update().get_or_create(
+                    sha256=digest, defaults={'size': size}
+                )
+                blob_path = self.path(blob_name_for(digest))
+                if os.path.exists(blob_path):
+                    # Duplicate content: nothing new is written to disk
+                    os.unlink(temp_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(temp_path, blob_path)
+
+                name = self._link_available_name(name, blob_path)
+                StoredFile.objects.create(name=name, blob=blob)
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+        return name.replace('\\', '/')
+
+    def _write_hashed(self, content, directory):
+        # Hash while writing to a temporary file next to the blobs
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temp_file:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+                temp_file.write(chunk)
+        return temp_file.name, digest.hexdigest(), size
+
+    def _link_available_name(self, name, blob_path):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        while True:
+            try:
+                link_or_copy(blob_path, self.path(name))
+                return name
+            except FileExistsError:
+                # Another upload took the name in the meantime
+                name = self.get_available_name(name)
+
+    def delete(self, name):
+        from .models import StoredBlob, StoredFile
+
+        if not name:
+            raise ValueError('The name must be given to delete().')
+
+        # Files are only unlinked once the rows are gone for good, so a
+        # rolled back transaction never leaves rows pointing at missing files
+        with transaction.atomic():
+            reference = StoredFile.objects.select_for_update().filter(name=name).first()
+            transaction.on_commit(lambda: super(ContentAddressedStorage, self).delete(name))
+            if reference is None:
+                # Files stored before deduplication are plain files
+                return
+            reference.delete()
+            StoredBlob.objects.filter(pk=reference.blob_id).update(ref_count=F('ref_count') - 1)
+            blob = StoredBlob.objects.select_for_update().get(pk=reference.blob_id)
+            if blob.ref_count <= 0:
+                digest = blob.sha256
+                blob.delete()
+                transaction.on_commit(lambda: self._delete_orphan_blob(digest))
+
+    def _delete_orphan_blob(self, digest):
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            # The same content may have been stored again since the commit
+            if not StoredBlob.objects.select_for_update().filter(sha256=digest).exists():
+                super().delete(blob_name_for(digest))
+
+
+class OriginalFile(File):
+    """A stored file read through compression.open_original, reopened the same way."""
+
+    def __init__(self, path, name):
+        self.path = path
+        super().__init__(open_original(path), name=name)
+
+    def open(self, mode=None):
+        # Decompressing streams cannot always seek back, so start afresh
+        if not self.closed:
+            self.file.close()
+        self.file = open_original(self.path)
+        return self
+
+
+class CompressingStorageMixin:
+    """
+    Keep MEDIA_COMPRESS_EXTENSIONS files compressed on disk and hand back the
+    original bytes when they are opened. Paths still lead to the compressed
+    file; use compression.open_original to read those.
+    """
+
+    def _save(self, name, content):
+        codec = get_codec()
+        if codec and is_compressible(name):
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            digest = hashlib.sha256()
+            size = 0
+
+            def original_chunks():
+                nonlocal size
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+
+            compressed = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+            compress_chunks(original_chunks(), compressed, codec)
+            compressed.seek(0)
+            content = File(compressed, name=content.name)
+            # So content-addressed blobs stay keyed by the original bytes
+            content.sha256 = digest.hexdigest()
+            content.original_size = size
+        return super()._save(name, content)
+
+    def _open(self, name, mode='rb'):
+        if mode == 'rb':
+            return OriginalFile(self.path(name), name)
+        return super()._open(name, mode)
+
+
+class CompressedFileSystemStorage(CompressingStorageMixin, FileSystemStorage):
+    pass
+
+
+class CompressedContentAddressedStorage(CompressingStorageMixin, ContentAddressedStorage):
+    pass
+
+
+def select_media_storage():
+    """
+    Storage for materials and terms files: content-addressed when
+    MEDIA_DEDUPLICATE is on, compressing text-like files when
+    MEDIA_COMPRESSION is set.
+    """
+    if getattr(settings, 'MEDIA_DEDUPLICATE', False):
+        return CompressedContentAddressedStorage()
+    if getattr(settings, 'MEDIA_COMPRESSION', None):
+        return CompressedFileSystemStorage()
+    return default_storage
@@ -0,0 +1,22 @@
+"""Helpers for the test suites of the apps that store media files."""
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class TemporaryMediaMixin:
+    """
+    Run a test case against a MEDIA_ROOT of its own, removed with everything
+    in it once the case is done. Deleted files are only queued for the media
+    sweep, which TestCase never runs, so they would otherwise be left behind.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        super().setUpClass()
@@ -0,0 +1,323 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from common.compression import open_original
+from common.singleflight import SingleFlight
+
+from .extractors import (  # noqa: F401 (re-exported for callers of this module)
+    ExtractionError, UnsupportedFileType, get_extractor, is_supported, parse_page_ranges
+)
+from .structure import build_structure
+
+# Bump whenever the extraction output changes so stored artifacts get rebuilt
+EXTRACTOR_VERSION = 3
+
+extraction_flight = SingleFlight('extraction')
+
+
+def compute_file_hash(field_file):
+    """Return the SHA-256 hex digest of a stored file, read in chunks."""
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()
+
+
+def slice_pages(text, page_offsets, page_indexes):
+    bounds = page_offsets + [len(text)]
+    return "".join(text[bounds[index]:bounds[index + 1]] for index in page_indexes)
+
+
+def get_extension(name):
+    return name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+
+
+def _check_supported(name, pages=None):
+    """Return the extractor for a file name, checking it supports a page selection."""
+    extractor = get_extractor(get_extension(name))
+    if pages is not None and not extractor.PAGED:
+        raise UnsupportedFileType('Page selection is only supported for paged files such as PDF')
+    return extractor
+
+
+def iter_file_chunks(path, pages=None):
+    """
+    Yield the text of a file chunk by chunk, as produced by the extractor
+    registered for its extension (one page per chunk for paged formats).
+    """
+    return _check_supported(path, pages).iter_chunks(path, pages=pages)
+
+
+def collect_chunks(chunks, paged):
+    """Join chunks, returning the text and the offset of every chunk when paged."""
+    offsets = []
+    parts = []
+    position = 0
+    for chunk in chunks:
+        offsets.append(position)
+        parts.append(chunk)
+        position += len(chunk)
+    return "".join(parts), (offsets if paged else None)
+
+
+def _iter_extraction(extractor, path, blocks):
+    """
+    Yield the text chunks of a whole file. Extractors that know the layout
+    (iter_blocks) also fill blocks with their structure in the same pass.
+    """
+    if not hasattr(extractor, 'iter_blocks'):
+        yield from extractor.iter_chunks(path)
+        return
+    for chunk, block in extractor.iter_blocks(path):
+        blocks.append(block)
+        yield chunk
+
+
+def extract_file(path):
+    """
+    Extract a file, returning its text, page offsets (None for unpaged
+    formats) and its sections as built by materials.structure.
+    """
+    extractor = _check_supported(path)
+    blocks = []
+    text, page_offsets = collect_chunks(_iter_extraction(extractor, path, blocks), paged=extractor.PAGED)
+    structure = build_structure(get_extension(path), text, page_offsets, blocks=blocks or None)
+    return text, page_offsets, structure
+
+
+def extract_file_text(path, pages=None):
+    return "".join(iter_file_chunks(path, pages))
+
+
+def _ensure_content_hash(document):
+    from .models import Document
+
+    if not document.content_hash:
+        document.content_hash = compute_file_hash(document.file)
+        # Use update() so saving the hash does not go through Document.save
+        Document.objects.filter(pk=document.pk).update(content_hash=document.content_hash)
+
+
+def get_cached_extraction(document):
+    """Return the stored ExtractedText of a Document if it is still valid, else None."""
+    from .models import ExtractedText
+
+    _ensure_content_hash(document)
+    cached = ExtractedText.objects.filter(
+        document=document,
+        content_hash=document.content_hash,
+        extractor_version=EXTRACTOR_VERSION,
+    ).first()
+    if cached is None:
+        # Another upload of the same file may already have been extracted
+        duplicate = ExtractedText.objects.filter(
+            content_hash=document.content_hash,
+            extractor_version=EXTRACTOR_VERSION,
+        ).exclude(document=document).first()
+        if duplicate is not None:
+            cached = store_extraction(document, duplicate.text, duplicate.page_offsets, duplicate.structure)
+    return cached
+
+
+def store_extraction(document, text, page_offsets, structure=None):
+    from .models import ExtractedText
+
+    if structure is None:
+        structure = build_structure(get_extension(document.file.name), text, page_offsets)
+    extraction, _ = ExtractedText.objects.update_or_create(
+        document=document,
+        defaults={
+            'content_hash': document.content_hash,
+            'extractor_version': EXTRACTOR_VERSION,
+            'text': text,
+            'page_offsets': page_offsets,
+            'structure': structure,
+        }
+    )
+    return extraction
+
+
+def _get_or_extract(document):
+    cached = get_cached_extraction(document)
+    if cached is None:
+        # Requests for a file that is being parsed wait for that parse instead
+        # of starting their own, in this process or in another worker
+        cached = extraction_flight.do(
+            f'{document.content_hash}:{EXTRACTOR_VERSION}',
+            lambda: store_extraction(document, *extract_file(document.file.path)),
+            lookup=lambda: get_cached_extraction(document),
+        )
+    return cached
+
+
+def get_document_text(document, pages=None):
+    """
+    Return the extracted text of a Document, parsing the file only when there
+    is no stored artifact for the current file hash and extractor version.
+    A page selection such as "1-5,8" is served from the stored PDF pages.
+    """
+    _check_supported(document.file.name, pages)
+
+    cached = _get_or_extract(document)
+    if pages is None:
+        return cached.text
+    page_indexes = parse_page_ranges(pages, len(cached.page_offsets))
+    return slice_pages(cached.text, cached.page_offsets, page_indexes)
+
+
+def iter_document_chunks(document, pages=None):
+    """
+    Return an iterator over the text of a Document as it is parsed. Stored text
+    is replayed line by line (page by page for PDF); otherwise chunks come
+    straight from the extractor and the full text is stored once it finishes.
+
+    Checks run before the iterator is returned so callers can still report them.
+    """
+    extractor = _check_supported(document.file.name, pages)
+    cached = get_cached_extraction(document)
+
+    if cached is not None:
+        if cached.page_offsets is not None:
+            page_indexes = range(len(cached.page_offsets))
+            if pages is not None:
+                page_indexes = parse_page_ranges(pages, len(cached.page_offsets))
+            return (slice_pages(cached.text, cached.page_offsets, [index]) for index in page_indexes)
+        return iter(cached.text.splitlines(keepends=True))
+
+    path = document.file.path
+    if pages is not None:
+        # Partial selections are streamed without touching the stored text
+        return iter_file_chunks(path, pages)
+
+    def stream():
+        chunks = []
+        blocks = []
+        for chunk in _iter_extraction(extractor, path, blocks):
+            chunks.append(chunk)
+            yield chunk
+        text, page_offsets = collect_chunks(chunks, paged=extractor.PAGED)
+        structure = build_structure(get_extension(path), text, page_offsets, blocks=blocks or None)
+        store_extraction(document, text, page_offsets, structure)
+
+    return stream()
+
+
+def get_document_structure(document):
+    """Return the stored sections of a Document, extracting it first if needed."""
+    _check_supported(document.file.name)
+    return _get_or_extract(document).structure
+
+
+def get_legacy_docx_text(document):
+    """
+    Text of a DOCX in the format extract-text-from-url has always returned:
+    non-empty paragraphs (headings included) in order, then the non-empty
+    cells of every table, one per line. Built from the stored structure, so
+    the file is only parsed when it has no stored extraction.
+    """
+    paragraphs = []
+    cells = []
+    for section in get_document_structure(document):
+        if section['heading']:
+            paragraphs.append(section['heading'])
+        for block in section['blocks']:
+            if block['type'] == 'table':
+                cells.extend(cell for row in block['rows'] for cell in row if cell)
+            elif block['text']:
+                paragraphs.append(block['text'])
+    return '\n'.join(paragraphs + cells)
+
+
+def _hash_path(path):
+    digest = hashlib.sha256()
+    # Hash the original bytes, like compute_file_hash, even for compressed files
+    with open_original(path) as file_obj:
+        for chunk in iter(lambda: file_obj.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_documents_text(documents):
+    """
+    Return {document id: text or exception} for many Documents at once.
+
+    Stored extractions are looked up with a single query. Missing hashes and
+    uncached files are then handled on a bounded thread pool. Worker threads
+    only touch files, so all database writes stay on the calling thread.
+    """
+    from .models import Document, ExtractedText
+
+    results = {}
+    candidates = []
+    for document in documents:
+        try:
+            _check_supported(document.file.name)
+            candidates.append(document)
+        except UnsupportedFileType as e:
+            results[document.pk] = e
+
+    stored = {
+        extraction.document_id: extraction
+        for extraction in ExtractedText.objects.filter(
+            document__in=candidates,
+            extractor_version=EXTRACTOR_VERSION,
+        )
+    }
+
+    workers = getattr(settings, 'MATERIALS_BATCH_EXTRACTION_WORKERS', 4)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='materials-batch') as pool:
+        unhashed = [document for document in candidates if not document.content_hash]
+        hash_futures = [(document, pool.submit(_hash_path, document.file.path)) for document in unhashed]
+        for document, future in hash_futures:
+            try:
+                document.content_hash = future.result()
+            except Exception as e:
+                results[document.pk] = e
+                continue
+            Document.objects.filter(pk=document.pk).update(content_hash=document.content_hash)
+
+        missing = [
+            document for document in candidates
+            if document.pk not in results and (
+                document.pk not in stored or stored[document.pk].content_hash != document.content_hash
+            )
+        ]
+        # Identical files uploaded as other materials share their extraction
+        duplicates = {
+            extraction.content_hash: extraction
+            for extraction in ExtractedText.objects.filter(
+                content_hash__in={document.content_hash for document in missing},
+                extractor_version=EXTRACTOR_VERSION,
+            )
+        }
+
+        extract_futures = []
+        for document in candidates:
+            if document.pk in results:
+                continue
+            extraction = stored.get(document.pk)
+            duplicate = duplicates.get(document.content_hash)
+            if extraction is not None and extraction.content_hash == document.content_hash:
+                results[document.pk] = extraction.text
+            elif duplicate is not None:
+                store_extraction(document, duplicate.text, duplicate.page_offsets, duplicate.structure)
+                results[document.pk] = duplicate.text
+            else:
+                extract_futures.append((document, pool.submit(extract_file, document.file.path)))
+
+        for document, future in extract_futures:
+            try:
+                text, page_offsets, structure = future.result()
+            except Exception as e:
+                results[document.pk] = e
+                continue
+            store_extraction(document, text, page_offsets, structure)
+            results[document.pk] = text
+
+    return results
@@ -0,0 +1,57 @@
+"""
+Registry of text extractors by file extension.
+
+Each extractor is a module exposing ``iter_chunks(path, pages=None)``, a
+``PAGED`` flag telling whether ``pages`` selections are supported and,
+optionally, ``count_pages(path)`` and ``iter_blocks(path)``, which yields
+(text chunk, structure block) pairs for formats that carry headings and
+tables. Modules are only imported the first time a
+file of their type is extracted, so unused parsers are never loaded.
+"""
+from importlib import import_module
+
+from django.conf import settings
+
+from .base import ExtractionError, UnsupportedFileType, parse_page_ranges
+
+EXTRACTORS = {
+    'docx': 'materials.extractors.docx',
+    'pdf': 'materials.extractors.pdf',
+    'pptx': 'materials.extractors.pptx',
+    'txt': 'materials.extractors.text',
+    'md': 'materials.extractors.text',
+    'tex': 'materials.extractors.text',
+}
+
+_loaded = {}
+
+
+def get_extractors():
+    """Return the extension to module path mapping, including MATERIALS_EXTRACTORS overrides."""
+    return {**EXTRACTORS, **getattr(settings, 'MATERIALS_EXTRACTORS', {})}
+
+
+def register_extractor(extension, module_path):
+    EXTRACTORS[extension.lower()] = module_path
+    _loaded.pop(extension.lower(), None)
+
+
+def is_supported(extension):
+    return extension.lower() in get_extractors()
+
+
+def get_extractor(extension):
+    extension = extension.lower()
+    module_path = get_extractors().get(extension)
+    if module_path is None:
+        raise UnsupportedFileType(f'Text extraction is not supported for .{extension} files')
+    module = _loaded.get(extension)
+    if module is None or module.__name__ != module_path:
+        module = _loaded[extension] = import_module(module_path)
+    return module
+
+
+__all__ = [
+    'EXTRACTORS', 'ExtractionError', 'UnsupportedFileType', 'get_extractor', 'get_extractors',
+    'is_supported', 'parse_page_ranges', 'register_extractor',
+]
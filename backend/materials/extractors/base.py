@@ -0,0 +1,29 @@
+class ExtractionError(Exception):
+    pass
+
+
+class UnsupportedFileType(ExtractionError):
+    pass
+
+
+def parse_page_ranges(spec, page_count):
+    """
+    Turn a 1-based page selection such as "1-5,8" into sorted 0-based page
+    indexes. Raises ValueError when the selection is malformed or out of range.
+    """
+    indexes = set()
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            first, last = int(first), int(last)
+        else:
+            first = last = int(part)
+        if first < 1 or last < first or last > page_count:
+            raise ValueError(f'Invalid page range "{part}" for a document with {page_count} pages')
+        indexes.update(range(first - 1, last))
+    if not indexes:
+        raise ValueError('No pages selected')
+    return sorted(indexes)
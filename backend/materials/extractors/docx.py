@@ -0,0 +1,211 @@
+"""Streaming DOCX extraction straight from word/document.xml."""
+import re
+import zipfile
+from xml.etree import ElementTree
+
+from .base import ExtractionError
+
+PAGED = False
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+# Built-in heading style names, which Word keeps in English whatever the UI language
+HEADING_NAME = re.compile(r'(heading|title)\s*(\d)?')
+
+_RUN_TEXT = {
+    W_NS + 'tab': '\t',
+    W_NS + 'br': '\n',
+    W_NS + 'cr': '\n',
+    W_NS + 'noBreakHyphen': '-',
+}
+
+
+def _paragraph_text(paragraph):
+    parts = []
+    for elem in paragraph.iter():
+        if elem.tag == W_NS + 't':
+            parts.append(elem.text or '')
+        elif elem.tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[elem.tag])
+    return ''.join(parts)
+
+
+def _heading_level(name, outline_level):
+    if outline_level is not None and outline_level.isdigit() and int(outline_level) < 9:
+        return int(outline_level) + 1
+    match = HEADING_NAME.fullmatch((name or '').strip().lower())
+    if match:
+        return int(match.group(2)) if match.group(2) else 1
+    return None
+
+
+def heading_styles(archive):
+    """
+    Map paragraph style ids to heading levels using word/styles.xml. Style ids
+    are localised ("Ttulo1" in Spanish Word) but built-in style names are not,
+    and custom styles may declare an outline level or inherit one.
+    """
+    try:
+        root = ElementTree.fromstring(archive.read('word/styles.xml'))
+    except KeyError:
+        return {}
+    styles = {}
+    for style in root.iter(W_NS + 'style'):
+        if style.get(W_NS + 'type') != 'paragraph':
+            continue
+        name = style.find(W_NS + 'name')
+        based_on = style.find(W_NS + 'basedOn')
+        outline = style.find(f'{W_NS}pPr/{W_NS}outlineLvl')
+        styles[style.get(W_NS + 'styleId')] = (
+            _heading_level(
+                name.get(W_NS + 'val') if name is not None else None,
+                outline.get(W_NS + 'val') if outline is not None else None,
+            ),
+            based_on.get(W_NS + 'val') if based_on is not None else None,
+        )
+
+    levels = {}
+    for style_id in styles:
+        seen = set()
+        current = style_id
+        while current in styles and current not in seen:
+            seen.add(current)
+            level, parent = styles[current]
+            if level is not None:
+                levels[style_id] = level
+                break
+            current = parent
+    return levels
+
+
+def _paragraph_level(paragraph, levels):
+    properties = paragraph.find(W_NS + 'pPr')
+    if properties is None:
+        return None
+    outline = properties.find(W_NS + 'outlineLvl')
+    if outline is not None:
+        return _heading_level(None, outline.get(W_NS + 'val'))
+    style = properties.find(W_NS + 'pStyle')
+    if style is not None:
+        return levels.get(style.get(W_NS + 'val'))
+    return None
+
+
+def iter_docx_blocks(path):
+    """
+    Stream the body of a DOCX in document order, yielding ('heading', (level,
+    text)), ('paragraph', text) and ('table', rows) blocks, where rows is a
+    list of lists of cell texts.
+
+    word/document.xml is parsed incrementally straight from the zip and every
+    element is dropped once consumed, so memory does not grow with the document.
+    """
+    with zipfile.ZipFile(path) as archive:
+        levels = heading_styles(archive)
+        try:
+            stream = archive.open('word/document.xml')
+        except KeyError:
+            raise ExtractionError('Not a valid DOCX file: word/document.xml is missing')
+
+        with stream:
+            body = None
+            tables = []  # stack of open tables, each a list of rows
+            cells = []   # stack of open cells, each a list of paragraph texts
+            fallback_depth = 0
+
+            for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == W_NS + 'body':
+                        body = elem
+                    elif tag == MC_FALLBACK:
+                        # Fallback content duplicates the preferred alternate content
+                        fallback_depth += 1
+                    elif fallback_depth:
+                        continue
+                    elif tag == W_NS + 'tbl':
+                        tables.append([])
+                    elif tag == W_NS + 'tr':
+                        tables[-1].append([])
+                    elif tag == W_NS + 'tc':
+                        cells.append([])
+                    continue
+
+                if tag == MC_FALLBACK:
+                    fallback_depth -= 1
+                elif fallback_depth:
+                    pass
+                elif tag == W_NS + 'p':
+                    text = _paragraph_text(elem)
+                    level = _paragraph_level(elem, levels) if not cells and text else None
+                    # Clearing also keeps text boxes out of the enclosing paragraph
+                    elem.clear()
+                    if cells:
+                        cells[-1].append(text)
+                    elif level is not None:
+                        yield 'heading', (level, text)
+                    elif text:
+                        yield 'paragraph', text
+                elif tag == W_NS + 'tc':
+                    tables[-1][-1].append('\n'.join(cells.pop()))
+                elif tag == W_NS + 'tbl':
+                    rows = tables.pop()
+                    if cells:
+                        # Nested tables become extra lines of the enclosing cell
+                        cells[-1].extend(' '.join(row) for row in rows)
+                    else:
+                        yield 'table', rows
+
+                if body is not None and elem is not body and not tables and not cells:
+                    # Everything consumed so far is no longer needed
+                    body.clear()
+
+
+def render_block(kind, content):
+    if kind == 'paragraph':
+        return content + "\n"
+    if kind == 'heading':
+        return content[1] + "\n"
+    return "".join("".join(cell + " " for cell in row) + "\n" for row in content) + "\n"
+
+
+def render_blocks(blocks):
+    """Yield the plain-text rendering of extracted blocks, one chunk per block."""
+    for kind, content in blocks:
+        yield render_block(kind, content)
+
+
+def iter_docx_text(path):
+    return render_blocks(iter_docx_blocks(path))
+
+
+def iter_blocks(path):
+    """Yield (text chunk, structure block) pairs, for extraction with structure in one pass."""
+    for kind, content in iter_docx_blocks(path):
+        if kind == 'heading':
+            block = {'type': 'heading', 'level': content[0], 'text': content[1]}
+        elif kind == 'paragraph':
+            block = {'type': 'paragraph', 'text': content}
+        else:
+            block = {'type': 'table', 'rows': content}
+        yield render_block(kind, content), block
+
+
+def extract_docx_text(path):
+    return "".join(iter_docx_text(path))
+
+
+def iter_chunks(path, pages=None):
+    return iter_docx_text(path)
+
+
+def count_pages(path):
+    # Word stores the page count computed on last save in docProps/app.xml
+    with zipfile.ZipFile(path) as archive:
+        try:
+            app_xml = archive.read('docProps/app.xml').decode('utf-8', 'ignore')
+        except KeyError:
+            return None
+    match = re.search(r'<Pages>(\d+)</Pages>', app_xml)
+    return int(match.group(1)) if match else None
@@ -0,0 +1,84 @@
+"""PDF extraction with pdfplumber, parsed in page batches on a process pool."""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .base import parse_page_ranges
+
+PAGED = True
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn keeps the workers safe to start from threaded servers
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'PDF_EXTRACTION_WORKERS', None) or os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pdf_pool
+
+
+def _extract_pdf_page_batch(path, page_indexes):
+    # Runs inside the process pool, so it only receives picklable arguments
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[index].extract_text() or '' for index in page_indexes]
+
+
+def _split_batches(page_indexes, size):
+    return [page_indexes[i:i + size] for i in range(0, len(page_indexes), size)]
+
+
+def count_pages(path):
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pdf_pages(path, page_indexes=None):
+    """
+    Yield the text of each selected PDF page (every page by default) in order.
+    Large selections are split into page batches processed across the PDF pool,
+    and each batch is yielded as soon as it and the ones before it are done.
+    """
+    if page_indexes is None:
+        page_indexes = list(range(count_pages(path)))
+
+    batch_size = getattr(settings, 'PDF_PAGES_PER_TASK', 20)
+    if len(page_indexes) < getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 40):
+        yield from _extract_pdf_page_batch(path, page_indexes)
+        return
+
+    pool = _get_pdf_pool()
+    futures = [
+        pool.submit(_extract_pdf_page_batch, path, batch)
+        for batch in _split_batches(page_indexes, batch_size)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Stop queued batches when the consumer goes away early
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_pages(path, page_indexes=None):
+    return list(iter_pdf_pages(path, page_indexes))
+
+
+def iter_chunks(path, pages=None):
+    page_indexes = None
+    if pages is not None:
+        page_indexes = parse_page_ranges(pages, count_pages(path))
+    return (page + "\n" for page in iter_pdf_pages(path, page_indexes))
@@ -0,0 +1,71 @@
+"""Streaming PPTX extraction, one slide per chunk in presentation order."""
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree
+
+from .base import ExtractionError, parse_page_ranges
+
+# Slides behave as pages, so pages="2-4" selects slides
+PAGED = True
+
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+P_NS = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+R_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def slide_names(archive):
+    """Return the slide part names in the order the presentation shows them."""
+    try:
+        presentation = ElementTree.fromstring(archive.read('ppt/presentation.xml'))
+        relationships = ElementTree.fromstring(archive.read('ppt/_rels/presentation.xml.rels'))
+    except KeyError:
+        raise ExtractionError('Not a valid PPTX file: ppt/presentation.xml is missing')
+
+    targets = {
+        rel.get('Id'): posixpath.normpath(posixpath.join('ppt', rel.get('Target')))
+        for rel in relationships.iter(REL_NS + 'Relationship')
+    }
+    names = []
+    for slide_id in presentation.iter(P_NS + 'sldId'):
+        target = targets.get(slide_id.get(R_NS + 'id'))
+        if target:
+            names.append(target)
+    if not names:
+        # Fall back to numbering when the slide list is missing
+        names = sorted(
+            (name for name in archive.namelist() if re.fullmatch(r'ppt/slides/slide\d+\.xml', name)),
+            key=lambda name: int(re.search(r'(\d+)', name.rsplit('/', 1)[-1]).group(1)),
+        )
+    return names
+
+
+def _slide_text(stream):
+    paragraphs = []
+    for event, elem in ElementTree.iterparse(stream, events=('end',)):
+        if elem.tag == A_NS + 'p':
+            text = ''.join(
+                node.text or '' if node.tag == A_NS + 't' else '\n'
+                for node in elem.iter()
+                if node.tag in (A_NS + 't', A_NS + 'br')
+            )
+            if text:
+                paragraphs.append(text)
+            elem.clear()
+    return '\n'.join(paragraphs)
+
+
+def count_pages(path):
+    with zipfile.ZipFile(path) as archive:
+        return len(slide_names(archive))
+
+
+def iter_chunks(path, pages=None):
+    with zipfile.ZipFile(path) as archive:
+        names = slide_names(archive)
+        if pages is not None:
+            names = [names[index] for index in parse_page_ranges(pages, len(names))]
+        for name in names:
+            with archive.open(name) as stream:
+                yield _slide_text(stream) + '\n'
@@ -0,0 +1,122 @@
+"""
+Plain-text extraction (txt, md, tex) over a memory map with encoding
+detection. Files kept compressed at rest are streamed through the decompressor.
+
+The encoding is guessed from the first DETECT_SIZE bytes only, so the first
+line comes out without reading the whole file first; bytes further on that
+do not decode are replaced rather than failing the extraction.
+"""
+import codecs
+import mmap
+
+from common.compression import open_original, stored_codec
+
+PAGED = False
+
+BLOCK_SIZE = 1024 * 1024
+DETECT_SIZE = 64 * 1024
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+# Tried in order after UTF-8; latin-1 accepts any byte so it always succeeds
+FALLBACK_ENCODINGS = ['cp1252', 'latin-1']
+
+
+def _mapped_blocks(data, start):
+    for offset in range(start, len(data), BLOCK_SIZE):
+        yield data[offset:offset + BLOCK_SIZE]
+
+
+def _decompressed_blocks(path, start):
+    # Decompressing again is cheaper than keeping the whole text in memory
+    with open_original(path) as stream:
+        stream.read(start)
+        while True:
+            block = stream.read(BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+
+def _decodes_as(head, encoding, complete):
+    try:
+        # A character cut at the end of a prefix is not an error
+        codecs.getincrementaldecoder(encoding)().decode(head, final=complete)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _detect(head, complete):
+    """
+    Return (encoding, offset of the text after any byte order mark) for a
+    file starting with head; complete tells whether head is the whole file.
+    """
+    for bom, encoding in _BOMS:
+        if head[:len(bom)] == bom:
+            return encoding, len(bom)
+    for encoding in ['utf-8'] + FALLBACK_ENCODINGS:
+        if _decodes_as(head, encoding, complete):
+            return encoding, 0
+    return 'latin-1', 0
+
+
+def detect_encoding(data):
+    """Return (encoding, offset of the text after any byte order mark)."""
+    return _detect(data[:DETECT_SIZE], len(data) <= DETECT_SIZE)
+
+
+def _iter_lines(blocks, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    # Pieces of the line still being read, joined once it ends so that
+    # text without line breaks is not scanned again for every block
+    tail = []
+    for block in blocks:
+        lines = decoder.decode(block).splitlines(keepends=True)
+        if not lines:
+            continue
+        # The last line may continue in the next block, even after a lone "\r"
+        last = lines.pop() if not lines[-1].endswith('\n') else None
+        if lines:
+            if tail:
+                tail.append(lines.pop(0))
+                lines[:0] = ''.join(tail).splitlines(keepends=True)
+                tail = []
+            yield from lines
+        if last is not None:
+            tail.append(last)
+    tail.append(decoder.decode(b'', final=True))
+    yield from ''.join(tail).splitlines(keepends=True)
+
+
+def _normalized(lines):
+    for line in lines:
+        yield line.rstrip('\r\n') + '\n' if line.endswith(('\n', '\r')) else line
+
+
+def iter_chunks(path, pages=None):
+    """Yield the file line by line, normalising line endings to "\\n"."""
+    if stored_codec(path):
+        # Stored compressed: stream it through the decompressor instead of mapping it
+        with open_original(path) as stream:
+            head = stream.read(DETECT_SIZE)
+            complete = not stream.read(1)
+        encoding, start = _detect(head, complete)
+        yield from _normalized(_iter_lines(_decompressed_blocks(path, start), encoding))
+        return
+
+    with open(path, 'rb') as file_obj:
+        try:
+            data = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return
+        with data:
+            encoding, start = detect_encoding(data)
+            yield from _normalized(_iter_lines(_mapped_blocks(data, start), encoding))
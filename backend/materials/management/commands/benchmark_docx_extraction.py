@@ -0,0 +1,112 @@
+import collections
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from xml.sax.saxutils import escape
+
+import docx
+from django.core.management.base import BaseCommand
+
+from materials.extractors.docx import extract_docx_text, iter_docx_text
+
+PARAGRAPHS_PER_PAGE = 30
+TABLE_EVERY_PAGES = 5
+
+
+def python_docx_extract(path):
+    """The python-docx extraction loop the views used before the streaming engine."""
+    doc = docx.Document(path)
+    text = ""
+    for para in doc.paragraphs:
+        if para.text:
+            text += para.text + "\n"
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text += cell.text + " "
+            text += "\n"
+        text += "\n"
+    return text
+
+
+def consume_docx_chunks(path):
+    # Iterate without keeping the text, to show the parser's own footprint
+    collections.deque(iter_docx_text(path), maxlen=0)
+
+
+def build_document_xml(pages):
+    body = io.StringIO()
+    for page in range(pages):
+        for line in range(PARAGRAPHS_PER_PAGE):
+            sentence = escape(f'Page {page + 1}, paragraph {line + 1}: the quick brown fox jumps over the lazy dog.')
+            body.write(f'<w:p><w:r><w:t>{sentence}</w:t></w:r></w:p>')
+        if page % TABLE_EVERY_PAGES == 0:
+            body.write('<w:tbl>')
+            for row in range(4):
+                body.write('<w:tr>')
+                for column in range(3):
+                    body.write(f'<w:tc><w:p><w:r><w:t>Cell {row}.{column}</w:t></w:r></w:p></w:tc>')
+                body.write('</w:tr>')
+            body.write('</w:tbl>')
+        body.write('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body.getvalue()}<w:sectPr/></w:body></w:document>'
+    )
+
+
+def build_docx_file(pages, path):
+    # Start from a blank python-docx package and swap in a generated body
+    template = io.BytesIO()
+    docx.Document().save(template)
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            if item.filename == 'word/document.xml':
+                target.writestr(item, build_document_xml(pages))
+            else:
+                target.writestr(item, source.read(item.filename))
+
+
+def measure(extract, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract(path)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    extract(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the streaming DOCX extractor against the python-docx extraction loop.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--skip-python-docx', action='store_true',
+                            help='Only run the streaming extractor (python-docx is slow on large documents).')
+
+    def handle(self, *args, **options):
+        engines = [('stream-iter', consume_docx_chunks), ('streaming', extract_docx_text)]
+        if not options['skip_python_docx']:
+            engines.append(('python-docx', python_docx_extract))
+
+        self.stdout.write(f"{'pages':>6} {'size':>10} {'engine':>12} {'time (s)':>10} {'peak mem (MiB)':>15}")
+        with tempfile.TemporaryDirectory() as directory:
+            for pages in options['pages']:
+                path = os.path.join(directory, f'benchmark_{pages}.docx')
+                build_docx_file(pages, path)
+                size = os.path.getsize(path)
+                for name, extract in engines:
+                    seconds, peak = measure(extract, path, options['repeat'])
+                    self.stdout.write(
+                        f"{pages:>6} {size // 1024:>8}KB {name:>12} {seconds:>10.3f} {peak / 2 ** 20:>15.2f}"
+                    )
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from materials.models import UploadSession
+from materials.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that have not received data for MATERIALS_UPLOAD_SESSION_TTL seconds.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.MATERIALS_UPLOAD_SESSION_TTL)
+        cleared = 0
+        for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+            discard_upload(session)
+            cleared += 1
+        self.stdout.write(self.style.SUCCESS(f'Cleared {cleared} stale upload sessions.'))
@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from common.compression import open_original
+from common.models import StoredBlob, StoredFile
+from common.storage import ContentAddressedStorage, blob_name_for, link_or_copy
+from materials.models import Document
+from terms.models import Terms
+
+
+def hash_file(path):
+    """Digest and size of the original bytes of a stored file, compressed or not."""
+    digest = hashlib.sha256()
+    size = 0
+    with open_original(path) as file_obj:
+        for chunk in iter(lambda: file_obj.read(1024 * 1024), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class Command(BaseCommand):
+    help = ('Move existing materials and terms files into the content-addressed store, '
+            'replacing duplicates with hard links to a single blob.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without touching files.')
+
+    def stored_names(self):
+        yield from Document.objects.exclude(file='').values_list('file', flat=True).iterator()
+        for content, pdf_content in Terms.objects.values_list('content', 'pdf_content').iterator():
+            yield from (name for name in (content, pdf_content) if name)
+
+    def handle(self, *args, **options):
+        storage = ContentAddressedStorage()
+        dry_run = options['dry_run']
+        seen = set(StoredFile.objects.values_list('name', flat=True))
+        files = duplicates = saved = 0
+        digests = set()
+
+        for name in self.stored_names():
+            path = storage.path(name)
+            if name in seen or not os.path.isfile(path):
+                continue
+            seen.add(name)
+            files += 1
+            digest, size = hash_file(path)
+            blob_path = storage.path(blob_name_for(digest))
+
+            if digest in digests or os.path.exists(blob_path):
+                duplicates += 1
+                if not os.path.exists(blob_path) or not os.path.samefile(path, blob_path):
+                    saved += os.path.getsize(path)
+            digests.add(digest)
+            if dry_run:
+                continue
+
+            with transaction.atomic():
+                blob, _ = StoredBlob.objects.select_for_update().get_or_create(sha256=digest, defaults={'size': size})
+                if not os.path.exists(blob_path):
+                    # The existing file becomes the blob, no data is copied
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    link_or_copy(path, blob_path)
+                elif not os.path.samefile(path, blob_path):
+                    # Swap the duplicate for a link to the blob atomically
+                    temp_path = f'{path}.dedup'
+                    os.link(blob_path, temp_path)
+                    os.replace(temp_path, path)
+                StoredFile.objects.create(name=name, blob=blob)
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+        prefix = 'Would deduplicate' if dry_run else 'Deduplicated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {files} files: {duplicates} duplicates, {saved / 2 ** 20:.1f} MiB reclaimed.'
+        ))
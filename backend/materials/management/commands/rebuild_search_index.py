@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from materials.extraction import ExtractionError, get_document_text
+from materials.models import Document
+from materials.search import index_document
+
+
+class Command(BaseCommand):
+    help = 'Index every material in the full-text search index, e.g. after enabling search on existing data.'
+
+    def handle(self, *args, **options):
+        indexed = 0
+        for document in Document.objects.iterator(chunk_size=200):
+            try:
+                text = get_document_text(document)
+            except ExtractionError:
+                text = None
+            except Exception as e:
+                self.stderr.write(f'Could not extract document {document.pk}: {e}')
+                text = None
+            index_document(document, text)
+            indexed += 1
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} materials.'))
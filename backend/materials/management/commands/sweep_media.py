@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from materials.media_gc import reconcile_media, sweep_deleted_files
+
+
+class Command(BaseCommand):
+    help = 'Delete queued media files in batches; with --reconcile, first queue files no row refers to.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--reconcile', action='store_true',
+                            help='Scan the media directories for orphan files before sweeping.')
+        parser.add_argument('--grace-seconds', type=int, default=None,
+                            help='Leave files younger than this alone when reconciling.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report orphans found by --reconcile; delete nothing.')
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            orphans = reconcile_media(
+                batch_size=options['batch_size'], grace_seconds=options['grace_seconds'],
+                dry_run=options['dry_run'],
+            )
+            self.stdout.write(f'Found {orphans} orphan media files.')
+        if options['dry_run']:
+            return
+        deleted, failed = sweep_deleted_files(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} media files, {failed} failed.'))
@@ -0,0 +1,188 @@
+"""
+Deferred removal of media files.
+
+Deleting a Document or Terms row (directly or through a cascade) only
+records its files as PendingFileDeletion rows in the same transaction.
+The files are removed later in batches by sweep_deleted_files, either in
+the background after the transaction commits or from the sweep_media
+command. reconcile_media walks MEDIA_ROOT to find files no row refers to.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from common.storage import BLOB_DIR, select_media_storage
+
+logger = logging.getLogger(__name__)
+
+# Every model file field whose files live in the media storage
+MEDIA_FILE_FIELDS = [
+    ('materials.Document', 'file'),
+    ('terms.Terms', 'content'),
+    ('terms.Terms', 'pdf_content'),
+]
+
+# In-flight writes of the content-addressed storage, never reconciled
+SKIPPED_DIRS = {f'{BLOB_DIR}/tmp'}
+
+_sweep_scheduled = False
+_sweep_lock = threading.Lock()
+
+
+def enqueue_file_deletion(*names):
+    from .models import PendingFileDeletion
+
+    PendingFileDeletion.objects.bulk_create(
+        [PendingFileDeletion(name=name) for name in names if name],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(schedule_file_sweep)
+
+
+def referenced_names(names):
+    """Return the subset of storage names still used by a model row or blob reference."""
+    from common.models import StoredBlob
+
+    names = list(names)
+    found = set()
+    for model_label, field_name in MEDIA_FILE_FIELDS:
+        model = apps.get_model(model_label)
+        found.update(model.objects.filter(**{f'{field_name}__in': names}).values_list(field_name, flat=True))
+
+    digests = {name.rsplit('/', 1)[-1]: name for name in names if name.startswith(f'{BLOB_DIR}/')}
+    if digests:
+        # Blobs are referenced through their StoredFile names, counted on StoredBlob
+        live = StoredBlob.objects.filter(sha256__in=digests, ref_count__gt=0).values_list('sha256', flat=True)
+        found.update(digests[digest] for digest in live)
+    return found
+
+
+def sweep_deleted_files(batch_size=None):
+    """Delete queued files in batches. Returns (deleted, failed)."""
+    from .models import PendingFileDeletion
+
+    batch_size = batch_size or settings.MEDIA_GC_BATCH_SIZE
+    storage = select_media_storage()
+    deleted = failed = 0
+    last_id = 0
+    while True:
+        batch = list(PendingFileDeletion.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        in_use = referenced_names(pending.name for pending in batch)
+        for pending in batch:
+            try:
+                # A name handed out again since it was queued must be kept
+                if pending.name not in in_use:
+                    storage.delete(pending.name)
+                    deleted += 1
+                pending.delete()
+            except Exception as e:
+                logger.warning('Could not delete media file %s: %s', pending.name, e)
+                PendingFileDeletion.objects.filter(pk=pending.pk).update(
+                    attempts=pending.attempts + 1, last_error=str(e)[:255]
+                )
+                failed += 1
+    return deleted, failed
+
+
+def _run_sweep():
+    global _sweep_scheduled
+    with _sweep_lock:
+        _sweep_scheduled = False
+    try:
+        sweep_deleted_files()
+    except Exception:
+        logger.exception('Media sweep failed')
+    finally:
+        close_old_connections()
+
+
+def schedule_file_sweep():
+    """Run a sweep on the background workers, at most one queued at a time."""
+    global _sweep_scheduled
+    if not getattr(settings, 'MEDIA_GC_SWEEP_AFTER_DELETE', True):
+        return
+    with _sweep_lock:
+        if _sweep_scheduled:
+            return
+        _sweep_scheduled = True
+    from .processing import _get_executor
+
+    _get_executor().submit(_run_sweep)
+
+
+def managed_dirs():
+    """Top-level media directories written by MEDIA_FILE_FIELDS and the blob store."""
+    dirs = {BLOB_DIR}
+    for model_label, field_name in MEDIA_FILE_FIELDS:
+        upload_to = apps.get_model(model_label)._meta.get_field(field_name).upload_to
+        dirs.add(upload_to.strip('/').split('/')[0])
+    return sorted(dirs)
+
+
+def iter_media_files(root=None):
+    """
+    Yield (name, modified time) for every file in the managed media
+    directories, walking one directory at a time so memory stays bounded by
+    the tree depth rather than the number of files.
+    """
+    root = root or settings.MEDIA_ROOT
+    stack = managed_dirs()
+    while stack:
+        relative = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, relative))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = f'{relative}/{entry.name}'
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in SKIPPED_DIRS:
+                        stack.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry.stat(follow_symlinks=False).st_mtime
+
+
+def reconcile_media(batch_size=None, grace_seconds=None, dry_run=False):
+    """
+    Queue every media file that no row refers to. Files younger than the
+    grace period are skipped, as they may belong to an upload whose row is
+    not committed yet. Returns the number of orphans found.
+    """
+    batch_size = batch_size or settings.MEDIA_GC_BATCH_SIZE
+    if grace_seconds is None:
+        grace_seconds = settings.MEDIA_GC_GRACE_SECONDS
+    cutoff = time.time() - grace_seconds
+    orphans = 0
+
+    def flush(batch):
+        in_use = referenced_names(batch)
+        found = [name for name in batch if name not in in_use]
+        if found and not dry_run:
+            from .models import PendingFileDeletion
+
+            PendingFileDeletion.objects.bulk_create(
+                [PendingFileDeletion(name=name) for name in found], ignore_conflicts=True
+            )
+        return found
+
+    batch = []
+    for name, modified in iter_media_files():
+        if modified > cutoff:
+            continue
+        batch.append(name)
+        if len(batch) >= batch_size:
+            orphans += len(flush(batch))
+            batch = []
+    if batch:
+        orphans += len(flush(batch))
+    return orphans
+
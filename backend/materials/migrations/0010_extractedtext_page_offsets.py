@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0009_document_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedtext',
+            name='page_offsets',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
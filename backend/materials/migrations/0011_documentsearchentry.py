@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-18 07:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0010_extractedtext_page_offsets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSearchEntry',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='materials.document')),
+                ('name', models.CharField(max_length=30)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE materials_documentsearchentry ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(body, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX materials_documentsearchentry_vector_idx
+    ON materials_documentsearchentry USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS materials_documentsearchentry_vector_idx",
+    "ALTER TABLE materials_documentsearchentry DROP COLUMN IF EXISTS search_vector",
+]
+
+# External-content FTS5 table: the text lives in materials_documentsearchentry
+# and the triggers keep the index in step with every insert, update and delete
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE materials_documentsearchentry_fts USING fts5(
+        name, body,
+        content='materials_documentsearchentry', content_rowid='document_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER materials_documentsearchentry_ai AFTER INSERT ON materials_documentsearchentry BEGIN
+        INSERT INTO materials_documentsearchentry_fts(rowid, name, body)
+        VALUES (new.document_id, new.name, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER materials_documentsearchentry_ad AFTER DELETE ON materials_documentsearchentry BEGIN
+        INSERT INTO materials_documentsearchentry_fts(materials_documentsearchentry_fts, rowid, name, body)
+        VALUES ('delete', old.document_id, old.name, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER materials_documentsearchentry_au AFTER UPDATE ON materials_documentsearchentry BEGIN
+        INSERT INTO materials_documentsearchentry_fts(materials_documentsearchentry_fts, rowid, name, body)
+        VALUES ('delete', old.document_id, old.name, old.body);
+        INSERT INTO materials_documentsearchentry_fts(rowid, name, body)
+        VALUES (new.document_id, new.name, new.body);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS materials_documentsearchentry_au",
+    "DROP TRIGGER IF EXISTS materials_documentsearchentry_ad",
+    "DROP TRIGGER IF EXISTS materials_documentsearchentry_ai",
+    "DROP TABLE IF EXISTS materials_documentsearchentry_fts",
+]
+
+
+def run_for_vendor(postgres_statements, sqlite_statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        statements = {'postgresql': postgres_statements, 'sqlite': sqlite_statements}.get(vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0011_documentsearchentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
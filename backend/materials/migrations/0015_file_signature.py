@@ -0,0 +1,21 @@
+# Generated by Django 4.2.18 on 2026-10-18 07:27
+
+import django.core.validators
+from django.db import migrations, models
+import common.filetypes
+import common.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0014_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(storage=common.storage.select_media_storage, upload_to='documents/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'png', 'jpg', 'pptx', 'txt', 'md', 'tex']), common.filetypes.validate_file_signature]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-18 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0016_pendingfiledeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedtext',
+            name='structure',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
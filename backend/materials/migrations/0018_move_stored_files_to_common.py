@@ -0,0 +1,25 @@
+# Generated by Django 4.2.18 on 2026-10-18 12:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0017_extractedtext_structure'),
+    ]
+
+    # The tables stay; common.0001_initial takes the models over
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(
+                    name='StoredFile',
+                ),
+                migrations.DeleteModel(
+                    name='StoredBlob',
+                ),
+            ],
+            database_operations=[],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0018_move_stored_files_to_common'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='receiving_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -3,6 +3,9 @@ from django.core.validators import FileExtensionValidator
 from django.core.exceptions import ValidationError
 from django.conf import settings
 import os
+import uuid
+from common.filetypes import validate_file_signature
+from common.storage import select_media_storage
 
 
 def validate_file_limit(classroom):
@@ -11,11 +14,24 @@ def validate_file_limit(classroom):
 
 
 class Document(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    READY = 'ready'
+    FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+
     name = models.CharField(max_length=30)
     file = models.FileField(
         upload_to='documents/',
+        storage=select_media_storage,
         validators=[
             FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'png', 'jpg', 'pptx', 'txt', 'md', 'tex']),
+            validate_file_signature,
         ]
     )
     classroom = models.ForeignKey(
@@ -26,6 +42,21 @@ class Document(models.Model):
 
     tags = models.ManyToManyField('tags.Tag', related_name='documents', blank=True)
 
+    # SHA-256 of the stored file, filled lazily and cleared when the file is replaced
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    # Filled in by the background processing pipeline after upload
+    processing_status = models.CharField(
+        max_length=20, choices=PROCESSING_STATUS_CHOICES, default=PENDING, editable=False
+    )
+    processing_stage = models.CharField(max_length=20, blank=True, editable=False)
+    processing_error = models.CharField(max_length=255, blank=True, editable=False)
+    processed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    mime_type = models.CharField(max_length=127, blank=True, editable=False)
+    size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    page_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
     def __str__(self):
         return self.name
 
@@ -36,11 +67,95 @@ class Document(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
+        # A freshly assigned upload is not committed to storage yet
+        file_replaced = bool(self.file) and not self.file._committed
+        if file_replaced:
+            # Uploads that were inspected while being received carry their digest and type
+            self.content_hash = getattr(self.file.file, 'sha256', '')
+            self.mime_type = getattr(self.file.file, 'sniffed_type', '')
+            self.processing_status = self.PENDING
+        is_update = self.pk is not None
+        old_name = None
+        if file_replaced and is_update:
+            old_name = Document.objects.filter(pk=self.pk).values_list('file', flat=True).first()
         super().save(*args, **kwargs)
+        if file_replaced and is_update:
+            ExtractedText.objects.filter(document=self).delete()
+            if old_name:
+                # The replaced file is removed by the media sweep
+                from .media_gc import enqueue_file_deletion
+                enqueue_file_deletion(old_name)
+
+
+class ExtractedText(models.Model):
+    """Stored text extraction of a Document, valid for one file hash and extractor version."""
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='extracted_text',
+    )
+    content_hash = models.CharField(max_length=64)
+    extractor_version = models.PositiveIntegerField()
+    text = models.TextField()
+    # Start offset of every page in text, for paged formats such as PDF
+    page_offsets = models.JSONField(null=True, blank=True)
+    # Sections with headings, paragraphs and tables, see materials.structure
+    structure = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Extracted text of {self.document}'
+
 
-    def delete(self, *args, **kwargs):
-        # Delete the file from filesystem when model is deleted
-        if self.file:
-            if os.path.isfile(self.file.path):
-                os.remove(self.file.path)
-        super().delete(*args, **kwargs)
+class DocumentSearchEntry(models.Model):
+    """
+    Searchable copy of a Document's name and text. The full-text index on top
+    of this table is database specific: a generated tsvector column with a GIN
+    index on PostgreSQL and an FTS5 table kept in sync by triggers on SQLite.
+    """
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_entry',
+    )
+    name = models.CharField(max_length=30)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Search entry of {self.document}'
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload of a material, turned into a Document once complete."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    classroom = models.ForeignKey('classrooms.Classroom', on_delete=models.CASCADE, related_name='upload_sessions')
+    name = models.CharField(max_length=30)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Bytes received so far; chunks must be sent in order starting here
+    offset = models.PositiveBigIntegerField(default=0)
+    # Set while a chunk is being written, so only one chunk is received at a time
+    receiving_since = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Upload of {self.filename} ({self.offset}/{self.size})'
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.MEDIA_ROOT, 'uploads', f'{self.id}.part')
+
+
+class PendingFileDeletion(models.Model):
+    """A media file whose row is gone, waiting for the media sweep to remove it."""
+    name = models.CharField(max_length=255, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
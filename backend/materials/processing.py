@@ -0,0 +1,148 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from common.compression import original_size
+from common.filetypes import sniff_file
+
+from .extraction import UnsupportedFileType, compute_file_hash, get_document_text, get_extractor, is_supported
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MATERIALS_PROCESSING_WORKERS', 2),
+                thread_name_prefix='materials-processing',
+            )
+        return _executor
+
+
+MIME_EXTENSIONS = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'pptx',
+}
+
+
+def count_pages(document, mime_type):
+    """Ask the extractor of the sniffed type for a page (or slide) count, if it has one."""
+    extension = MIME_EXTENSIONS.get(mime_type)
+    if extension is None or not is_supported(extension):
+        return None
+    extractor = get_extractor(extension)
+    if not hasattr(extractor, 'count_pages'):
+        return None
+    return extractor.count_pages(document.file.path)
+
+
+# Each stage receives the document and the state shared across stages
+
+def hash_stage(document, state):
+    if not document.content_hash:
+        document.content_hash = compute_file_hash(document.file)
+    return {'content_hash': document.content_hash}
+
+
+def sniff_stage(document, state):
+    if document.mime_type:
+        # Already sniffed by the upload handlers while the file was received
+        return {'mime_type': document.mime_type}
+    with document.file.open('rb') as file_obj:
+        mime_type = sniff_file(file_obj, document.file.name)
+    return {'mime_type': mime_type}
+
+
+def extract_stage(document, state):
+    try:
+        state['text'] = get_document_text(document)
+    except UnsupportedFileType:
+        state['text'] = None
+    return {}
+
+
+def metadata_stage(document, state):
+    text = state.get('text')
+    return {
+        'size': original_size(document.file.path),
+        'word_count': len(text.split()) if text is not None else None,
+        'page_count': count_pages(document, state['mime_type']),
+    }
+
+
+def index_stage(document, state):
+    from .search import index_document
+
+    index_document(document, state.get('text'))
+    return {}
+
+
+PROCESSING_STAGES = [
+    ('hash', hash_stage),
+    ('sniff', sniff_stage),
+    ('extract', extract_stage),
+    ('metadata', metadata_stage),
+    ('index', index_stage),
+]
+
+
+def process_document(document_id):
+    """Run every processing stage for a Document, recording progress as it goes."""
+    from .models import Document
+
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None:
+        return
+
+    Document.objects.filter(pk=document_id).update(
+        processing_status=Document.PROCESSING, processing_error='',
+    )
+    state = {}
+    stage_name = None
+    try:
+        for stage_name, stage in PROCESSING_STAGES:
+            Document.objects.filter(pk=document_id).update(processing_stage=stage_name)
+            updates = stage(document, state)
+            state.update(updates)
+            if updates:
+                # update() keeps the pipeline away from Document.save and its checks
+                Document.objects.filter(pk=document_id).update(**updates)
+    except Exception as e:
+        logger.exception('Processing of document %s failed at stage %s', document_id, stage_name)
+        Document.objects.filter(pk=document_id).update(
+            processing_status=Document.FAILED,
+            processing_error=f'{stage_name}: {e}'[:255],
+        )
+        return
+
+    Document.objects.filter(pk=document_id).update(
+        processing_status=Document.READY,
+        processing_stage='',
+        processed_at=timezone.now(),
+    )
+
+
+def _run_in_background(document_id):
+    try:
+        process_document(document_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_document_processing(document):
+    """Queue the processing pipeline for a Document once the current transaction commits."""
+    document_id = document.pk
+    if getattr(settings, 'MATERIALS_PROCESSING_ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_background, document_id))
+    else:
+        transaction.on_commit(lambda: process_document(document_id))
@@ -0,0 +1,173 @@
+"""
+BM25 passage retrieval over the extracted text of a classroom's materials,
+used to build exam-maker prompts that fit a token budget.
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+
+from .extraction import get_documents_text
+from .structure import estimate_tokens
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante e el ella ellas
+ellos en entre era es esa ese eso esta este esto estos hay la las le les lo los mas me mi muy no nos o os
+para pero por que se sea ser si sin sobre son su sus tambien te tiene todo tu un una uno unos y ya
+an and are as at be been but by for from has have he her his i if in into is it its me my not of on or our
+she so than that the their them then there these they this to was we were what when which who will with
+you your
+""".split())
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercase, accent-insensitive terms without stopwords or one-letter words."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [word for word in _WORD.findall(text) if len(word) > 1 and word not in STOPWORDS]
+
+
+def split_passages(text, target_tokens):
+    """
+    Split text into passages of roughly target_tokens, keeping paragraphs
+    together where possible and cutting overlong paragraphs at word boundaries.
+    """
+    target_chars = target_tokens * 4
+    passages = []
+    current = []
+    current_length = 0
+
+    def flush():
+        nonlocal current, current_length
+        if current:
+            passages.append('\n'.join(current))
+        current = []
+        current_length = 0
+
+    for paragraph in text.splitlines():
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > target_chars:
+            cut = paragraph.rfind(' ', 0, target_chars)
+            cut = cut if cut > 0 else target_chars
+            flush()
+            passages.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if current_length + len(paragraph) > target_chars:
+            flush()
+        current.append(paragraph)
+        current_length += len(paragraph) + 1
+    flush()
+    return passages
+
+
+class PassageIndex:
+    """An in-memory BM25 inverted index over the passages of some documents."""
+
+    def __init__(self, documents, passage_tokens):
+        self.passages = []
+        self.postings = defaultdict(list)
+        lengths = []
+        for document_id, name, text in documents:
+            for passage in split_passages(text, passage_tokens):
+                terms = Counter(tokenize(passage))
+                index = len(self.passages)
+                self.passages.append({
+                    'material_id': document_id,
+                    'name': name,
+                    'text': passage,
+                    # Cost in the prompt, including the header and separator build_context adds
+                    'tokens': estimate_tokens(f'[{name}]\n{passage}\n\n'),
+                })
+                lengths.append(sum(terms.values()))
+                for term, frequency in terms.items():
+                    self.postings[term].append((index, frequency))
+        self.lengths = lengths
+        self.average_length = (sum(lengths) / len(lengths)) if lengths else 0
+
+    def search(self, query, material_ids=None):
+        """Return (score, passage index) pairs for passages matching query, best first."""
+        count = len(self.passages)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, frequency in postings:
+                length_norm = 1 - BM25_B + BM25_B * self.lengths[index] / self.average_length
+                scores[index] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+        ranked = sorted(((score, index) for index, score in scores.items()), key=lambda item: (-item[0], item[1]))
+        if material_ids is not None:
+            ranked = [item for item in ranked if self.passages[item[1]]['material_id'] in material_ids]
+        return ranked
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_classroom_index(classroom):
+    """
+    Return the passage index of a classroom, rebuilding it only when its set
+    of materials or their file hashes changed since it was built.
+    """
+    from .models import Document
+
+    documents = list(Document.objects.filter(classroom=classroom).order_by('id'))
+    fingerprint = tuple((document.id, document.content_hash) for document in documents)
+    with _indexes_lock:
+        cached = _indexes.get(classroom.pk)
+        if cached is not None and cached[0] == fingerprint:
+            _indexes.move_to_end(classroom.pk)
+            return cached[1]
+
+    texts = get_documents_text(documents)
+    index = PassageIndex(
+        [
+            (document.id, document.name, texts[document.id])
+            for document in documents
+            if isinstance(texts.get(document.id), str)
+        ],
+        getattr(settings, 'MATERIALS_PASSAGE_TOKENS', 200),
+    )
+    # Hashes computed while extracting are part of the fingerprint from now on
+    fingerprint = tuple((document.id, document.content_hash) for document in documents)
+    with _indexes_lock:
+        _indexes[classroom.pk] = (fingerprint, index)
+        _indexes.move_to_end(classroom.pk)
+        while len(_indexes) > getattr(settings, 'MATERIALS_RETRIEVAL_CACHE_SIZE', 32):
+            _indexes.popitem(last=False)
+    return index
+
+
+def build_context(classroom, query, token_budget, material_ids=None):
+    """
+    Pick the best passages for query that fit in token_budget. Passages are
+    chosen by score and returned grouped by material in reading order.
+    """
+    index = get_classroom_index(classroom)
+    selected = []
+    used = 0
+    for score, passage_index in index.search(query, material_ids):
+        passage = index.passages[passage_index]
+        if used + passage['tokens'] > token_budget:
+            continue
+        selected.append((passage_index, score))
+        used += passage['tokens']
+        if token_budget - used < 1:
+            break
+
+    selected.sort()
+    passages = [dict(index.passages[passage_index], score=round(score, 4)) for passage_index, score in selected]
+    context = '\n\n'.join(f"[{passage['name']}]\n{passage['text']}" for passage in passages)
+    return {'context': context, 'passages': passages, 'tokens_used': used, 'token_budget': token_budget}
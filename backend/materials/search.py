@@ -0,0 +1,112 @@
+import html
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import DocumentSearchEntry
+
+# The database marks matches with these control characters, which are
+# stripped from indexed text, and they become <mark> tags once the snippet
+# has been escaped: snippets carry uploaded text and may be rendered as HTML
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+HEADLINE_OPTIONS = f'MaxFragments=2, MaxWords=20, MinWords=8, StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_STOP}"'
+
+# Snippets are highlighted with the configuration the body matched in
+POSTGRES_SEARCH = """
+    SELECT ranked.document_id, ranked.name, ranked.classroom_id, ranked.rank,
+           CASE WHEN to_tsvector('spanish', ranked.body) @@ ranked.spanish_query
+                THEN ts_headline('spanish', ranked.body, ranked.spanish_query, %s)
+                ELSE ts_headline('english', ranked.body, ranked.english_query, %s)
+           END
+    FROM (
+        SELECT entry.document_id, entry.name, entry.body, document.classroom_id,
+               query.spanish_query, query.english_query,
+               ts_rank_cd(entry.search_vector, query.spanish_query || query.english_query) AS rank
+        FROM materials_documentsearchentry entry
+        JOIN materials_document document ON document.id = entry.document_id
+        JOIN classrooms_classroom classroom ON classroom.id = document.classroom_id,
+             (SELECT websearch_to_tsquery('spanish', %s) AS spanish_query,
+                     websearch_to_tsquery('english', %s) AS english_query) query
+        WHERE classroom.creator_id = %s AND entry.search_vector @@ (query.spanish_query || query.english_query)
+              {classroom_filter}
+        ORDER BY rank DESC, entry.document_id
+        LIMIT %s OFFSET %s
+    ) ranked
+    ORDER BY ranked.rank DESC, ranked.document_id
+"""
+
+SQLITE_SEARCH = """
+    SELECT entry.document_id, entry.name, document.classroom_id,
+           -bm25(materials_documentsearchentry_fts, 10.0, 1.0) AS rank,
+           snippet(materials_documentsearchentry_fts, 1, %s, %s, '…', 16)
+    FROM materials_documentsearchentry_fts
+    JOIN materials_documentsearchentry entry ON entry.document_id = materials_documentsearchentry_fts.rowid
+    JOIN materials_document document ON document.id = entry.document_id
+    JOIN classrooms_classroom classroom ON classroom.id = document.classroom_id
+    WHERE materials_documentsearchentry_fts MATCH %s AND classroom.creator_id = %s {classroom_filter}
+    ORDER BY rank DESC, entry.document_id
+    LIMIT %s OFFSET %s
+"""
+
+
+def index_document(document, text):
+    """Add or refresh the search entry of a Document; the database index follows the row."""
+    max_chars = getattr(settings, 'MATERIALS_SEARCH_MAX_CHARS', 200000)
+    body = (text or '')[:max_chars].replace(HIGHLIGHT_START, '').replace(HIGHLIGHT_STOP, '')
+    DocumentSearchEntry.objects.update_or_create(
+        document=document,
+        defaults={'name': document.name, 'body': body},
+    )
+
+
+def remove_document(document_id):
+    DocumentSearchEntry.objects.filter(document_id=document_id).delete()
+
+
+def _fts5_query(query):
+    # Quote every word so user input cannot use FTS5 query syntax
+    terms = re.findall(r'\w+', query)
+    return ' '.join('"{}"'.format(term) for term in terms)
+
+
+def _highlight(snippet):
+    """HTML-escape a snippet, then turn the highlight markers into <mark> tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+
+def search_documents(user, query, classroom_id=None, limit=20, offset=0):
+    """
+    Return the materials of user's classrooms matching query, best first, as
+    dicts with id, name, classroom, rank and a snippet: HTML-escaped text
+    with matches in <mark> tags.
+    """
+    vendor = connection.vendor
+    classroom_filter = 'AND document.classroom_id = %s' if classroom_id is not None else ''
+    classroom_params = [classroom_id] if classroom_id is not None else []
+
+    if vendor == 'postgresql':
+        sql = POSTGRES_SEARCH.format(classroom_filter=classroom_filter)
+        params = [HEADLINE_OPTIONS, HEADLINE_OPTIONS, query, query, user.id] + classroom_params + [limit, offset]
+    elif vendor == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return []
+        sql = SQLITE_SEARCH.format(classroom_filter=classroom_filter)
+        params = [HIGHLIGHT_START, HIGHLIGHT_STOP, match, user.id] + classroom_params + [limit, offset]
+    else:
+        raise NotImplementedError(f'Full-text search is not available on {vendor}')
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {'id': document_id, 'name': name, 'classroom': classroom, 'rank': float(rank),
+         'snippet': _highlight(snippet)}
+        for document_id, name, classroom, rank, snippet in rows
+    ]
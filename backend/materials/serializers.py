@@ -1,8 +1,13 @@
-from .models import Document
+from .models import Document, UploadSession
+from django.conf import settings
+from django.core.validators import FileExtensionValidator
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import File
 from rest_framework import serializers
 from tags.serializers import TagSerializer
 from rest_framework.exceptions import ValidationError
 from tags.models import Tag
+from .upload_handlers import oversized_uploads, too_large_message
 
 
 class DocumentSerializer(serializers.ModelSerializer):
@@ -11,7 +16,15 @@ class DocumentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Document
-        fields = ['id', 'name', 'file', 'classroom', 'tags', 'tag_ids']
+        fields = ['id', 'name', 'file', 'classroom', 'tags', 'tag_ids', 'processing_status']
+        read_only_fields = ['processing_status']
+
+    def to_internal_value(self, data):
+        request = self.context.get('request')
+        if request is not None and any(field == 'file' for field, _ in oversized_uploads(request)):
+            # The upload handlers dropped it, so it would otherwise be reported as missing
+            raise ValidationError({'file': [too_large_message()]})
+        return super().to_internal_value(data)
 
     def create(self, validated_data):
         tag_ids = validated_data.pop('tag_ids', [])
@@ -34,3 +47,35 @@ class DocumentSerializer(serializers.ModelSerializer):
         if tag_ids is not None:
             instance.tags.set(tag_ids)
         return super().update(instance, validated_data)
+
+
+class DocumentProcessingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Document
+        fields = ['id', 'processing_status', 'processing_stage', 'processing_error', 'processed_at',
+                  'content_hash', 'mime_type', 'size', 'page_count', 'word_count']
+        read_only_fields = fields
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'classroom', 'name', 'filename', 'size', 'offset', 'created_at']
+        read_only_fields = ['offset', 'created_at']
+
+    def validate_filename(self, value):
+        # Only the extension can be checked before any content arrives
+        for validator in Document._meta.get_field('file').validators:
+            if isinstance(validator, FileExtensionValidator):
+                try:
+                    validator(File(None, name=value))
+                except DjangoValidationError as e:
+                    raise ValidationError(e.messages)
+        return value
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise ValidationError("Empty files are not accepted.")
+        if value > settings.MATERIALS_UPLOAD_MAX_SIZE:
+            raise ValidationError(too_large_message())
+        return value
@@ -0,0 +1,186 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+from common.compression import iter_original_blocks, stored_codec
+from common.models import StoredFile
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(name, path, content_hash=''):
+    """Strong ETag for a stored file.
+
+    The content hash is used when known (documents, deduplicated blobs); other
+    files fall back to size and modification time, like nginx does.
+    """
+    if not content_hash:
+        content_hash = StoredFile.objects.filter(name=name).values_list('blob_id', flat=True).first()
+    if content_hash:
+        return content_hash
+    stat = os.stat(path)
+    return f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+
+def accepts_encoding(request, codec):
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        token, _, params = item.strip().partition(';')
+        if token.strip().lower() == codec:
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def parse_range(header, size):
+    """Return the (start, end) inclusive byte range requested, or None to send the whole file.
+
+    Only single ranges are honoured; multipart ranges fall back to a full
+    response, which RFC 9110 allows. Raises ValueError when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def iter_file_range(path, start, end):
+    with open(path, 'rb') as file_obj:
+        file_obj.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file_obj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def sendfile_response(name, path):
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+    response = HttpResponse()
+    if backend == 'nginx':
+        # nginx serves the internal location itself, including ranges
+        response['X-Accel-Redirect'] = settings.MEDIA_SENDFILE_URL + name
+    elif backend == 'apache':
+        response['X-Sendfile'] = path
+    else:
+        raise ValueError(f'Unknown MEDIA_SENDFILE_BACKEND: {backend}')
+    # Let the front server compute the content type from the file
+    del response['Content-Type']
+    return response
+
+
+def serve_file(request, field_file, content_hash='', content_type=None, filename=None):
+    """Serve a model's stored file. See serve_stored_file."""
+    return serve_stored_file(
+        request, field_file.storage, field_file.name,
+        content_hash=content_hash, content_type=content_type, filename=filename,
+    )
+
+
+def serve_stored_file(request, storage, name, content_hash='', content_type=None, filename=None):
+    """Serve a stored file with Range, ETag and If-None-Match support.
+
+    Permission checks are the caller's job. Files kept compressed at rest are
+    sent as they are with Content-Encoding when the client accepts it, and
+    decompressed on the fly otherwise. When MEDIA_SENDFILE_BACKEND is set the
+    byte transfer of uncompressed files is delegated to the front server.
+    """
+    path = storage.path(name)
+    if not os.path.isfile(path):
+        raise Http404('File not found.')
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    codec = stored_codec(path)
+    passthrough = codec is not None and accepts_encoding(request, codec)
+
+    etag = file_etag(name, path, content_hash)
+    if passthrough:
+        # Each encoding of the content is a different representation
+        etag = f'{etag}-{codec}'
+    etag = quote_etag(etag)
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if etag in parse_etags(if_none_match) or if_none_match.strip() == '*':
+        response = HttpResponse(status=304)
+        del response['Content-Type']
+    elif codec is not None and not passthrough:
+        body = iter_original_blocks(path, CHUNK_SIZE) if request.method != 'HEAD' else iter(())
+        response = StreamingHttpResponse(body, content_type=content_type)
+    elif codec is None and getattr(settings, 'MEDIA_SENDFILE_BACKEND', None):
+        response = sendfile_response(name, path)
+    else:
+        response = range_response(request, path, etag, content_type)
+        if passthrough and response.status_code != 416:
+            response['Content-Encoding'] = codec
+
+    response['ETag'] = etag
+    if codec is not None:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    # Files are permission checked, so shared caches must not keep them
+    response['Cache-Control'] = 'private, no-cache'
+    if response.status_code != 304:
+        filename = filename or os.path.basename(name)
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
+
+
+def range_response(request, path, etag, content_type):
+    size = os.path.getsize(path)
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # A stale If-Range means the client's partial copy is outdated
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    body = iter_file_range(path, start, end) if request.method != 'HEAD' and size else iter(())
+    response = StreamingHttpResponse(body, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1 if size else 0)
+    response['Accept-Ranges'] = 'bytes'
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def media_view(request, path):
+    """
+    Serve MEDIA_URL through serve_stored_file in DEBUG, replacing the static
+    view so that compressed files are sent correctly. Only the directories
+    of model file fields are exposed; blobs and partial uploads are not.
+    """
+    from .media_gc import managed_dirs
+    from common.storage import BLOB_DIR, select_media_storage
+
+    top = path.split('/', 1)[0]
+    if top == BLOB_DIR or top not in managed_dirs() or '..' in path.split('/'):
+        raise Http404('File not found.')
+    response = serve_stored_file(request, select_media_storage(), path)
+    response['Cache-Control'] = 'no-cache'
+    return response
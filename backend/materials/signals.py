@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .media_gc import enqueue_file_deletion
+from .models import Document
+
+
+@receiver(post_delete, sender=Document)
+def queue_document_file_deletion(sender, instance, **kwargs):
+    # Also sent for cascades (classroom or user deletions), unlike Document.delete
+    enqueue_file_deletion(instance.file.name)
@@ -0,0 +1,155 @@
+"""
+Structured view of extracted text: sections led by a heading, each holding
+paragraph and table blocks, with character and token estimates so callers
+can pick just the sections that fit a prompt.
+
+Blocks are dicts: {'type': 'heading', 'level': n, 'text': ...},
+{'type': 'paragraph', 'text': ...} and {'type': 'table', 'rows': [[...]]}.
+"""
+import math
+import re
+
+from .extractors import parse_page_ranges
+
+MARKDOWN_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+MARKDOWN_TABLE_RULE = re.compile(r'^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$')
+TEX_HEADING = re.compile(r'\\(part|chapter|section|subsection|subsubsection|paragraph)\*?\s*(?:\[[^\]]*\])?\{(.*)\}')
+TEX_LEVELS = {'part': 1, 'chapter': 1, 'section': 1, 'subsection': 2, 'subsubsection': 3, 'paragraph': 4}
+
+
+def estimate_tokens(text):
+    """Rough token count for LLM prompts (about four characters per token)."""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def block_text(block):
+    if block['type'] == 'table':
+        return '\n'.join(' | '.join(row) for row in block['rows'])
+    return block['text']
+
+
+def sections_from_blocks(blocks):
+    """Group blocks into sections, one per heading plus any text before the first heading."""
+    sections = []
+    current = None
+    for block in blocks:
+        if block['type'] == 'heading':
+            current = {'heading': block['text'], 'level': block['level'], 'blocks': []}
+            sections.append(current)
+            continue
+        if current is None:
+            current = {'heading': None, 'level': 0, 'blocks': []}
+            sections.append(current)
+        current['blocks'].append(block)
+
+    for section in sections:
+        text = render_sections([section])
+        section['chars'] = len(text)
+        section['tokens'] = estimate_tokens(text)
+    return sections
+
+
+def _paragraph_blocks(lines):
+    """Split lines into paragraphs on blank lines."""
+    paragraph = []
+    for line in lines:
+        if line.strip():
+            paragraph.append(line.strip())
+        elif paragraph:
+            yield {'type': 'paragraph', 'text': ' '.join(paragraph)}
+            paragraph = []
+    if paragraph:
+        yield {'type': 'paragraph', 'text': ' '.join(paragraph)}
+
+
+def markdown_blocks(text):
+    lines = []
+    rows = []
+
+    def flush():
+        blocks = list(_paragraph_blocks(lines))
+        if rows:
+            blocks.append({'type': 'table', 'rows': list(rows)})
+        lines.clear()
+        rows.clear()
+        return blocks
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        heading = MARKDOWN_HEADING.match(stripped)
+        if heading:
+            yield from flush()
+            yield {'type': 'heading', 'level': len(heading.group(1)), 'text': heading.group(2)}
+        elif stripped.startswith('|'):
+            if lines:
+                yield from flush()
+            if not MARKDOWN_TABLE_RULE.match(stripped):
+                rows.append([cell.strip() for cell in stripped.strip('|').split('|')])
+        else:
+            if rows:
+                yield from flush()
+            lines.append(line)
+    yield from flush()
+
+
+def tex_blocks(text):
+    lines = []
+    for line in text.splitlines():
+        heading = TEX_HEADING.search(line)
+        if heading:
+            yield from _paragraph_blocks(lines)
+            lines = []
+            yield {'type': 'heading', 'level': TEX_LEVELS[heading.group(1)], 'text': heading.group(2).strip()}
+        else:
+            lines.append(line)
+    yield from _paragraph_blocks(lines)
+
+
+def page_blocks(text, page_offsets, label):
+    bounds = page_offsets + [len(text)]
+    for number in range(len(page_offsets)):
+        yield {'type': 'heading', 'level': 1, 'text': f'{label} {number + 1}'}
+        yield from _paragraph_blocks(text[bounds[number]:bounds[number + 1]].splitlines())
+
+
+def build_structure(extension, text, page_offsets=None, blocks=None):
+    """Sections of an extracted file, from the extractor's own blocks when it has them."""
+    if blocks is None:
+        if page_offsets is not None:
+            blocks = page_blocks(text, page_offsets, 'Slide' if extension == 'pptx' else 'Page')
+        elif extension == 'md':
+            blocks = markdown_blocks(text)
+        elif extension == 'tex':
+            blocks = tex_blocks(text)
+        else:
+            blocks = _paragraph_blocks(text.splitlines())
+    return sections_from_blocks(blocks)
+
+
+def select_sections(sections, indexes=None, heading=None):
+    """
+    Pick sections by 1-based index ranges such as "2-4,7" and/or by a
+    case-insensitive heading substring. Returns (index, section) pairs.
+    """
+    selected = list(enumerate(sections, start=1))
+    if indexes:
+        try:
+            wanted = {index + 1 for index in parse_page_ranges(indexes, len(sections))}
+        except ValueError:
+            raise ValueError(f'Invalid section selection "{indexes}" for a document with {len(sections)} sections')
+        selected = [(index, section) for index, section in selected if index in wanted]
+    if heading:
+        needle = heading.lower()
+        selected = [(index, section) for index, section in selected
+                    if needle in (section['heading'] or '').lower()]
+    return selected
+
+
+def render_sections(sections):
+    """Plain text of sections, with markdown-style headings and tables as rows of cells."""
+    parts = []
+    for section in sections:
+        if section['heading']:
+            parts.append('#' * max(section['level'], 1) + ' ' + section['heading'])
+        parts.extend(block_text(block) for block in section['blocks'])
+    return '\n\n'.join(parts) + '\n' if parts else ''
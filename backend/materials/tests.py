@@ -3,16 +3,23 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from .serializers import DocumentSerializer
 from rest_framework import status
 from rest_framework.test import APITestCase, APIRequestFactory
-from .models import Document
+from django.db import connection
+from django.test import override_settings
+from .models import Document, UploadSession
 from classrooms.models import Classroom
 from tags.models import Tag
 from users.models import CustomUser
 from rest_framework.authtoken.models import Token
 from materials.views import DocumentViewSet
+from materials.media_gc import sweep_deleted_files
+from common.testing import TemporaryMediaMixin
 import os
+import shutil
+import tempfile
+from unittest import skipUnless
 
 
-class DocumentTests(APITestCase):
+class DocumentTests(TemporaryMediaMixin, APITestCase):
     def setUp(self):
         self.user = CustomUser.objects.create_user(
             username='testuser',
@@ -35,7 +42,7 @@ class DocumentTests(APITestCase):
 
         self.test_file = SimpleUploadedFile(
             "test.pdf",
-            b"file_content",
+            b"%PDF-1.4 file_content",
             content_type="application/pdf"
         )
 
@@ -95,6 +102,9 @@ class DocumentTests(APITestCase):
         file_path = document.file.path
         self.assertTrue(os.path.exists(file_path))
         document.delete()
+        # Files are removed by the deferred media sweep, once it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep_deleted_files()
         self.assertFalse(os.path.exists(file_path))
 
     def test_document_update(self):
@@ -281,7 +291,7 @@ class DocumentTests(APITestCase):
 
         new_file = SimpleUploadedFile(
             "full_update.pdf",
-            b"new_content",
+            b"%PDF-1.4 new_content",
             content_type="application/pdf"
         )
 
@@ -474,7 +484,7 @@ class DocumentTests(APITestCase):
 
         new_file = SimpleUploadedFile(
             "new_test.pdf",
-            b"new_file_content",
+            b"%PDF-1.4 new_file_content",
             content_type="application/pdf"
         )
 
@@ -568,7 +578,7 @@ class DocumentTests(APITestCase):
     def test_update_document_tags(self):
         document = Document.objects.create(
             name='TestDocument',
-            file=SimpleUploadedFile("test.pdf", b"file_content", content_type="application/pdf"),
+            file=SimpleUploadedFile("test.pdf", b"%PDF-1.4 file_content", content_type="application/pdf"),
             classroom=self.classroom
         )
         data = {'tag_ids': [self.tag1.id]}
@@ -579,7 +589,7 @@ class DocumentTests(APITestCase):
         self.assertEqual(updated_document.tags.first().name, 'Tag1')
 
 
-class DocumentViewSetAdditionalTests(APITestCase):
+class DocumentViewSetAdditionalTests(TemporaryMediaMixin, APITestCase):
     def setUp(self):
         self.user = CustomUser.objects.create_user(
             username='testuser',
@@ -598,7 +608,7 @@ class DocumentViewSetAdditionalTests(APITestCase):
         )
         self.tag1 = Tag.objects.create(name='Tag1', creator=self.user)
         self.tag2 = Tag.objects.create(name='Tag2', creator=self.user)
-        self.test_file = SimpleUploadedFile("test.pdf", b"file_content", content_type="application/pdf")
+        self.test_file = SimpleUploadedFile("test.pdf", b"%PDF-1.4 file_content", content_type="application/pdf")
 
     def test_filter_documents_by_nonexistent_classroom(self):
         response = self.client.get(f"{reverse('materials-list')}?classroom_id=9999")
@@ -674,3 +684,1515 @@ class DocumentViewSetAdditionalTests(APITestCase):
                         os.remove(os.path.join(media_dir, filename))
                     except (FileNotFoundError, PermissionError) as e:
                         print(f"Could not delete temporary file {filename}: {e}")
+
+
+def build_docx(paragraphs, table_rows=None):
+    import io
+    import docx
+
+    doc = docx.Document()
+    for paragraph in paragraphs:
+        doc.add_paragraph(paragraph)
+    if table_rows:
+        table = doc.add_table(rows=len(table_rows), cols=len(table_rows[0]))
+        for row, values in zip(table.rows, table_rows):
+            for cell, value in zip(row.cells, values):
+                cell.text = value
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def build_pdf(pages):
+    """Build a minimal PDF with one line of Helvetica text per page."""
+    objects = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for page_id, text in zip(page_ids, pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return output
+
+
+def build_pptx(slides):
+    """Build a minimal PPTX whose slides list their paragraphs in order."""
+    import io
+    import zipfile
+
+    presentation_ns = (
+        'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+        'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+    )
+    # List the slides in reverse part order to check the presentation order wins
+    slide_ids = ''.join(
+        f'<p:sldId id="{256 + i}" r:id="rId{i + 1}"/>' for i in reversed(range(len(slides)))
+    )
+    relationships = ''.join(
+        f'<Relationship Id="rId{i + 1}" Target="slides/slide{i + 1}.xml" '
+        f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"/>'
+        for i in range(len(slides))
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('ppt/presentation.xml', f'<p:presentation {presentation_ns}><p:sldIdLst>{slide_ids}</p:sldIdLst></p:presentation>')
+        archive.writestr(
+            'ppt/_rels/presentation.xml.rels',
+            f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{relationships}</Relationships>'
+        )
+        for i, paragraphs in enumerate(slides):
+            body = ''.join(f'<a:p><a:r><a:t>{text}</a:t></a:r></a:p>' for text in paragraphs)
+            archive.writestr(
+                f'ppt/slides/slide{i + 1}.xml',
+                f'<p:sld {presentation_ns}><p:cSld><p:spTree><p:sp><p:txBody>{body}</p:txBody></p:sp></p:spTree></p:cSld></p:sld>'
+            )
+    return buffer.getvalue()
+
+
+class DocumentExtractionCacheTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+        self.document = Document.objects.create(
+            name='Extraction Test',
+            file=SimpleUploadedFile("test_extraction.docx", build_docx(['First paragraph', 'Second paragraph'])),
+            classroom=self.classroom
+        )
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def test_extract_text_from_material(self):
+        response = self.client.get(reverse('materials-extract-text-from-material', args=[self.document.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('First paragraph', response.data['text'])
+        self.assertIn('Second paragraph', response.data['text'])
+
+    def test_extracted_text_is_stored_with_hash_and_version(self):
+        from .extraction import EXTRACTOR_VERSION
+        from .models import ExtractedText
+
+        self.client.get(reverse('materials-extract-text-from-material', args=[self.document.id]))
+
+        self.document.refresh_from_db()
+        self.assertEqual(len(self.document.content_hash), 64)
+        cached = ExtractedText.objects.get(document=self.document)
+        self.assertEqual(cached.content_hash, self.document.content_hash)
+        self.assertEqual(cached.extractor_version, EXTRACTOR_VERSION)
+
+    def test_docx_structure_has_headings_and_tables(self):
+        import io
+        import docx
+        from .models import ExtractedText
+
+        doc = docx.Document()
+        doc.add_paragraph('Unidad 3')
+        doc.add_heading('La célula', level=1)
+        doc.add_paragraph('La célula es la unidad básica de la vida.')
+        doc.add_heading('Orgánulos', level=2)
+        table = doc.add_table(rows=2, cols=2)
+        for row, values in zip(table.rows, [['Orgánulo', 'Función'], ['Mitocondria', 'Energía']]):
+            for cell, value in zip(row.cells, values):
+                cell.text = value
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        document = Document.objects.create(
+            name='Structured', file=SimpleUploadedFile('test_structured.docx', buffer.getvalue()),
+            classroom=self.classroom
+        )
+
+        url = reverse('materials-extract-structure', args=[document.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sections = response.data['sections']
+        self.assertEqual(
+            [(section['heading'], section['level']) for section in sections],
+            [(None, 0), ('La célula', 1), ('Orgánulos', 2)]
+        )
+        self.assertEqual(sections[2]['blocks'], [
+            {'type': 'table', 'rows': [['Orgánulo', 'Función'], ['Mitocondria', 'Energía']]}
+        ])
+        self.assertEqual(sum(section['tokens'] for section in sections), response.data['tokens'])
+        # Headings do not change the flat text, which is stored alongside
+        self.assertIn('La célula\nLa célula es', ExtractedText.objects.get(document=document).text)
+
+        response = self.client.get(url, {'heading': 'orgánulos'})
+        self.assertEqual([section['index'] for section in response.data['sections']], [3])
+        self.assertEqual(response.data['text'], '## Orgánulos\n\nOrgánulo | Función\nMitocondria | Energía\n')
+
+        response = self.client.get(url, {'sections': '2', 'outline': '1'})
+        self.assertNotIn('blocks', response.data['sections'][0])
+        self.assertEqual(response.data['section_count'], 3)
+        self.assertEqual(self.client.get(url, {'sections': '4'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_markdown_structure(self):
+        from .structure import build_structure
+
+        text = 'Intro line\n\n# Tema 1\nTexto del tema.\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n## Ejercicios\nHaz el 1.\n'
+        sections = build_structure('md', text)
+        self.assertEqual([section['heading'] for section in sections], [None, 'Tema 1', 'Ejercicios'])
+        self.assertEqual(sections[1]['blocks'], [
+            {'type': 'paragraph', 'text': 'Texto del tema.'},
+            {'type': 'table', 'rows': [['a', 'b'], ['1', '2']]},
+        ])
+        self.assertEqual(sections[2]['chars'], len('## Ejercicios\n\nHaz el 1.\n'))
+
+    def test_both_endpoints_reuse_stored_text(self):
+        from unittest import mock
+
+        self.client.get(reverse('materials-extract-text-from-material', args=[self.document.id]))
+
+        with mock.patch('materials.extraction.extract_file') as parser:
+            response = self.client.get(reverse('materials-extract-text-from-material', args=[self.document.id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.post(
+                reverse('materials-extract-text-from-url'),
+                {'material_id': self.document.id},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('First paragraph', response.data['text'])
+            parser.assert_not_called()
+
+    def test_extract_text_from_url_keeps_docx_format(self):
+        self.document.file = SimpleUploadedFile(
+            "test_legacy.docx",
+            build_docx(['First paragraph', 'Second paragraph'], table_rows=[['a', ''], ['1', '2']])
+        )
+        self.document.save()
+
+        response = self.client.post(
+            reverse('materials-extract-text-from-url'),
+            {'material_id': self.document.id},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['text'], 'First paragraph\nSecond paragraph\na\n1\n2')
+
+    def test_replacing_file_invalidates_stored_text(self):
+        from .models import ExtractedText
+
+        self.client.get(reverse('materials-extract-text-from-material', args=[self.document.id]))
+        self.assertTrue(ExtractedText.objects.filter(document=self.document).exists())
+
+        response = self.client.patch(
+            reverse('materials-detail', args=[self.document.id]),
+            {'file': SimpleUploadedFile("test_replacement.docx", build_docx(['Replacement paragraph']))},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(ExtractedText.objects.filter(document=self.document).exists())
+
+        response = self.client.get(reverse('materials-extract-text-from-material', args=[self.document.id]))
+        self.assertIn('Replacement paragraph', response.data['text'])
+        self.assertNotIn('First paragraph', response.data['text'])
+
+    def read_ndjson(self, response):
+        import json
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_stream_extracted_text(self):
+        from .models import ExtractedText
+
+        url = reverse('materials-extract-text-from-material', args=[self.document.id])
+        lines = self.read_ndjson(self.client.get(url, {'stream': '1'}))
+        self.assertEqual([line['text'] for line in lines[:-1]], ['First paragraph\n', 'Second paragraph\n'])
+        self.assertEqual(lines[-1], {'done': True, 'chunks': 2})
+
+        # The streamed parse is stored and replayed on the next request
+        cached = ExtractedText.objects.get(document=self.document)
+        self.assertEqual(cached.text, 'First paragraph\nSecond paragraph\n')
+        lines = self.read_ndjson(self.client.get(url, {'stream': '1'}))
+        self.assertEqual(''.join(line.get('text', '') for line in lines), cached.text)
+
+    def test_stream_pdf_pages(self):
+        document = Document.objects.create(
+            name='PDF Material',
+            file=SimpleUploadedFile("test_pages.pdf", build_pdf(['Page one', 'Page two', 'Page three'])),
+            classroom=self.classroom
+        )
+        response = self.client.post(
+            reverse('materials-extract-text-from-url'),
+            {'material_id': document.id, 'pages': '2-3', 'stream': True},
+            format='json'
+        )
+        lines = self.read_ndjson(response)
+        self.assertEqual([line['text'] for line in lines[:-1]], ['Page two\n', 'Page three\n'])
+
+        url = reverse('materials-extract-text-from-material', args=[document.id])
+        lines = self.read_ndjson(self.client.get(url, {'stream': '1'}))
+        self.assertEqual(len(lines), 4)
+        lines = self.read_ndjson(self.client.get(url, {'stream': '1', 'pages': '3'}))
+        self.assertEqual(lines[0]['text'], 'Page three\n')
+
+    def test_stream_rejects_unsupported_files_before_streaming(self):
+        document = Document.objects.create(
+            name='Image Material',
+            file=SimpleUploadedFile("test.png", b"\x89PNG\r\n\x1a\n", content_type="image/png"),
+            classroom=self.classroom
+        )
+        response = self.client.get(
+            reverse('materials-extract-text-from-material', args=[document.id]), {'stream': '1'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_extract_text_batch(self):
+        from unittest import mock
+        from .extraction import extract_file
+
+        other_user = CustomUser.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='otherpassword'
+        )
+        other_classroom = Classroom.objects.create(
+            name='Other Classroom',
+            academic_course='Other Course',
+            description='Other Description',
+            academic_year='2023-2024',
+            creator=other_user
+        )
+        foreign = Document.objects.create(
+            name='Foreign', file=SimpleUploadedFile("test_foreign.docx", build_docx(['Secret'])),
+            classroom=other_classroom
+        )
+        pdf = Document.objects.create(
+            name='PDF', file=SimpleUploadedFile("test_batch.pdf", build_pdf(['Batch page'])),
+            classroom=self.classroom
+        )
+        image = Document.objects.create(
+            name='Image', file=SimpleUploadedFile("test.png", b"\x89PNG\r\n\x1a\n"),
+            classroom=self.classroom
+        )
+        # Warm the stored text of the first document
+        self.client.get(reverse('materials-extract-text-from-material', args=[self.document.id]))
+
+        ids = [self.document.id, pdf.id, image.id, foreign.id, 999999]
+        with mock.patch('materials.extraction.extract_file', side_effect=extract_file) as parser:
+            response = self.client.post(reverse('materials-extract-text-batch'), {'material_ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Only the uncached PDF needed parsing
+        self.assertEqual(parser.call_count, 1)
+
+        results = response.data['results']
+        self.assertEqual([result['material_id'] for result in results], ids)
+        self.assertEqual([result['status'] for result in results], [200, 200, 400, 403, 404])
+        self.assertIn('First paragraph', results[0]['text'])
+        self.assertEqual(results[1]['text'], 'Batch page\n')
+        self.assertNotIn('text', results[3])
+
+    def test_extract_text_batch_validation(self):
+        url = reverse('materials-extract-text-batch')
+        self.assertEqual(self.client.post(url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.post(url, {'material_ids': ['a']}, format='json').status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        with override_settings(MATERIALS_BATCH_EXTRACTION_MAX=2):
+            response = self.client.post(url, {'material_ids': [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_docx_blocks_keep_document_order(self):
+        import docx
+        from .extractors.docx import extract_docx_text, iter_docx_blocks
+
+        doc = docx.Document()
+        doc.add_paragraph('Before table')
+        table = doc.add_table(rows=2, cols=2)
+        for row_index, row in enumerate(table.rows):
+            for column_index, cell in enumerate(row.cells):
+                cell.text = f'{row_index}{column_index}'
+        paragraph = doc.add_paragraph('Tabbed')
+        paragraph.add_run().add_tab()
+        paragraph.add_run('text')
+        doc.add_paragraph('')
+        doc.add_paragraph('After table')
+        path = os.path.join(self.tmp_dir, 'ordered.docx')
+        doc.save(path)
+
+        self.assertEqual(list(iter_docx_blocks(path)), [
+            ('paragraph', 'Before table'),
+            ('table', [['00', '01'], ['10', '11']]),
+            ('paragraph', 'Tabbed\ttext'),
+            ('paragraph', 'After table'),
+        ])
+        self.assertEqual(extract_docx_text(path), 'Before table\n00 01 \n10 11 \n\nTabbed\ttext\nAfter table\n')
+
+    def test_extract_text_from_pdf_material(self):
+        document = Document.objects.create(
+            name='PDF Material',
+            file=SimpleUploadedFile("test_pages.pdf", build_pdf(['Page one', 'Page two', 'Page three'])),
+            classroom=self.classroom
+        )
+        response = self.client.get(reverse('materials-extract-text-from-material', args=[document.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['text'], 'Page one\nPage two\nPage three\n')
+
+        response = self.client.get(
+            reverse('materials-extract-text-from-material', args=[document.id]), {'pages': '1,3'}
+        )
+        self.assertEqual(response.data['text'], 'Page one\nPage three\n')
+
+        response = self.client.post(
+            reverse('materials-extract-text-from-url'),
+            {'material_id': document.id, 'pages': '2-3'},
+            format='json'
+        )
+        self.assertEqual(response.data['text'], 'Page two\nPage three\n')
+
+    def test_extract_text_rejects_invalid_page_ranges(self):
+        document = Document.objects.create(
+            name='PDF Material',
+            file=SimpleUploadedFile("test_pages.pdf", build_pdf(['Page one'])),
+            classroom=self.classroom
+        )
+        response = self.client.get(
+            reverse('materials-extract-text-from-material', args=[document.id]), {'pages': '2-5'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            reverse('materials-extract-text-from-material', args=[self.document.id]), {'pages': '1'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PDF_PARALLEL_MIN_PAGES=2, PDF_PAGES_PER_TASK=2, PDF_EXTRACTION_WORKERS=2)
+    def test_pdf_pages_extracted_on_process_pool(self):
+        from .extractors.pdf import extract_pdf_pages
+
+        upload = SimpleUploadedFile("test_pool.pdf", build_pdf([f'Page {i}' for i in range(1, 6)]))
+        document = Document.objects.create(name='Pool Material', file=upload, classroom=self.classroom)
+        self.assertEqual(
+            extract_pdf_pages(document.file.path),
+            ['Page 1', 'Page 2', 'Page 3', 'Page 4', 'Page 5']
+        )
+        self.assertEqual(extract_pdf_pages(document.file.path, [1, 3, 4]), ['Page 2', 'Page 4', 'Page 5'])
+
+    def test_extract_text_from_uploaded_pdf(self):
+        response = self.client.post(
+            reverse('materials-extract-text-from-uploaded-file'),
+            {'file': SimpleUploadedFile("upload.pdf", build_pdf(['Uploaded page', 'Second'])), 'pages': '2'},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['text'], 'Second\n')
+
+    def test_parse_page_ranges(self):
+        from .extractors import parse_page_ranges
+
+        self.assertEqual(parse_page_ranges('1-3,5', 6), [0, 1, 2, 4])
+        self.assertEqual(parse_page_ranges('2,2,1', 3), [0, 1])
+        for invalid in ['0', '4', '3-1', 'a', '']:
+            with self.assertRaises(ValueError):
+                parse_page_ranges(invalid, 3)
+
+    def test_extract_text_from_plain_text_materials(self):
+        samples = [
+            ('test_notes.txt', 'Línea uno\r\nLínea dos'.encode('utf-8'), 'Línea uno\nLínea dos'),
+            ('test_bom.md', '\ufeff# Título'.encode('utf-8'), '# Título'),
+            ('test_legacy.tex', 'Ecuaci\u00f3n \u20ac'.encode('cp1252'), 'Ecuación €'),
+            ('test_utf16.txt', 'Hola'.encode('utf-16'), 'Hola'),
+            ('test_empty.txt', b'', ''),
+        ]
+        for name, content, expected in samples:
+            document = Document.objects.create(
+                name='Text Material', file=SimpleUploadedFile(name, content), classroom=self.classroom
+            )
+            response = self.client.get(reverse('materials-extract-text-from-material', args=[document.id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK, name)
+            self.assertEqual(response.data['text'], expected, name)
+            document.delete()
+
+    def test_text_extractor_handles_lines_across_blocks(self):
+        from unittest import mock
+        from .extractors import text
+
+        path = os.path.join(self.tmp_dir, 'blocks.txt')
+        with open(path, 'wb') as file_obj:
+            file_obj.write('ab\r\ncñd\ref\n'.encode('utf-8'))
+        with mock.patch.object(text, 'BLOCK_SIZE', 3):
+            self.assertEqual(list(text.iter_chunks(path)), ['ab\n', 'cñd\n', 'ef\n'])
+
+        # A line spanning many blocks, with a lone "\r" inside it
+        with open(path, 'wb') as file_obj:
+            file_obj.write(b'x' * 1000 + b'\r' + b'y' * 1000)
+        with mock.patch.object(text, 'BLOCK_SIZE', 7):
+            self.assertEqual(list(text.iter_chunks(path)), ['x' * 1000 + '\n', 'y' * 1000])
+
+    def test_text_encoding_is_detected_from_a_prefix(self):
+        from unittest import mock
+        from .extractors import text
+
+        path = os.path.join(self.tmp_dir, 'prefix.txt')
+        with open(path, 'wb') as file_obj:
+            file_obj.write('Canción\n'.encode('utf-8') + b'Ca\xf1\xf3n\n')
+        with mock.patch.object(text, 'DETECT_SIZE', 8):
+            # Only the UTF-8 prefix is looked at; later invalid bytes are replaced
+            self.assertEqual(list(text.iter_chunks(path)), ['Canción\n', 'Ca\ufffd\ufffdn\n'])
+        # A prefix covering the whole file tells it is not UTF-8
+        self.assertEqual(list(text.iter_chunks(path)), ['CanciÃ³n\n', 'Cañón\n'])
+
+    def test_extract_text_from_pptx_material(self):
+        document = Document.objects.create(
+            name='Slides',
+            file=SimpleUploadedFile("test_slides.pptx", build_pptx([['Slide one', 'Point'], ['Slide two']])),
+            classroom=self.classroom
+        )
+        url = reverse('materials-extract-text-from-material', args=[document.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Presentation order lists slide2.xml first
+        self.assertEqual(response.data['text'], 'Slide two\nSlide one\nPoint\n')
+
+        response = self.client.get(url, {'pages': '2'})
+        self.assertEqual(response.data['text'], 'Slide one\nPoint\n')
+
+    def test_extractor_registry(self):
+        from .extractors import UnsupportedFileType, get_extractor, is_supported
+
+        self.assertTrue(is_supported('TXT'))
+        self.assertFalse(is_supported('png'))
+        self.assertEqual(get_extractor('md').__name__, 'materials.extractors.text')
+        with self.assertRaises(UnsupportedFileType):
+            get_extractor('doc')
+        with override_settings(MATERIALS_EXTRACTORS={'csv': 'materials.extractors.text'}):
+            self.assertEqual(get_extractor('csv').__name__, 'materials.extractors.text')
+
+    def test_extract_text_rejects_unsupported_files(self):
+        document = Document.objects.create(
+            name='Image Material',
+            file=SimpleUploadedFile("test.png", b"\x89PNG\r\n\x1a\n", content_type="image/png"),
+            classroom=self.classroom
+        )
+        response = self.client.get(reverse('materials-extract-text-from-material', args=[document.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+
+
+@override_settings(MATERIALS_PROCESSING_ASYNC=False)
+class DocumentProcessingTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+
+    def upload(self, file):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('materials-list'),
+                {'name': 'Processed Document', 'file': file, 'classroom': self.classroom.id},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def test_upload_returns_processing_status(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post(
+                reverse('materials-list'),
+                {'name': 'Pending Document', 'file': SimpleUploadedFile("test_pending.docx", build_docx(['Text'])),
+                 'classroom': self.classroom.id},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['processing_status'], Document.PENDING)
+
+    def test_pipeline_fills_metadata_and_text(self):
+        from .models import ExtractedText
+
+        response = self.upload(SimpleUploadedFile("test_processed.docx", build_docx(['One two three', 'four five'])))
+
+        status_response = self.client.get(reverse('materials-processing-status', args=[response.data['id']]))
+        self.assertEqual(status_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(status_response.data['processing_status'], Document.READY)
+        self.assertEqual(len(status_response.data['content_hash']), 64)
+        self.assertEqual(
+            status_response.data['mime_type'],
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        )
+        self.assertEqual(status_response.data['word_count'], 5)
+        self.assertGreater(status_response.data['size'], 0)
+        self.assertTrue(ExtractedText.objects.filter(document_id=response.data['id']).exists())
+
+    def test_pipeline_sniffs_real_type(self):
+        from .processing import schedule_document_processing
+
+        # Files stored before uploads were checked can still be mislabelled
+        with self.captureOnCommitCallbacks(execute=True):
+            document = Document.objects.create(
+                name='Fake', file=SimpleUploadedFile("test_fake.docx", b"%PDF-1.4 not really a docx"),
+                classroom=self.classroom
+            )
+            schedule_document_processing(document)
+
+        document.refresh_from_db()
+        self.assertEqual(document.mime_type, 'application/pdf')
+        # The DOCX parser cannot open it, so the pipeline reports the failing stage
+        self.assertEqual(document.processing_status, Document.FAILED)
+        self.assertTrue(document.processing_error.startswith('extract'))
+
+    def test_upload_is_inspected_while_received(self):
+        import hashlib
+        from unittest import mock
+
+        content = build_docx(['Inspected on arrival'])
+        with mock.patch('materials.views.schedule_document_processing'):
+            response = self.client.post(
+                reverse('materials-list'),
+                {'name': 'Inspected', 'file': SimpleUploadedFile("test_inspected.docx", content),
+                 'classroom': self.classroom.id},
+                format='multipart'
+            )
+        document = Document.objects.get(id=response.data['id'])
+        # Known before any processing has run
+        self.assertEqual(document.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(
+            document.mime_type, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        )
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=16)
+    def test_mismatched_upload_is_rejected(self):
+        for name, content in [("test_fake.docx", b"%PDF-1.4 not really a docx"),
+                              ("test_fake.pdf", b"MZ\x90\x00 an executable"),
+                              ("test_binary.txt", b"\x00\x01\x02\x03 binary data")]:
+            response = self.client.post(
+                reverse('materials-list'),
+                {'name': 'Fake', 'file': SimpleUploadedFile(name, content), 'classroom': self.classroom.id},
+                format='multipart'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('does not match', str(response.data['file']))
+        self.assertFalse(Document.objects.exists())
+
+    @override_settings(MATERIALS_UPLOAD_MAX_SIZE=1024, FILE_UPLOAD_MAX_MEMORY_SIZE=16)
+    def test_oversized_upload_reports_the_limit(self):
+        response = self.client.post(
+            reverse('materials-list'),
+            {'name': 'Huge', 'file': SimpleUploadedFile("test_huge.pdf", b'%PDF-1.4\n' + b'0' * 200000),
+             'classroom': self.classroom.id},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['file'], ['Files larger than 1024 bytes are not accepted.'])
+
+        response = self.client.post(reverse('materials-bulk-upload'), {
+            'classroom': self.classroom.id,
+            'files': [SimpleUploadedFile("test_small.pdf", b"%PDF-1.4 small"),
+                      SimpleUploadedFile("test_huge.pdf", b'%PDF-1.4\n' + b'0' * 200000)],
+        }, format='multipart')
+        results = {result['file']: result for result in response.data['results']}
+        self.assertEqual(results['test_small.pdf']['status'], 201)
+        self.assertEqual(results['test_huge.pdf']['errors'], ['Files larger than 1024 bytes are not accepted.'])
+
+    def test_search_materials(self):
+        self.upload(SimpleUploadedFile("test_photo.docx", build_docx(['La fotosíntesis ocurre en los cloroplastos.'])))
+        self.upload(SimpleUploadedFile("test_cells.docx", build_docx(['Cells divide by mitosis.', 'Mitosis again.'])))
+
+        response = self.client.get(reverse('materials-search'), {'q': 'fotosintesis'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(len(results), 1)
+        self.assertIn('<mark>', results[0]['snippet'])
+        self.assertEqual(results[0]['classroom'], self.classroom.id)
+
+        response = self.client.get(reverse('materials-search'), {'q': 'mitosis', 'classroom_id': self.classroom.id})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_search_is_scoped_and_follows_deletions(self):
+        other_user = CustomUser.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='otherpassword'
+        )
+        other_classroom = Classroom.objects.create(
+            name='Other Classroom',
+            academic_course='Other Course',
+            description='Other Description',
+            academic_year='2023-2024',
+            creator=other_user
+        )
+        foreign = Document.objects.create(
+            name='Foreign', file=SimpleUploadedFile("test_foreign.docx", build_docx(['Secret glaciers'])),
+            classroom=other_classroom
+        )
+        from .search import index_document
+        index_document(foreign, 'Secret glaciers')
+
+        response = self.upload(SimpleUploadedFile("test_glaciers.docx", build_docx(['Glaciers carve valleys.'])))
+        results = self.client.get(reverse('materials-search'), {'q': 'glaciers'}).data['results']
+        self.assertEqual([result['id'] for result in results], [response.data['id']])
+
+        self.client.delete(reverse('materials-detail', args=[response.data['id']]))
+        results = self.client.get(reverse('materials-search'), {'q': 'glaciers'}).data['results']
+        self.assertEqual(results, [])
+
+    def test_search_snippets_are_escaped(self):
+        from .search import index_document
+
+        response = self.upload(SimpleUploadedFile("test_volcano.docx", build_docx(['Volcanoes'])))
+        document = Document.objects.get(pk=response.data['id'])
+        index_document(document, '<img src=x onerror=alert(1)> Volcanoes & \x02geysers\x03 <b>erupt</b>')
+
+        snippet = self.client.get(reverse('materials-search'), {'q': 'volcanoes'}).data['results'][0]['snippet']
+        self.assertIn('&lt;img src=x onerror=alert(1)&gt;', snippet)
+        self.assertIn('<mark>Volcanoes</mark>', snippet)
+        self.assertIn('&amp; geysers &lt;b&gt;erupt&lt;/b&gt;', snippet)
+        self.assertNotIn('<img', snippet)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Runs the PostgreSQL search path (tsvector column, ts_headline)')
+    def test_search_postgresql_configurations(self):
+        from .search import index_document
+
+        spanish = self.upload(SimpleUploadedFile("test_rios.docx", build_docx(['Ríos'])))
+        english = self.upload(SimpleUploadedFile("test_rivers.docx", build_docx(['Rivers'])))
+        index_document(Document.objects.get(pk=spanish.data['id']), 'Los ríos <i>desembocan</i> en el mar.')
+        index_document(Document.objects.get(pk=english.data['id']), 'The rivers were flowing to the sea.')
+
+        # Stemmed by the spanish configuration
+        results = self.client.get(reverse('materials-search'), {'q': 'desembocar'}).data['results']
+        self.assertEqual([result['id'] for result in results], [spanish.data['id']])
+        self.assertIn('<mark>desembocan</mark>', results[0]['snippet'])
+        self.assertIn('&lt;i&gt;', results[0]['snippet'])
+
+        # Stemmed by the english configuration only, and highlighted with it
+        results = self.client.get(reverse('materials-search'), {'q': 'flow'}).data['results']
+        self.assertEqual([result['id'] for result in results], [english.data['id']])
+        self.assertIn('<mark>flowing</mark>', results[0]['snippet'])
+
+    def test_search_requires_query(self):
+        response = self.client.get(reverse('materials-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('materials-search'), {'q': '"*'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_sniff_mime_type(self):
+        from common.filetypes import sniff_mime_type
+
+        self.assertEqual(sniff_mime_type(b'\x89PNG\r\n\x1a\nrest'), 'image/png')
+        self.assertEqual(sniff_mime_type(b'\xff\xd8\xff\xe0'), 'image/jpeg')
+        self.assertEqual(sniff_mime_type(b'# Title', 'notes.md'), 'text/markdown')
+        self.assertEqual(sniff_mime_type(b'\x00\x01\x02binary'), 'application/octet-stream')
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+
+
+class PassageRetrievalTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+        self.biology = Document.objects.create(
+            name='Biology',
+            file=SimpleUploadedFile("test_biology.docx", build_docx([
+                'La fotosíntesis transforma la luz en energía química dentro de los cloroplastos.',
+                'Las mitocondrias producen energía mediante la respiración celular.',
+            ])),
+            classroom=self.classroom
+        )
+        self.history = Document.objects.create(
+            name='History',
+            file=SimpleUploadedFile("test_history.docx", build_docx([
+                'The French Revolution began in 1789.',
+                'Napoleon rose to power after the revolution.',
+            ])),
+            classroom=self.classroom
+        )
+
+    def post_context(self, **data):
+        payload = {'classroom_id': self.classroom.id, 'token_budget': 500}
+        payload.update(data)
+        return self.client.post(reverse('materials-build-prompt-context'), payload, format='json')
+
+    def test_context_contains_relevant_passages(self):
+        response = self.post_context(query='fotosintesis cloroplastos')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({passage['material_id'] for passage in response.data['passages']}, {self.biology.id})
+        self.assertIn('[Biology]', response.data['context'])
+        self.assertLessEqual(response.data['tokens_used'], 500)
+
+    def test_context_respects_token_budget(self):
+        from .retrieval import estimate_tokens
+
+        response = self.post_context(query='revolution energía', token_budget=30)
+        self.assertLessEqual(response.data['tokens_used'], 30)
+        self.assertLessEqual(estimate_tokens(response.data['context']), 30)
+
+    def test_context_can_be_restricted_to_materials(self):
+        response = self.post_context(query='revolution energía', material_ids=[self.history.id])
+        self.assertEqual({passage['material_id'] for passage in response.data['passages']}, {self.history.id})
+
+    def test_index_is_reused_until_materials_change(self):
+        from unittest import mock
+        from .retrieval import PassageIndex
+
+        with mock.patch('materials.retrieval.PassageIndex', wraps=PassageIndex) as index_class:
+            self.post_context(query='napoleon')
+            self.post_context(query='napoleon')
+            self.assertEqual(index_class.call_count, 1)
+
+            Document.objects.create(
+                name='Geography',
+                file=SimpleUploadedFile("test_geo.docx", build_docx(['Napoleon crossed the Alps.'])),
+                classroom=self.classroom
+            )
+            response = self.post_context(query='napoleon alps')
+            self.assertEqual(index_class.call_count, 2)
+        self.assertIn('Geography', [passage['name'] for passage in response.data['passages']])
+
+    def test_context_requires_classroom_owner(self):
+        other_user = CustomUser.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='otherpassword'
+        )
+        self.classroom.creator = other_user
+        self.classroom.save()
+        self.assertEqual(self.post_context(query='napoleon').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.post_context(query='napoleon', token_budget=0).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_split_passages(self):
+        from .retrieval import split_passages
+
+        passages = split_passages('short one\nshort two\n' + 'word ' * 100, target_tokens=10)
+        self.assertEqual(passages[0], 'short one\nshort two')
+        self.assertTrue(all(len(passage) <= 40 for passage in passages))
+
+    def tearDown(self):
+        from .retrieval import _indexes
+
+        _indexes.clear()
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+
+
+@override_settings(MEDIA_DEDUPLICATE=True)
+class ContentAddressedStorageTests(APITestCase):
+    def setUp(self):
+        # A media root of its own, so files left by other tests are not seen
+        self.media_root = tempfile.mkdtemp()
+        media_settings = self.settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+
+    def create_document(self, name, content):
+        return Document.objects.create(
+            name=name, file=SimpleUploadedFile(name, content), classroom=self.classroom
+        )
+
+    def test_duplicate_uploads_share_one_blob(self):
+        from common.models import StoredBlob
+
+        first = self.create_document('test_syllabus.pdf', b'%PDF-1.4 same syllabus')
+        second = self.create_document('test_syllabus.pdf', b'%PDF-1.4 same syllabus')
+
+        self.assertNotEqual(first.file.name, second.file.name)
+        self.assertTrue(os.path.samefile(first.file.path, second.file.path))
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        with second.file.open('rb') as file_obj:
+            self.assertEqual(file_obj.read(), b'%PDF-1.4 same syllabus')
+
+    def test_blob_removed_with_last_reference(self):
+        from .media_gc import sweep_deleted_files
+        from common.models import StoredBlob
+        from common.storage import blob_name_for
+
+        first = self.create_document('test_a.pdf', b'%PDF-1.4 shared')
+        second = self.create_document('test_b.pdf', b'%PDF-1.4 shared')
+        blob = StoredBlob.objects.get()
+        blob_path = first.file.storage.path(blob_name_for(blob.sha256))
+
+        first.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep_deleted_files()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(blob_path))
+
+        second.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep_deleted_files()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(os.path.exists(blob_path))
+
+    def test_files_are_kept_when_the_deletion_rolls_back(self):
+        from django.db import transaction
+        from common.models import StoredBlob, StoredFile
+
+        document = self.create_document('test_rollback.pdf', b'%PDF-1.4 rollback')
+        storage = document.file.storage
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    storage.delete(document.file.name)
+                    raise RuntimeError('Rolled back')
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertTrue(StoredFile.objects.filter(name=document.file.name).exists())
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        with document.file.open('rb') as file_obj:
+            self.assertEqual(file_obj.read(), b'%PDF-1.4 rollback')
+
+    def test_duplicate_upload_reuses_extraction(self):
+        from unittest import mock
+        from .extraction import get_document_text
+
+        content = build_docx(['Shared handout'])
+        first = self.create_document('test_first.docx', content)
+        second = self.create_document('test_second.docx', content)
+        get_document_text(first)
+
+        with mock.patch('materials.extraction.extract_file') as parser:
+            self.assertEqual(get_document_text(second), 'Shared handout\n')
+            parser.assert_not_called()
+
+    def test_dedup_media_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.files.storage import default_storage
+        from common.models import StoredBlob, StoredFile
+
+        names = []
+        for index in range(2):
+            name = default_storage.save(f'documents/test_legacy_{index}.pdf', SimpleUploadedFile('x', b'%PDF legacy'))
+            names.append(name)
+            Document.objects.bulk_create([Document(name=f'Legacy {index}', file=name, classroom=self.classroom)])
+
+        output = StringIO()
+        call_command('dedup_media', stdout=output)
+        self.assertIn('2 files: 1 duplicates', output.getvalue())
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+        self.assertEqual(set(StoredFile.objects.values_list('name', flat=True)), set(names))
+        self.assertTrue(os.path.samefile(default_storage.path(names[0]), default_storage.path(names[1])))
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+
+
+class FileServingTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+        self.content = bytes(range(256)) * 40
+        self.document = Document.objects.create(
+            name='Textbook', file=SimpleUploadedFile('test_textbook.pdf', self.content),
+            classroom=self.classroom
+        )
+        self.url = reverse('materials-download-file', args=[self.document.id])
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10240-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_etag_and_conditional_requests(self):
+        import hashlib
+
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(etag, f'"{hashlib.sha256(self.content).hexdigest()}"')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # A stale If-Range sends the whole file instead of a partial one
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_SENDFILE_URL='/protected-media/')
+    def test_sendfile_delegation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.document.file.name)
+        self.assertEqual(response.content, b'')
+
+    def test_other_users_cannot_download(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+
+
+class ChunkedUploadTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+        self.content = b'%PDF-1.4\n' + bytes(range(256)) * 100
+
+    def start(self, **overrides):
+        payload = {
+            'classroom': self.classroom.id, 'name': 'Slides',
+            'filename': 'test_slides.pdf', 'size': len(self.content),
+        }
+        payload.update(overrides)
+        return self.client.post(reverse('material-uploads-list'), payload, format='json')
+
+    def put_chunk(self, session_id, start, end):
+        return self.client.put(
+            reverse('material-uploads-detail', args=[session_id]),
+            data=self.content[start:end + 1], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}'
+        )
+
+    def test_upload_in_chunks_and_finalize(self):
+        import hashlib
+
+        session_id = self.start().data['id']
+        self.assertEqual(self.put_chunk(session_id, 0, 9999).data['offset'], 10000)
+        # A repeated chunk is rejected with the offset to resume from
+        response = self.put_chunk(session_id, 0, 9999)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 10000)
+
+        status_response = self.client.get(reverse('material-uploads-detail', args=[session_id]))
+        self.assertEqual(status_response.data['offset'], 10000)
+        self.put_chunk(session_id, 10000, len(self.content) - 1)
+
+        digest = hashlib.sha256(self.content).hexdigest()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('material-uploads-finalize', args=[session_id]), {'sha256': digest}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(id=response.data['id'])
+        self.assertEqual(document.content_hash, digest)
+        with document.file.open('rb') as file_obj:
+            self.assertEqual(file_obj.read(), self.content)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_finalize_rehashes_when_running_hash_is_lost(self):
+        from . import uploads
+
+        session_id = self.start().data['id']
+        self.put_chunk(session_id, 0, len(self.content) - 1)
+        uploads._hashers.clear()
+        response = self.client.post(reverse('material-uploads-finalize', args=[session_id]), {'sha256': 'bad'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_incomplete_upload_cannot_be_finalized(self):
+        session_id = self.start().data['id']
+        self.put_chunk(session_id, 0, 99)
+        response = self.client.post(reverse('material-uploads-finalize', args=[session_id]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['offset'], 100)
+
+    def test_session_checks(self):
+        self.assertEqual(self.start(filename='test_virus.exe').status_code, 400)
+
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x')
+        foreign = Classroom.objects.create(
+            name='Other', academic_course='Course', description='Desc', academic_year='2023-2024', creator=other
+        )
+        self.assertEqual(self.start(classroom=foreign.id).status_code, 403)
+
+        with override_settings(MAX_FILES_PER_CLASSROOM=0):
+            self.assertEqual(self.start().status_code, 400)
+
+        session_id = self.start().data['id']
+        self.client.force_authenticate(other)
+        self.assertEqual(self.put_chunk(session_id, 0, 99).status_code, 404)
+
+    def test_empty_upload_is_rejected(self):
+        response = self.start(size=0)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('size', response.data)
+
+    def test_chunk_is_rejected_while_another_is_received(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        session_id = self.start().data['id']
+        UploadSession.objects.filter(id=session_id).update(receiving_since=timezone.now())
+        response = self.put_chunk(session_id, 0, 99)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 0)
+
+        # A claim nobody finished in time is taken over
+        UploadSession.objects.filter(id=session_id).update(receiving_since=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.put_chunk(session_id, 0, 99).data['offset'], 100)
+        self.assertIsNone(UploadSession.objects.get(id=session_id).receiving_since)
+
+    def test_finalize_without_part_file(self):
+        session_id = self.start().data['id']
+        self.put_chunk(session_id, 0, len(self.content) - 1)
+        os.remove(UploadSession.objects.get(id=session_id).part_path)
+
+        response = self.client.post(reverse('material-uploads-finalize', args=[session_id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Document.objects.exists())
+
+    def test_abandon_upload(self):
+        session_id = self.start().data['id']
+        self.put_chunk(session_id, 0, 99)
+        part_path = UploadSession.objects.get(id=session_id).part_path
+        self.assertTrue(os.path.exists(part_path))
+
+        self.client.delete(reverse('material-uploads-detail', args=[session_id]))
+        self.assertFalse(os.path.exists(part_path))
+        self.assertFalse(UploadSession.objects.exists())
+
+    def tearDown(self):
+        from .uploads import discard_upload
+
+        for session in UploadSession.objects.all():
+            discard_upload(session)
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+
+
+class MediaGarbageCollectionTests(APITestCase):
+    def setUp(self):
+        # A media root of its own, so files left by other tests are not seen
+        self.media_root = tempfile.mkdtemp()
+        media_settings = self.settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+
+    def create_document(self, name, content):
+        return Document.objects.create(
+            name=name, file=SimpleUploadedFile(name, content), classroom=self.classroom
+        )
+
+    def test_cascade_delete_queues_files(self):
+        from .models import PendingFileDeletion
+
+        paths = [self.create_document(f'test_cascade_{i}.pdf', b'%PDF-1.4 ' + bytes([i])).file.path for i in range(3)]
+        self.classroom.delete()
+
+        self.assertEqual(PendingFileDeletion.objects.count(), 3)
+        # Nothing is removed inside the request
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(sweep_deleted_files(batch_size=2), (3, 0))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertFalse(PendingFileDeletion.objects.exists())
+
+    def test_replaced_file_is_queued(self):
+        document = self.create_document('test_original.pdf', b'%PDF-1.4 original')
+        old_path = document.file.path
+        document.file = SimpleUploadedFile('test_replacement.pdf', b'%PDF-1.4 replacement')
+        document.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep_deleted_files()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(document.file.path))
+
+    def test_reused_name_is_kept(self):
+        from .models import PendingFileDeletion
+
+        document = self.create_document('test_reused.pdf', b'%PDF-1.4 reused')
+        PendingFileDeletion.objects.create(name=document.file.name)
+        self.assertEqual(sweep_deleted_files(), (0, 0))
+        self.assertTrue(os.path.exists(document.file.path))
+
+    def test_reconcile_finds_orphans(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.files.storage import default_storage
+
+        kept = self.create_document('test_kept.pdf', b'%PDF-1.4 kept')
+        orphan = default_storage.save('documents/test_orphan.pdf', SimpleUploadedFile('x', b'orphan'))
+        orphan_path = default_storage.path(orphan)
+
+        output = StringIO()
+        call_command('sweep_media', '--reconcile', '--grace-seconds=0', '--dry-run', stdout=output)
+        self.assertIn('Found 1 orphan', output.getvalue())
+        self.assertTrue(os.path.exists(orphan_path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('sweep_media', '--reconcile', '--grace-seconds=0', stdout=StringIO())
+        self.assertFalse(os.path.exists(orphan_path))
+        self.assertTrue(os.path.exists(kept.file.path))
+        with kept.file.open('rb') as file_obj:
+            self.assertEqual(file_obj.read(), b'%PDF-1.4 kept')
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+        sweep_deleted_files()
+
+
+class BulkUploadTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+        self.tag = Tag.objects.create(name='Unit1', creator=self.user)
+        self.url = reverse('materials-bulk-upload')
+
+    def files(self, count):
+        return [SimpleUploadedFile(f"test_bulk_{i}.pdf", b"%PDF-1.4 bulk " + bytes([i])) for i in range(count)]
+
+    def test_bulk_upload_creates_documents_and_tags(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(self.url, {
+                'classroom': self.classroom.id, 'files': self.files(3),
+                'names': ['First', 'Second'], 'tag_ids': [self.tag.id],
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [201, 201, 201])
+        self.assertEqual([result['name'] for result in results], ['First', 'Second', 'test_bulk_2'])
+        self.assertEqual(self.classroom.documents.count(), 3)
+        self.assertEqual(Document.tags.through.objects.filter(tag=self.tag).count(), 3)
+        # Every document is queued for processing
+        self.assertEqual(len(callbacks), 3)
+        document = Document.objects.get(id=results[0]['id'])
+        self.assertTrue(document.content_hash)
+        self.assertEqual(document.mime_type, 'application/pdf')
+
+    def test_invalid_files_are_reported_per_file(self):
+        response = self.client.post(self.url, {
+            'classroom': self.classroom.id,
+            'files': [SimpleUploadedFile("test_good.pdf", b"%PDF-1.4 good"),
+                      SimpleUploadedFile("test_bad.exe", b"MZ"),
+                      SimpleUploadedFile("test_fake.pdf", b"not a pdf")],
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 400, 400])
+        self.assertEqual(self.classroom.documents.count(), 1)
+
+    def test_batch_checked_against_classroom_limit(self):
+        with self.settings(MAX_FILES_PER_CLASSROOM=2):
+            response = self.client.post(
+                self.url, {'classroom': self.classroom.id, 'files': self.files(3)}, format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('room for 2 more', response.data['error'])
+        self.assertFalse(Document.objects.exists())
+
+    def test_bulk_upload_requires_ownership(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x')
+        self.client.force_authenticate(other)
+        response = self.client.post(
+            self.url, {'classroom': self.classroom.id, 'files': self.files(1)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+        sweep_deleted_files()
+
+
+@override_settings(MEDIA_COMPRESSION='gzip')
+class CompressedStorageTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+        self.text = ('Línea de apuntes sobre la célula.\n' * 200).encode('utf-8')
+        self.document = Document.objects.create(
+            name='Notes', file=SimpleUploadedFile('test_notes.md', self.text), classroom=self.classroom
+        )
+
+    def test_text_files_are_compressed_at_rest(self):
+        import hashlib
+        from .extraction import compute_file_hash, get_document_text
+
+        with open(self.document.file.path, 'rb') as raw:
+            stored = raw.read()
+        self.assertTrue(stored.startswith(b'\x1f\x8b'))
+        self.assertLess(len(stored), len(self.text) / 5)
+
+        # Opening through the storage gives back the original bytes, every time
+        for _ in range(2):
+            with self.document.file.open('rb') as file_obj:
+                self.assertEqual(file_obj.read(), self.text)
+        self.assertEqual(compute_file_hash(self.document.file), hashlib.sha256(self.text).hexdigest())
+        self.assertEqual(get_document_text(self.document), self.text.decode('utf-8'))
+
+    def test_blobs_are_keyed_by_the_original_bytes(self):
+        from common.models import StoredFile
+        from .extraction import compute_file_hash
+
+        blob = StoredFile.objects.get(name=self.document.file.name).blob
+        self.assertEqual(blob.sha256, compute_file_hash(self.document.file))
+        self.assertEqual(blob.size, len(self.text))
+
+        # The same file stored without compression shares the blob
+        with self.settings(MEDIA_COMPRESSION=None):
+            copy = Document.objects.create(
+                name='Copy', file=SimpleUploadedFile('test_copy.md', self.text), classroom=self.classroom
+            )
+        self.assertEqual(StoredFile.objects.get(name=copy.file.name).blob, blob)
+        self.assertTrue(os.path.samefile(copy.file.path, self.document.file.path))
+        with copy.file.open('rb') as file_obj:
+            self.assertEqual(file_obj.read(), self.text)
+
+    def test_pdfs_are_stored_as_sent(self):
+        document = Document.objects.create(
+            name='PDF', file=SimpleUploadedFile('test_plain.pdf', build_pdf(['Page'])), classroom=self.classroom
+        )
+        with open(document.file.path, 'rb') as raw:
+            self.assertTrue(raw.read().startswith(b'%PDF'))
+
+    def test_served_with_content_encoding_passthrough(self):
+        import gzip
+
+        url = reverse('materials-download-file', args=[self.document.id])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].endswith('-gzip"'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.text)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='br, gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.text)
+
+    def test_media_urls_are_decoded(self):
+        from django.http import Http404
+        from django.test import RequestFactory
+        from .serving import media_view
+
+        request = RequestFactory().get(self.document.file.url)
+        response = media_view(request, self.document.file.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.text)
+
+        for path in ['blobs/00/00/missing', 'documents/../backend/settings.py']:
+            with self.assertRaises(Http404):
+                media_view(request, path)
+
+    def test_media_urls_are_not_routed_outside_debug(self):
+        self.assertEqual(self.client.get(self.document.file.url).status_code, 404)
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+        Classroom.objects.all().delete()
+        sweep_deleted_files()
+
+
+@override_settings(SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+class SingleFlightTests(APITestCase):
+    def test_concurrent_calls_share_one_run(self):
+        import threading
+        import time
+        from common.singleflight import SingleFlight
+
+        flight = SingleFlight('test')
+        runs = []
+
+        def parse():
+            runs.append(1)
+            time.sleep(0.2)
+            return 'text'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('handout', parse))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['text'] * 5)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(flight.stats(), {'leaders': 1, 'followers': 4, 'remote_hits': 0, 'in_flight': 0})
+
+        # Once finished, the next call runs again
+        self.assertEqual(flight.do('handout', parse), 'text')
+        self.assertEqual(len(runs), 2)
+
+    @override_settings(SINGLE_FLIGHT_CACHE='shared')
+    def test_waits_on_another_workers_lease(self):
+        from django.core.cache import caches
+        from common.singleflight import SingleFlight
+
+        flight = SingleFlight('test')
+        cache = caches['shared']
+
+        def parse():
+            raise AssertionError('Parsed while another worker held the lease')
+
+        cache.add('single-flight:test:handout', 'other worker', 60)
+        stored = iter([None, None, 'text'])
+        self.assertEqual(flight.do('handout', parse, lookup=lambda: next(stored)), 'text')
+        self.assertEqual(flight.stats()['remote_hits'], 1)
+
+        # A lease left by a dead worker expires and the call runs here
+        cache.set('single-flight:test:handout', 'dead worker', 1)
+        self.assertEqual(flight.do('handout', lambda: 'fresh', lookup=lambda: None), 'fresh')
+        self.assertIsNone(cache.get('single-flight:test:handout'))
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'missing_cache_table'},
+    }, SINGLE_FLIGHT_CACHE='shared')
+    def test_missing_cache_table_leaves_the_transaction_usable(self):
+        from django.db import transaction
+        from common.singleflight import SingleFlight
+
+        flight = SingleFlight('test')
+        with transaction.atomic(), self.assertLogs('common.singleflight', 'WARNING'):
+            # The failed lease queries must not abort the surrounding transaction
+            self.assertEqual(flight.do('handout', Document.objects.count, lookup=lambda: None), 0)
+            self.assertEqual(Document.objects.count(), 0)
@@ -0,0 +1,75 @@
+"""
+Upload handlers that inspect every uploaded file in the same pass Django
+uses to receive it: the SHA-256, the real type sniffed from the first bytes
+and the size are attached to the uploaded file as sha256, sniffed_type and
+size, so validation and storage never have to read it back from disk.
+
+Files over MATERIALS_UPLOAD_MAX_SIZE are skipped as soon as they cross the
+limit. Django then leaves them out of request.FILES, so oversized_uploads
+tells callers which files were dropped and why.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler, SkipFile, TemporaryFileUploadHandler
+)
+
+from common.filetypes import SNIFF_BYTES, sniff_mime_type
+
+
+def too_large_message():
+    return f"Files larger than {settings.MATERIALS_UPLOAD_MAX_SIZE} bytes are not accepted."
+
+
+def oversized_uploads(request):
+    """(field name, file name) of every file of request skipped for its size."""
+    return [upload for handler in request.upload_handlers for upload in getattr(handler, 'oversized', [])]
+
+
+class IngestMixin:
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.oversized = []
+
+    def new_file(self, *args, **kwargs):
+        # Set up first: the memory handler stops the chain from new_file
+        self.digest = hashlib.sha256()
+        self.head = b''
+        self.received = 0
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is not None:
+            # Passed on to the next handler, which inspects it instead
+            return remaining
+        self.received += len(raw_data)
+        if self.received > settings.MATERIALS_UPLOAD_MAX_SIZE:
+            # Stop before an oversized file is received any further
+            self.oversized.append((self.field_name, self.file_name))
+            raise SkipFile()
+        self.digest.update(raw_data)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+        return None
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is None:
+            # Another handler in the chain produced the file
+            return None
+        uploaded.sha256 = self.digest.hexdigest()
+        # Only zip containers look past the head, through the central directory
+        uploaded.sniffed_type = sniff_mime_type(self.head, uploaded.name or '', uploaded.file)
+        uploaded.file.seek(0)
+        return uploaded
+
+
+class IngestMemoryFileUploadHandler(IngestMixin, MemoryFileUploadHandler):
+    pass
+
+
+class IngestTemporaryFileUploadHandler(IngestMixin, TemporaryFileUploadHandler):
+    pass
@@ -0,0 +1,167 @@
+"""
+Resumable chunked uploads.
+
+A client creates an UploadSession, PUTs the file in consecutive chunks and
+finalizes it. Chunks are streamed from the request straight into a part file
+under MEDIA_ROOT/uploads and hashed as they arrive, so neither the file nor a
+multipart parse is ever held in memory. A dropped chunk keeps the bytes that
+did arrive; the client asks for the session offset and resumes from there.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from .extraction import compute_file_hash
+
+CHUNK_SIZE = 64 * 1024
+
+# A chunk still being received after this long is assumed to be dead
+CHUNK_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+# Running SHA-256 per session, valid while its offset matches the session's.
+# Sessions resumed on another worker process are re-hashed on finalize.
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+MAX_TRACKED_HASHERS = 256
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadOffsetMismatch(UploadError):
+    def __init__(self, offset, message=None):
+        super().__init__(message or f'Expected a chunk starting at byte {offset}.')
+        self.offset = offset
+
+
+class UploadedPart(File):
+    """A completed part file, moved or linked into storage instead of copied."""
+
+    def __init__(self, path, name, sha256):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def _take_hasher(session):
+    with _hashers_lock:
+        offset, hasher = _hashers.pop(session.pk, (None, None))
+    if offset == session.offset:
+        return hasher
+    if session.offset == 0:
+        return hashlib.sha256()
+    return None
+
+
+def _keep_hasher(session, hasher):
+    with _hashers_lock:
+        _hashers[session.pk] = (session.offset, hasher)
+        while len(_hashers) > MAX_TRACKED_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def parse_content_range(header, total):
+    """Parse 'bytes start-end/total' into (start, length)."""
+    try:
+        unit, spec = header.split(' ', 1)
+        byte_range, declared_total = spec.split('/', 1)
+        start, end = (int(value) for value in byte_range.split('-', 1))
+    except ValueError:
+        raise UploadError('Content-Range must look like "bytes <start>-<end>/<total>".')
+    if unit != 'bytes' or end < start or declared_total not in ('*', str(total)):
+        raise UploadError('Content-Range does not match this upload.')
+    return start, end - start + 1
+
+
+def _claim_chunk(session, start, length):
+    """
+    Check a chunk against the session and mark the session as receiving it.
+    The row lock is only held for this, not while the chunk is read.
+    """
+    model = type(session)
+    with transaction.atomic():
+        session = model.objects.select_for_update().get(pk=session.pk)
+        if start != session.offset:
+            raise UploadOffsetMismatch(session.offset)
+        if start + length > session.size:
+            raise UploadError('The chunk goes past the declared file size.')
+        now = timezone.now()
+        if session.receiving_since is not None and session.receiving_since > now - CHUNK_CLAIM_TIMEOUT:
+            raise UploadOffsetMismatch(session.offset, 'Another chunk of this upload is still being received.')
+        session.receiving_since = now
+        model.objects.filter(pk=session.pk).update(receiving_since=now)
+    return session
+
+
+def append_chunk(session, stream, start, length):
+    """Append length bytes read from stream at offset start. Returns the new offset."""
+    session = _claim_chunk(session, start, length)
+    claimed_at = session.receiving_since
+    interrupted = None
+    try:
+        hasher = _take_hasher(session)
+        os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+        received = 0
+        with open(session.part_path, 'ab') as part:
+            # Drop anything left over from a write that never got recorded
+            part.truncate(start)
+            try:
+                while received < length:
+                    chunk = stream.read(min(CHUNK_SIZE, length - received))
+                    if not chunk:
+                        break
+                    part.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    received += len(chunk)
+            except (OSError, UnreadablePostError) as e:
+                # Keep whatever arrived so the client can resume after it
+                interrupted = e
+        session.offset = start + received
+    finally:
+        # Advance the offset only if the claim was not taken over meanwhile
+        recorded = type(session).objects.filter(pk=session.pk, receiving_since=claimed_at).update(
+            offset=session.offset, receiving_since=None, updated_at=timezone.now()
+        )
+    if not recorded:
+        session.refresh_from_db()
+        raise UploadOffsetMismatch(session.offset, 'The chunk took too long and was superseded.')
+    if hasher is not None:
+        _keep_hasher(session, hasher)
+
+    if interrupted is not None:
+        raise UploadError(f'The upload was interrupted at byte {session.offset}: {interrupted}')
+    return session.offset
+
+
+def part_digest(session):
+    hasher = _take_hasher(session)
+    if hasher is not None:
+        return hasher.hexdigest()
+    with open(session.part_path, 'rb') as part:
+        return compute_file_hash(File(part))
+
+
+def open_completed_part(session):
+    if not os.path.exists(session.part_path):
+        raise UploadError('The uploaded data is missing; start the upload again.')
+    return UploadedPart(session.part_path, session.filename, part_digest(session))
+
+
+def discard_upload(session):
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+    if os.path.exists(session.part_path):
+        os.unlink(session.part_path)
+    session.delete()
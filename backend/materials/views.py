@@ -1,16 +1,93 @@
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.decorators import action, permission_classes
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
 from classrooms.models import Classroom
-from .models import Document
-from .serializers import DocumentSerializer
-import pdfplumber
-import docx
-from googletrans import Translator
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
+from tags.models import Tag
+from common.filetypes import validate_file_signature
+from .models import Document, UploadSession
+from .serializers import DocumentSerializer, DocumentProcessingSerializer, UploadSessionSerializer
+from .extraction import (
+    UnsupportedFileType, extract_file_text, get_document_structure, get_document_text, get_documents_text,
+    get_extension, get_legacy_docx_text, is_supported, iter_document_chunks
+)
+from .structure import estimate_tokens, render_sections, select_sections
+from .processing import schedule_document_processing
+from .search import search_documents
+from .retrieval import build_context
+from .serving import serve_file
+from .media_gc import enqueue_file_deletion
+from .upload_handlers import oversized_uploads, too_large_message
+from .uploads import (
+    UploadError, UploadOffsetMismatch, append_chunk, discard_upload, open_completed_part, parse_content_range
+)
+from .models import DocumentSearchEntry
+from translations.cache import translation_cache
+from translations.client import translator_client
+from translations.services import (
+    error_response as translation_error_response, response_data as translation_response_data, translate,
+    translate_segments, translation_flight,
+)
+from django.http import StreamingHttpResponse
+from django.db import transaction
+import json
+import os
+import tempfile
+
+
+def ndjson_text_stream(chunks):
+    """Serialize text chunks as newline-delimited JSON, ending with a summary line."""
+    count = 0
+    try:
+        for chunk in chunks:
+            yield json.dumps({'index': count, 'text': chunk}) + "\n"
+            count += 1
+    except Exception as e:
+        # Headers are already sent, so errors can only be reported in-band
+        yield json.dumps({'error': str(e)}) + "\n"
+        return
+    yield json.dumps({'done': True, 'chunks': count}) + "\n"
+
+
+def streaming_text_response(chunks):
+    response = StreamingHttpResponse(ndjson_text_stream(chunks), content_type='application/x-ndjson')
+    # Let chunks through proxies such as nginx as soon as they are produced
+    response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def classroom_upload_error(user, classroom_id, incoming=1):
+    """Return an error Response if user may not add incoming files to the classroom, else None."""
+    try:
+        classroom = Classroom.objects.get(id=classroom_id)
+    except ObjectDoesNotExist:
+        return Response(
+            {"error": "Classroom does not exist."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if classroom.creator != user:
+        return Response(
+            {"error": "You don't have permission to add documents to this classroom."},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    existing = classroom.documents.count()
+    if existing >= settings.MAX_FILES_PER_CLASSROOM:
+        return Response(
+            {"error": f"This classroom already has the maximum number of files ({settings.MAX_FILES_PER_CLASSROOM})."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if existing + incoming > settings.MAX_FILES_PER_CLASSROOM:
+        return Response(
+            {"error": f"This classroom only has room for {settings.MAX_FILES_PER_CLASSROOM - existing} more files."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return None
 
 
 class DocumentViewSet(viewsets.ModelViewSet):
@@ -39,27 +116,37 @@ class DocumentViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         classroom_id = request.data.get('classroom')
         if classroom_id:
-            try:
-                classroom = Classroom.objects.get(id=classroom_id)
-
-                if classroom.creator != request.user:
-                    return Response(
-                        {"error": "You don't have permission to add documents to this classroom."},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
-
-                if classroom.documents.count() >= settings.MAX_FILES_PER_CLASSROOM:
-                    return Response(
-                        {"error": f"This classroom already has the maximum number of files ({settings.MAX_FILES_PER_CLASSROOM})."},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except ObjectDoesNotExist:
-                return Response(
-                    {"error": "Classroom does not exist."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            error = classroom_upload_error(request.user, classroom_id)
+            if error:
+                return error
         return super().create(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        document = serializer.save()
+        # Hashing, sniffing and extraction run outside the request cycle
+        schedule_document_processing(document)
+
+    def perform_update(self, serializer):
+        document = serializer.save()
+        if 'file' in serializer.validated_data:
+            schedule_document_processing(document)
+        elif 'name' in serializer.validated_data:
+            DocumentSearchEntry.objects.filter(document=document).update(name=document.name)
+
+    @action(detail=True, methods=['get'], url_path='processing-status')
+    def processing_status(self, request, pk=None):
+        document = self.get_object()
+        serializer = DocumentProcessingSerializer(document)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='file')
+    def download_file(self, request, pk=None):
+        document = self.get_object()
+        return serve_file(
+            request, document.file, content_hash=document.content_hash,
+            content_type=document.mime_type or None
+        )
+
     def update_tags(self, request, pk=None):
         document = self.get_object()
         tag_ids = request.data.get('tag_ids', [])
@@ -90,85 +177,103 @@ class DocumentViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'], url_path='extract-text')
     def extract_text_from_uploaded_file(self, request):
-        """Extract text from an uploaded DOCX file"""
+        """Extract text from an uploaded file of any supported type"""
         if 'file' not in request.FILES:
             return Response({'error': 'No file uploaded'}, status=400)
         
         file = request.FILES['file']
+        extension = get_extension(file.name)
         
-        # Check if it's a DOCX
-        if not file.name.lower().endswith('.docx'):
-            return Response({'error': 'Only DOCX files are supported'}, status=400)
+        # Check if it's a supported type
+        if not is_supported(extension):
+            return Response({'error': f'Text extraction is not supported for .{extension} files'}, status=400)
         
+        temp_file_path = None
         try:
             # Create a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{extension}') as temp_file:
                 for chunk in file.chunks():
                     temp_file.write(chunk)
                 temp_file_path = temp_file.name
             
-            # Extract text using python-docx
-            doc = docx.Document(temp_file_path)
-            text = ""
-            
-            # Extract text from paragraphs
-            for para in doc.paragraphs:
-                if para.text:
-                    text += para.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
-                text += "\n"
-            
-            # Clean up the temporary file
-            os.unlink(temp_file_path)
-            
+            text = extract_file_text(temp_file_path, pages=request.data.get('pages'))
             return Response({'text': text})
         
+        except (UnsupportedFileType, ValueError) as e:
+            return Response({'error': str(e)}, status=400)
         except Exception as e:
             return Response({'error': str(e)}, status=500)
+        finally:
+            # Clean up the temporary file
+            if temp_file_path:
+                os.unlink(temp_file_path)
 
     @action(detail=True, methods=['get'], url_path='extract-text')
     def extract_text_from_material(self, request, pk=None):
-        """Extract text from a material that's already in the database"""
+        """
+        Extract text from a material that's already in the database.
+        With ?stream=1 the text is sent as newline-delimited JSON while it is parsed.
+        """
         try:
             # Get the material
             material = self.get_object()
-            
-            # Check if it's a DOCX
-            if not material.file.name.lower().endswith('.docx'):
-                return Response({'error': 'Only DOCX files are supported'}, status=400)
-            
-            # Extract text using python-docx
-            doc = docx.Document(material.file.path)
-            text = ""
-            
-            # Extract text from paragraphs
-            for para in doc.paragraphs:
-                if para.text:
-                    text += para.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
-                text += "\n"
-            
+            pages = request.query_params.get('pages')
+
+            if request.query_params.get('stream') in ('1', 'true'):
+                return streaming_text_response(iter_document_chunks(material, pages=pages))
+
+            text = get_document_text(material, pages=pages)
             return Response({'text': text})
-        
+
+        except (UnsupportedFileType, ValueError) as e:
+            return Response({'error': str(e)}, status=400)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+
+    @action(detail=True, methods=['get'], url_path='extract-structure')
+    def extract_structure(self, request, pk=None):
+        """
+        Return the sections of a material: heading, level, paragraph and table
+        blocks, and character and token estimates per section.
+
+        Query parameters: sections (1-based ranges such as "2-4,7"), heading
+        (case-insensitive substring of the section heading) and outline=1 to
+        list the sections without their blocks. The selected sections are also
+        returned as plain text with their total token estimate.
+        """
+        try:
+            material = self.get_object()
+            sections = get_document_structure(material)
+            selected = select_sections(
+                sections,
+                indexes=request.query_params.get('sections'),
+                heading=request.query_params.get('heading'),
+            )
+            outline = request.query_params.get('outline') in ('1', 'true')
+
+            results = []
+            for index, section in selected:
+                item = {'index': index, **section}
+                if outline:
+                    del item['blocks']
+                results.append(item)
+            text = render_sections([section for _, section in selected])
+            return Response({
+                'sections': results,
+                'section_count': len(sections),
+                'text': text,
+                'tokens': estimate_tokens(text),
+            })
+
+        except (UnsupportedFileType, ValueError) as e:
+            return Response({'error': str(e)}, status=400)
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
 
     @action(detail=False, methods=['post'], url_path='extract-text-from-url')
     def extract_text_from_url(self, request):
-        """Extract text from a DOCX file URL."""
+        """Extract text from a material file URL."""
         file_url = request.data.get('file_url')
         material_id = request.data.get('material_id')
         
@@ -213,37 +318,228 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 return Response({"error": "You don't have permission to access this file"}, 
                               status=status.HTTP_403_FORBIDDEN)
             
-            # Check if it's a DOCX file
-            if not document.file.name.lower().endswith('.docx'):
-                return Response({"error": "Only DOCX files are supported"}, 
-                              status=status.HTTP_400_BAD_REQUEST)
-            
-            # Get the file path
-            file_path = document.file.path
-            
-            # Extract text from DOCX
-            doc = docx.Document(file_path)
-            full_text = []
-            
-            # Extract text from paragraphs
-            for para in doc.paragraphs:
-                if para.text:
-                    full_text.append(para.text)
-                
-            # Also extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text:
-                            full_text.append(cell.text)
-            
-            return Response({"text": "\n".join(full_text)})
+            pages = request.data.get('pages')
+            if str(request.data.get('stream', '')).lower() in ('1', 'true'):
+                return streaming_text_response(iter_document_chunks(document, pages=pages))
+
+            if pages is None and get_extension(document.file.name) == 'docx':
+                # DOCX keeps the format this endpoint had before it handled other types
+                text = get_legacy_docx_text(document)
+            else:
+                text = get_document_text(document, pages=pages)
+            return Response({"text": text})
         
+        except (UnsupportedFileType, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Document.DoesNotExist:
             return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Full-text search over the name and text of the user's materials.
+
+        Query parameters: q (required), classroom_id, limit (default 20), offset.
+        Snippets are HTML-escaped text with matches in <mark> tags.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            classroom_id = request.query_params.get('classroom_id')
+            classroom_id = int(classroom_id) if classroom_id else None
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"error": "classroom_id, limit and offset must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = search_documents(request.user, query, classroom_id=classroom_id, limit=limit, offset=offset)
+        except NotImplementedError as e:
+            return Response({"error": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return Response({"results": results})
+
+    @action(detail=False, methods=['post'], url_path='context')
+    def build_prompt_context(self, request):
+        """
+        Return the passages of a classroom's materials most relevant to a topic,
+        limited to a token budget, ready to paste into an LLM prompt.
+
+        Expected request body:
+        {
+            "classroom_id": 1,
+            "query": "Topic of the exam",
+            "token_budget": 2000,
+            "material_ids": [1, 2]  (optional, restricts the materials used)
+        }
+        """
+        classroom_id = request.data.get('classroom_id')
+        query = (request.data.get('query') or '').strip()
+        token_budget = request.data.get('token_budget')
+        material_ids = request.data.get('material_ids')
+
+        if not classroom_id or not query:
+            return Response({"error": "classroom_id and query are required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(token_budget, int) or token_budget <= 0:
+            return Response({"error": "token_budget must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if material_ids is not None and not isinstance(material_ids, list):
+            return Response({"error": "material_ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            classroom = Classroom.objects.get(id=classroom_id)
+        except (ObjectDoesNotExist, ValueError):
+            return Response({"error": "Classroom does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        if classroom.creator != request.user:
+            return Response({"error": "You don't have permission to access this classroom."},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        result = build_context(
+            classroom, query, token_budget,
+            material_ids=set(material_ids) if material_ids is not None else None,
+        )
+        return Response(result)
+
+    @action(detail=False, methods=['post'], url_path='extract-text-batch')
+    def extract_text_batch(self, request):
+        """
+        Extract the text of several materials in one request.
+
+        Expected request body:
+        {
+            "material_ids": [1, 2, 3]
+        }
+
+        Results keep the order of material_ids and report failures per item.
+        """
+        material_ids = request.data.get('material_ids')
+        if not isinstance(material_ids, list) or not material_ids:
+            return Response({"error": "material_ids must be a non-empty list"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        max_batch = getattr(settings, 'MATERIALS_BATCH_EXTRACTION_MAX', 50)
+        if len(material_ids) > max_batch:
+            return Response({"error": f"At most {max_batch} materials can be extracted at once"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not all(isinstance(material_id, int) for material_id in material_ids):
+            return Response({"error": "material_ids must contain integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # One query resolves every document together with its owner
+        documents = {
+            document.id: document
+            for document in Document.objects.filter(id__in=material_ids).select_related('classroom')
+        }
+        owned = [
+            document for document in documents.values()
+            if document.classroom.creator_id == request.user.id
+        ]
+        texts = get_documents_text(owned)
+
+        results = []
+        for material_id in material_ids:
+            document = documents.get(material_id)
+            if document is None:
+                results.append({"material_id": material_id, "error": "Document not found",
+                                "status": status.HTTP_404_NOT_FOUND})
+            elif document.classroom.creator_id != request.user.id:
+                results.append({"material_id": material_id, "error": "You don't have permission to access this file",
+                                "status": status.HTTP_403_FORBIDDEN})
+            elif isinstance(texts[material_id], UnsupportedFileType):
+                results.append({"material_id": material_id, "error": str(texts[material_id]),
+                                "status": status.HTTP_400_BAD_REQUEST})
+            elif isinstance(texts[material_id], Exception):
+                results.append({"material_id": material_id, "error": str(texts[material_id]),
+                                "status": status.HTTP_500_INTERNAL_SERVER_ERROR})
+            else:
+                results.append({"material_id": material_id, "name": document.name, "text": texts[material_id],
+                                "status": status.HTTP_200_OK})
+
+        return Response({"results": results})
+
+    @action(detail=False, methods=['post'], url_path='bulk-upload')
+    def bulk_upload(self, request):
+        """
+        Upload several materials to one classroom in a single request.
+
+        Expected multipart fields: classroom, files (repeated), optional names
+        (repeated, in the order of files) and tag_ids (repeated, applied to
+        every file). Ownership and the classroom limit are checked once for
+        the whole batch; valid files are created together and invalid ones
+        are reported per file.
+        """
+        files = request.FILES.getlist('files')
+        oversized = [name for field, name in oversized_uploads(request) if field == 'files']
+        if not files and not oversized:
+            return Response({"error": "No files were provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        classroom_id = request.data.get('classroom')
+        if not classroom_id:
+            return Response({"error": "classroom is required"}, status=status.HTTP_400_BAD_REQUEST)
+        error = classroom_upload_error(request.user, classroom_id, incoming=len(files))
+        if error:
+            return error
+
+        try:
+            tag_ids = [int(tag_id) for tag_id in request.data.getlist('tag_ids')]
+        except (TypeError, ValueError):
+            return Response({"error": "tag_ids must contain integers"}, status=status.HTTP_400_BAD_REQUEST)
+        missing_tags = set(tag_ids) - set(Tag.objects.filter(id__in=tag_ids).values_list('id', flat=True))
+        if missing_tags:
+            return Response({"error": f"Tags do not exist: {sorted(missing_tags)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        names = request.data.getlist('names')
+        fields = DocumentSerializer().fields
+        results = [
+            {"file": name, "errors": [too_large_message()], "status": status.HTTP_400_BAD_REQUEST}
+            for name in oversized
+        ]
+        documents = []
+        for index, upload in enumerate(files):
+            name = names[index] if index < len(names) else os.path.splitext(upload.name)[0][:30]
+            try:
+                name = fields['name'].run_validation(name)
+                fields['file'].run_validation(upload)
+            except ValidationError as e:
+                results.append({"file": upload.name, "errors": e.detail, "status": status.HTTP_400_BAD_REQUEST})
+                continue
+            # bulk_create skips Document.save, so the upload handlers' findings are copied here
+            documents.append(Document(
+                name=name, file=upload, classroom_id=classroom_id,
+                content_hash=getattr(upload, 'sha256', ''), mime_type=getattr(upload, 'sniffed_type', ''),
+            ))
+            results.append({"file": upload.name, "status": status.HTTP_201_CREATED})
+
+        if documents:
+            try:
+                with transaction.atomic():
+                    Document.objects.bulk_create(documents)
+                    Document.tags.through.objects.bulk_create([
+                        Document.tags.through(document_id=document.id, tag_id=tag_id)
+                        for document in documents for tag_id in tag_ids
+                    ])
+                    for document in documents:
+                        schedule_document_processing(document)
+            except Exception:
+                # The files were stored while inserting; nothing refers to them now
+                enqueue_file_deletion(*(document.file.name for document in documents if document.file._committed))
+                raise
+
+        created = iter(documents)
+        for result in results:
+            if result["status"] == status.HTTP_201_CREATED:
+                document = next(created)
+                result.update({"id": document.id, "name": document.name})
+        return Response(
+            {"results": results},
+            status=status.HTTP_201_CREATED if documents else status.HTTP_400_BAD_REQUEST
+        )
+
     @action(detail=False, methods=['post'], url_path='translate')
     def translate_text(self, request):
         """
@@ -255,6 +551,16 @@ class DocumentViewSet(viewsets.ModelViewSet):
             "src": "Source language code (optional)",
             "dest": "Destination language code (default: 'en')"
         }
+
+        Repeated translations are served from translations.cache without
+        calling the translator; "cached" in the response tells which. Calls
+        are bounded by TRANSLATION_TIMEOUT, and a backend that keeps failing
+        is answered with 503 at once until it recovers (translations.client).
+        src "auto" is resolved by a local language detector, whose guess is
+        returned as "detected_language" ("und" for languages it cannot tell)
+        and "detection_confidence", and text already in dest comes back
+        untranslated. With TRANSLATION_ASYNC_VIEW
+        the async translations.views.translate_view serves this URL instead.
         """
         text = request.data.get('text')
         src = request.data.get('src', 'auto')  # Default to auto-detection
@@ -267,38 +573,158 @@ class DocumentViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            # Use the synchronous version of the library
-            from googletrans import Translator
-            translator = Translator()
-            
-            # For newer versions of googletrans that use async
-            import asyncio
-            
-            # Create a function to run the translation in an event loop
-            async def translate_async():
-                return await translator.translate(text, src=src, dest=dest)
-            
-            # Run the async function in a new event loop
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(translate_async())
-            loop.close()
-            
-            response_data = {
-                'original_text': text,
-                'translated_text': result.text,
-                'src': result.src,
-                'dest': result.dest,
-                'pronunciation': getattr(result, 'pronunciation', None)
-            }
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+            result = translate(text, src=src, dest=dest)
+            return Response(translation_response_data(text, result), status=status.HTTP_200_OK)
             
         except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
-            print(f"Translation error: {error_details}")
+            data, status_code, headers = translation_error_response(e)
+            return Response(data, status=status_code, headers=headers)
+
+    @action(detail=False, methods=['post'], url_path='translate-batch')
+    def translate_batch(self, request):
+        """
+        Translate several text segments in one request.
+
+        Expected request body:
+        {
+            "segments": ["First paragraph", "Second paragraph", ...],
+            "src": "Source language code (optional)",
+            "dest": "Destination language code (default: 'en')"
+        }
+
+        Identical segments are translated once and distinct ones are sent
+        upstream concurrently. Results keep the order of segments and report
+        failures per item, including segments still untranslated after
+        TRANSLATION_BATCH_TIMEOUT seconds.
+        """
+        segments = request.data.get('segments')
+        src = request.data.get('src', 'auto')
+        dest = request.data.get('dest', 'en')
+
+        if not isinstance(segments, list) or not segments:
+            return Response({"error": "segments must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(segment, str) for segment in segments):
+            return Response({"error": "segments must contain strings"}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_segments = settings.TRANSLATION_BATCH_MAX
+        if len(segments) > max_segments:
+            return Response({"error": f"At most {max_segments} segments can be translated at once"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_chars = settings.TRANSLATION_SEGMENT_MAX_CHARS
+        if any(len(segment) > max_chars for segment in segments):
+            return Response({"error": f"Segments must be at most {max_chars} characters long"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            translated = translate_segments(segments, src=src, dest=dest, timeout=settings.TRANSLATION_BATCH_TIMEOUT)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        results = []
+        for segment, result in zip(segments, translated):
+            if 'error' in result:
+                results.append({"original_text": segment, "error": result['error']})
+            else:
+                results.append(translation_response_data(segment, result))
+        return Response({"results": results})
+
+    @action(detail=False, methods=['get'], url_path='translate/stats', permission_classes=[IsAdminUser])
+    def translation_cache_stats(self, request):
+        """
+        Hit and miss counters of this worker's translation cache, the latency
+        and circuit breaker state of its backends, and how many translations
+        were shared among identical concurrent requests (staff only).
+        """
+        return Response({
+            **translation_cache.stats(),
+            'upstream': translator_client.stats(),
+            'single_flight': translation_flight.stats(),
+        })
+
+
+class UploadSessionViewSet(viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads: POST creates a session, PUT sends the next
+    chunk with a Content-Range header, GET reports the offset to resume
+    from, POST finalize/ turns the completed file into a Document and
+    DELETE abandons the upload.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Fail early rather than after the whole file has been sent
+        error = classroom_upload_error(request.user, serializer.validated_data['classroom'].id)
+        if error:
+            return error
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def update(self, request, pk=None):
+        session = self.get_object()
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+            start, range_length = parse_content_range(request.META.get('HTTP_CONTENT_RANGE', ''), session.size)
+            if range_length != length:
+                raise UploadError('Content-Range and Content-Length disagree.')
+            # Read the raw body so the chunk is never parsed or buffered
+            offset = append_chunk(session, request.stream, start, length)
+        except UploadOffsetMismatch as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            session.refresh_from_db()
+            return Response({'error': str(e), 'offset': session.offset}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'id': session.id, 'offset': offset, 'size': session.size})
+
+    def destroy(self, request, pk=None):
+        discard_upload(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        if session.offset != session.size:
             return Response(
-                {"error": str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'The upload is not complete.', 'offset': session.offset},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        error = classroom_upload_error(request.user, session.classroom_id)
+        if error:
+            return error
+
+        tag_serializer = DocumentSerializer(data={'tag_ids': request.data.get('tag_ids', [])}, partial=True)
+        tag_serializer.is_valid(raise_exception=True)
+
+        try:
+            part = open_completed_part(session)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        try:
+            validate_file_signature(part)
+        except DjangoValidationError as e:
+            part.close()
+            return Response({'file': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        expected_hash = request.data.get('sha256')
+        if expected_hash and expected_hash.lower() != part.sha256:
+            part.close()
+            return Response(
+                {'error': 'The uploaded file does not match the given sha256.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            with transaction.atomic():
+                document = Document.objects.create(name=session.name, classroom=session.classroom, file=part)
+                document.tags.set(tag_serializer.validated_data.get('tag_ids', []))
+        finally:
+            part.close()
+        discard_upload(session)
+        schedule_document_processing(document)
+        return Response(DocumentSerializer(document).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.18 on 2026-10-18 07:27
+
+import django.core.validators
+from django.db import migrations, models
+import common.filetypes
+import common.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terms', '0004_alter_terms_content_alter_terms_pdf_content'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='terms',
+            name='content',
+            field=models.FileField(storage=common.storage.select_media_storage, upload_to='terms/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['md']), common.filetypes.validate_file_signature]),
+        ),
+        migrations.AlterField(
+            model_name='terms',
+            name='pdf_content',
+            field=models.FileField(blank=True, null=True, storage=common.storage.select_media_storage, upload_to='terms/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf']), common.filetypes.validate_file_signature]),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
 from django.core.validators import FileExtensionValidator
-import os
 from django.core.exceptions import ValidationError
 from django.conf import settings
+from common.filetypes import validate_file_signature
+from common.storage import select_media_storage
 
 
 class Terms(models.Model):
@@ -22,14 +23,18 @@ class Terms(models.Model):
     )
     content = models.FileField(
         upload_to='terms/',
+        storage=select_media_storage,
         validators=[
             FileExtensionValidator(allowed_extensions=['md']),
+            validate_file_signature,
         ]
     )
     pdf_content = models.FileField(
         upload_to='terms/',
+        storage=select_media_storage,
         validators=[
             FileExtensionValidator(allowed_extensions=['pdf']),
+            validate_file_signature,
         ],
         null=True,
         blank=True
@@ -56,15 +61,13 @@ class Terms(models.Model):
         if self.content:
             if not self.content.name.endswith('.md'):
                 raise ValidationError("The content file must be a markdown (.md) file.")
-            if hasattr(self.content.file, 'content_type') and self.content.file.content_type != "text/markdown":
-                raise ValidationError("The uploaded markdown file must have a valid markdown content type.")
+            # Check the bytes themselves rather than the content type the client sent
+            validate_file_signature(self.content)
 
         if self.pdf_content:
             if not self.pdf_content.name.endswith('.pdf'):
                 raise ValidationError("The PDF content file must be a .pdf file.")
-            if (hasattr(self.pdf_content.file, 'content_type') and
-               self.pdf_content.file.content_type != "application/pdf"):
-                raise ValidationError("The uploaded PDF file must have a valid PDF content type.")
+            validate_file_signature(self.pdf_content)
 
         super().clean()
 
@@ -72,14 +75,6 @@ class Terms(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        # Delete the files from filesystem when model is deleted
-        if self.content and os.path.isfile(self.content.path):
-            os.remove(self.content.path)
-        if self.pdf_content and os.path.isfile(self.pdf_content.path):
-            os.remove(self.pdf_content.path)
-        super().delete(*args, **kwargs)
-
     class Meta:
         verbose_name = "Term"
         verbose_name_plural = "Terms"
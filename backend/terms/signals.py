@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from materials.media_gc import enqueue_file_deletion
+from .models import Terms
+
+
+@receiver(post_delete, sender=Terms)
+def queue_terms_file_deletion(sender, instance, **kwargs):
+    enqueue_file_deletion(instance.content.name, instance.pdf_content.name)
@@ -7,9 +7,10 @@ from .models import Terms
 from .serializers import TermsSerializer
 from users.models import CustomUser
 from schools.models import School
+from common.testing import TemporaryMediaMixin
 
 
-class TermsModelTests(TestCase):
+class TermsModelTests(TemporaryMediaMixin, TestCase):
 
     def setUp(self):
         self.school = School.objects.create(name='Test School')
@@ -63,7 +64,7 @@ class TermsModelTests(TestCase):
         self.assertEqual(terms_list[0], self.terms)
 
 
-class TermsSerializerTests(TestCase):
+class TermsSerializerTests(TemporaryMediaMixin, TestCase):
 
     def setUp(self):
         # Create a school for the CustomUser
@@ -120,7 +121,7 @@ class TermsSerializerTests(TestCase):
         self.assertEqual(data['tag'], self.terms_attributes['tag'])
 
 
-class TermsAPITests(APITestCase):
+class TermsAPITests(TemporaryMediaMixin, APITestCase):
 
     def setUp(self):
         self.client = APIClient()
@@ -309,3 +310,46 @@ class TermsAPITests(APITestCase):
         # Verify the directory is gone
         self.assertFalse(os.path.exists(terms_media_dir),
                          f"Terms directory still exists at {terms_media_dir}")
+
+
+class TermsPdfServingTests(TemporaryMediaMixin, APITestCase):
+
+    def setUp(self):
+        self.terms = Terms.objects.create(
+            tag='license',
+            content=SimpleUploadedFile("license.md", b"License", content_type="text/markdown"),
+            pdf_content=SimpleUploadedFile("license.pdf", b"%PDF-1.4 license", content_type="application/pdf"),
+            name='License',
+            version='1.0'
+        )
+        self.url = reverse('terms-pdf', kwargs={'pk': self.terms.pk})
+
+    def test_pdf_is_public_and_ranged(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-7')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def tearDown(self):
+        self.terms.delete()
+
+
+class TermsFileSignatureTests(TemporaryMediaMixin, TestCase):
+
+    def test_pdf_content_must_be_a_pdf(self):
+        from django.core.exceptions import ValidationError
+
+        with self.assertRaises(ValidationError):
+            Terms.objects.create(
+                tag='cookies',
+                content=SimpleUploadedFile("cookies.md", b"# Cookies", content_type="text/markdown"),
+                # The claimed content type is not trusted
+                pdf_content=SimpleUploadedFile("cookies.pdf", b"<html>not a pdf</html>",
+                                               content_type="application/pdf"),
+                name='Cookie Policy',
+                version='1.0'
+            )
+        self.assertFalse(Terms.objects.exists())
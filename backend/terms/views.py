@@ -1,6 +1,9 @@
 from rest_framework import filters, viewsets, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.decorators import action
+from django.http import Http404
+from materials.serving import serve_file
 from django.core.exceptions import ValidationError
 from .models import Terms
 from .serializers import TermsSerializer
@@ -18,7 +21,7 @@ class TermsViewSet(viewsets.ModelViewSet):
     search_fields = ['tag', 'name']
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'pdf']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAdmin]
@@ -31,6 +34,13 @@ class TermsViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(tag=tag)
         return queryset
 
+    @action(detail=True, methods=['get'], url_path='pdf')
+    def pdf(self, request, pk=None):
+        terms = self.get_object()
+        if not terms.pdf_content:
+            raise Http404('This document has no PDF version.')
+        return serve_file(request, terms.pdf_content, content_type='application/pdf')
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import CachedTranslation, TranslationJob
+
+admin.site.register(CachedTranslation)
+admin.site.register(TranslationJob)
@@ -0,0 +1,147 @@
+"""
+Translation backends.
+
+A backend is a class whose instances translate with ``async translate(text,
+src, dest)``, returning a result dict (translated_text, src, dest,
+pronunciation), and release their connections with ``async aclose()``.
+Instances are only created and used on TranslatorClient's event loop.
+
+BACKENDS maps backend names to class paths, and TRANSLATION_BACKENDS adds
+or overrides entries. TRANSLATION_BACKEND names the backend used and
+TRANSLATION_FALLBACK_BACKEND an optional one tried when it fails.
+"""
+import asyncio
+
+import httpx
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .standin import standin_translation
+
+BACKENDS = {
+    'googletrans': 'translations.backends.GoogletransBackend',
+    'standin': 'translations.backends.StandInBackend',
+}
+
+
+class BackendUnavailable(Exception):
+    """The backend could not translate in time or is known to be down."""
+
+
+class BackendTimeout(BackendUnavailable):
+    pass
+
+
+class InvalidLanguage(ValueError):
+    """Unsupported language code: the caller's mistake, so it never opens a circuit breaker."""
+
+
+class CircuitOpen(BackendUnavailable):
+    def __init__(self, name, retry_after):
+        super().__init__(f'Translation backend {name} is unavailable, retry in {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+def get_backends():
+    return {**BACKENDS, **getattr(settings, 'TRANSLATION_BACKENDS', {})}
+
+
+def get_backend_class(name):
+    path = get_backends().get(name)
+    if path is None:
+        raise ValueError(f'Unknown translation backend: {name}')
+    return import_string(path)
+
+
+class ServiceURLTransport(httpx.AsyncHTTPTransport):
+    """Send every request to another origin, such as a local stand-in server."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = httpx.URL(base_url)
+
+    async def handle_async_request(self, request):
+        request.url = request.url.copy_with(
+            scheme=self.base_url.scheme, host=self.base_url.host, port=self.base_url.port
+        )
+        request.headers['Host'] = self.base_url.netloc.decode('ascii')
+        return await super().handle_async_request(request)
+
+
+def build_translator():
+    """A googletrans Translator using our pool limits, timeout and TRANSLATION_SERVICE_URL."""
+    from googletrans import Translator
+
+    limits = httpx.Limits(
+        max_connections=settings.TRANSLATION_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.TRANSLATION_MAX_CONNECTIONS,
+    )
+    service_url = getattr(settings, 'TRANSLATION_SERVICE_URL', None)
+    if service_url:
+        transport = ServiceURLTransport(service_url, limits=limits)
+    else:
+        transport = httpx.AsyncHTTPTransport(http2=True, limits=limits)
+
+    # Raise on upstream errors instead of returning the input as its own translation
+    translator = Translator(raise_exception=True)
+    # Translator builds its own client without pool limits; it has not opened
+    # any connection yet, so it is simply replaced
+    translator.client = httpx.AsyncClient(
+        transport=transport,
+        headers=translator.client.headers,
+        timeout=httpx.Timeout(settings.TRANSLATION_TIMEOUT),
+    )
+    return translator
+
+
+def result_dict(result):
+    return {
+        'translated_text': result.text,
+        'src': result.src,
+        'dest': result.dest,
+        'pronunciation': getattr(result, 'pronunciation', None),
+    }
+
+
+class GoogletransBackend:
+    """Google Translate through googletrans, on one pooled httpx client."""
+
+    def __init__(self):
+        self.translator = build_translator()
+
+    async def translate(self, text, src, dest):
+        try:
+            result = await self.translator.translate(text, src=src, dest=dest)
+        except ValueError as e:
+            # googletrans checks the language codes before any request
+            if str(e) in ('invalid source language', 'invalid destination language'):
+                raise InvalidLanguage(str(e)) from e
+            raise
+        return result_dict(result)
+
+    async def aclose(self):
+        await self.translator.client.aclose()
+
+
+class StandInBackend:
+    """
+    Offline backend for CI and load tests, with the deterministic "[dest]
+    text" translations of standin.StandInServer but no network at all.
+    Each call takes TRANSLATION_STANDIN_LATENCY seconds.
+    """
+
+    def __init__(self):
+        self.latency = getattr(settings, 'TRANSLATION_STANDIN_LATENCY', 0)
+
+    async def translate(self, text, src, dest):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {
+            'translated_text': standin_translation(text, dest),
+            'src': 'en' if src == 'auto' else src,
+            'dest': dest,
+            'pronunciation': None,
+        }
+
+    async def aclose(self):
+        pass
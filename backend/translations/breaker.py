@@ -0,0 +1,86 @@
+"""
+Circuit breaker for translation backends.
+
+After failure_threshold consecutive failures the breaker opens and calls
+are refused with CircuitOpen instead of waiting on a backend that is down.
+Once reset_timeout seconds have passed a single trial call goes through
+(half-open): its success closes the breaker, its failure opens it again.
+"""
+import logging
+import threading
+import time
+
+from .backends import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.times_opened = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def _retry_after(self):
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through now."""
+        with self._lock:
+            if self.state == OPEN:
+                if self._retry_after() > 0:
+                    raise CircuitOpen(self.name, self._retry_after())
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpen(self.name, self.reset_timeout)
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info('Translation backend %s recovered, closing its circuit breaker', self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning('Translation backend %s failed %d times in a row, opening its circuit breaker',
+                               self.name, self.failures)
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self.times_opened += 1
+
+    def release(self):
+        """End a call that neither succeeded nor failed, such as a cancelled one."""
+        with self._lock:
+            self._trial_running = False
+
+    def retry_after(self):
+        """Seconds until the next call may go through."""
+        with self._lock:
+            return self._retry_after() if self.state == OPEN else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'retry_after': round(self._retry_after(), 1) if self.state == OPEN else 0.0,
+            }
@@ -0,0 +1,220 @@
+"""
+Two-tier cache of translation results.
+
+Lookups go to a per-process LRU bounded by the bytes of the entries it
+holds, then to the CachedTranslation table shared by every worker. Entries
+are keyed by a hash of the normalized text and the language pair, so the
+same handout translated by different teachers is only sent upstream once.
+"""
+import hashlib
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+# Rough per-entry overhead of the dict, key and OrderedDict node
+ENTRY_OVERHEAD = 200
+
+
+def normalize_text(text):
+    """Canonical form used for cache keys: NFC, "\\n" line endings, no surrounding whitespace."""
+    return unicodedata.normalize('NFC', text).replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def translation_key(text, src, dest):
+    normalized = normalize_text(text)
+    return hashlib.sha256(f'{src.lower()}\0{dest.lower()}\0{normalized}'.encode('utf-8')).hexdigest()
+
+
+def result_size(result):
+    return ENTRY_OVERHEAD + sum(len(value.encode('utf-8')) for value in result.values() if isinstance(value, str))
+
+
+def row_result(row):
+    return {
+        'translated_text': row.translated_text,
+        'src': row.detected_src,
+        'dest': row.dest,
+        'pronunciation': row.pronunciation,
+    }
+
+
+class MemoryLRU:
+    """Thread-safe LRU mapping whose total entry size stays under max_bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = result_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TranslationCache:
+    """
+    Results are dicts with translated_text, src (the detected source
+    language), dest and pronunciation, as returned by the translator.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.memory = MemoryLRU(max_bytes or getattr(settings, 'TRANSLATION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_from_memory(self, text, src, dest):
+        """Look up the memory tier only, e.g. before hopping to a thread for the database."""
+        result = self.memory.get(translation_key(text, src, dest))
+        if result is not None:
+            self._count('memory_hits')
+        return result
+
+    def get(self, text, src, dest):
+        """Return (result, tier) where tier is 'memory' or 'database', or (None, None) on a miss."""
+        result = self.get_from_memory(text, src, dest)
+        if result is not None:
+            return result, 'memory'
+        return self.get_from_database(text, src, dest)
+
+    def get_from_database(self, text, src, dest):
+        from .models import CachedTranslation
+
+        key = translation_key(text, src, dest)
+        row = CachedTranslation.objects.filter(key=key).first()
+        if row is not None:
+            result = row_result(row)
+            self.memory.put(key, result)
+            self._count('database_hits')
+            return result, 'database'
+
+        self._count('misses')
+        return None, None
+
+    def get_many(self, texts, src, dest, record=True):
+        """
+        Look up many texts at once, with a single query for those not in
+        memory. Returns {translation key: (result, tier)} for the hits.
+        With record=False the lookups are left out of the stats; record()
+        can count them later.
+        """
+        from .models import CachedTranslation
+
+        found = {}
+        missing = set()
+        keys = {translation_key(text, src, dest) for text in texts}
+        for key in keys:
+            result = self.memory.get(key)
+            if result is not None:
+                found[key] = (result, 'memory')
+            else:
+                missing.add(key)
+        if missing:
+            for row in CachedTranslation.objects.filter(key__in=missing):
+                result = row_result(row)
+                self.memory.put(row.key, result)
+                found[row.key] = (result, 'database')
+        if record:
+            self.record(found, len(keys))
+        return found
+
+    def record(self, found, lookups):
+        """Add lookups of distinct texts to the stats, found being get_many()'s hits among them."""
+        tiers = Counter(tier for _, tier in found.values())
+        with self._lock:
+            self.memory_hits += tiers['memory']
+            self.database_hits += tiers['database']
+            self.misses += lookups - len(found)
+
+    def put_many(self, items, src, dest):
+        """Store (text, result) pairs with one insert, leaving existing rows alone."""
+        from .models import CachedTranslation
+
+        rows = []
+        for text, result in items:
+            key = translation_key(text, src, dest)
+            self.memory.put(key, result)
+            rows.append(CachedTranslation(
+                key=key, src=src, dest=dest, text=normalize_text(text),
+                translated_text=result['translated_text'], detected_src=result['src'],
+                pronunciation=result.get('pronunciation'),
+            ))
+        CachedTranslation.objects.bulk_create(rows, ignore_conflicts=True)
+
+    def put(self, text, src, dest, result):
+        from .models import CachedTranslation
+
+        key = translation_key(text, src, dest)
+        self.memory.put(key, result)
+        # get_or_create copes with another worker storing the same key first
+        CachedTranslation.objects.get_or_create(key=key, defaults={
+            'src': src,
+            'dest': dest,
+            'text': normalize_text(text),
+            'translated_text': result['translated_text'],
+            'detected_src': result['src'],
+            'pronunciation': result.get('pronunciation'),
+        })
+
+    def clear(self):
+        from .models import CachedTranslation
+
+        self.memory.clear()
+        CachedTranslation.objects.all().delete()
+
+    def stats(self):
+        from .models import CachedTranslation
+
+        with self._lock:
+            counters = {
+                'memory_hits': self.memory_hits,
+                'database_hits': self.database_hits,
+                'misses': self.misses,
+            }
+        lookups = sum(counters.values())
+        hits = counters['memory_hits'] + counters['database_hits']
+        return {
+            **counters,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory.size,
+            'memory_max_bytes': self.memory.max_bytes,
+            'database_entries': CachedTranslation.objects.count(),
+        }
+
+
+translation_cache = TranslationCache()
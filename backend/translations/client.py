@@ -0,0 +1,232 @@
+"""
+Long-lived translation client.
+
+Translation backends (translations.backends) are async, and googletrans's
+httpx client is bound to the event loop it first runs on, so backends live
+on a dedicated event loop thread for the life of the process. Sync views
+submit coroutines to that loop and wait on the future; async views await
+the same future without blocking their own loop. Either way every request
+reuses the pooled connections.
+
+Every call is bounded by TRANSLATION_TIMEOUT and guarded by a circuit
+breaker per backend, so a slow or failing upstream cannot hold workers.
+When TRANSLATION_BACKEND fails, TRANSLATION_FALLBACK_BACKEND (if any) is
+tried and its result is marked with a "fallback" key. Latency and breaker
+state of each backend are reported by stats().
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .backends import BackendTimeout, CircuitOpen, InvalidLanguage, get_backend_class
+from .breaker import CircuitBreaker
+
+# Latencies kept per backend for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+
+def latency_summary(latencies):
+    """Mean, median, 95th percentile and maximum of latencies in seconds, in milliseconds."""
+    if not latencies:
+        return None
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 1)
+
+    return {
+        'samples': len(latencies),
+        'mean': round(sum(latencies) / len(latencies) * 1000, 1),
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+        'max': percentile(1),
+    }
+
+
+class Upstream:
+    """Circuit breaker and call metrics of one backend."""
+
+    def __init__(self, name):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            name, settings.TRANSLATION_BREAKER_FAILURES, settings.TRANSLATION_BREAKER_RESET_TIMEOUT
+        )
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, seconds=None, failed=False, timed_out=False, rejected=False):
+        with self._lock:
+            self.calls += 1
+            self.failures += failed or timed_out
+            self.timeouts += timed_out
+            self.rejected += rejected
+            if seconds is not None:
+                self.latencies.append(seconds)
+
+    def stats(self):
+        with self._lock:
+            counters = {
+                'calls': self.calls,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+            }
+            latencies = list(self.latencies)
+        return {**counters, 'latency_ms': latency_summary(latencies), 'breaker': self.breaker.stats()}
+
+
+def _run_loop(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+    loop.close()
+
+
+class TranslatorClient:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self._backends = {}
+        self._upstreams = {}
+
+    def _get_loop(self):
+        with self._lock:
+            # A forked worker inherits this object but not the loop thread
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=_run_loop, args=(loop,), name='translator-loop', daemon=True).start()
+                self._loop, self._pid, self._backends = loop, os.getpid(), {}
+            return self._loop
+
+    def _upstream(self, name):
+        with self._lock:
+            if name not in self._upstreams:
+                self._upstreams[name] = Upstream(name)
+            return self._upstreams[name]
+
+    def _backend(self, name):
+        # Only ever runs on the loop thread, so no lock is needed
+        if name not in self._backends:
+            self._backends[name] = get_backend_class(name)()
+        return self._backends[name]
+
+    async def _call(self, name, text, src, dest):
+        upstream = self._upstream(name)
+        try:
+            upstream.breaker.before_call()
+        except CircuitOpen:
+            upstream.record(rejected=True)
+            raise
+        timeout = settings.TRANSLATION_TIMEOUT
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._backend(name).translate(text, src, dest), timeout)
+        except asyncio.TimeoutError:
+            upstream.breaker.record_failure()
+            upstream.record(time.perf_counter() - start, timed_out=True)
+            raise BackendTimeout(f'Translation backend {name} did not answer within {timeout}s')
+        except InvalidLanguage:
+            upstream.breaker.release()
+            raise
+        except Exception:
+            upstream.breaker.record_failure()
+            upstream.record(time.perf_counter() - start, failed=True)
+            raise
+        except BaseException:
+            # Cancelled by the caller: says nothing about the backend
+            upstream.breaker.release()
+            raise
+        upstream.breaker.record_success()
+        upstream.record(time.perf_counter() - start)
+        return result
+
+    async def _translate(self, text, src, dest):
+        name = settings.TRANSLATION_BACKEND
+        try:
+            return await self._call(name, text, src, dest)
+        except InvalidLanguage:
+            raise
+        except Exception:
+            fallback = getattr(settings, 'TRANSLATION_FALLBACK_BACKEND', None)
+            if not fallback or fallback == name:
+                raise
+        return {**await self._call(fallback, text, src, dest), 'fallback': fallback}
+
+    async def _translate_many(self, texts, src, dest, concurrency, timeout=None):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(text):
+            async with semaphore:
+                return await self._translate(text, src, dest)
+
+        tasks = [asyncio.ensure_future(one(text)) for text in texts]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        # Let the cancelled calls release their breakers before returning
+        await asyncio.gather(*pending, return_exceptions=True)
+        late = BackendTimeout('Not translated before the batch deadline')
+        return [late if task in pending else task.exception() or task.result() for task in tasks]
+
+    def submit(self, text, src, dest):
+        """Schedule a translation on the client's loop, returning a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(self._translate(text, src, dest), self._get_loop())
+
+    def translate(self, text, src, dest):
+        return self.submit(text, src, dest).result()
+
+    def translate_many(self, texts, src, dest, concurrency, timeout=None):
+        """
+        Translate texts with at most concurrency requests in flight. Returns
+        results in the order of texts, with failures as exception instances.
+        Texts still untranslated after timeout seconds are cancelled and
+        returned as BackendTimeout.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._translate_many(texts, src, dest, concurrency, timeout), self._get_loop()
+        ).result()
+
+    async def atranslate(self, text, src, dest):
+        return await asyncio.wrap_future(self.submit(text, src, dest))
+
+    async def atranslate_many(self, texts, src, dest, concurrency, timeout=None):
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            self._translate_many(texts, src, dest, concurrency, timeout), self._get_loop()
+        ))
+
+    def stats(self):
+        """Configured backends, and call counts, latency and breaker state of each backend used."""
+        with self._lock:
+            upstreams = list(self._upstreams.values())
+        return {
+            'backend': settings.TRANSLATION_BACKEND,
+            'fallback': getattr(settings, 'TRANSLATION_FALLBACK_BACKEND', None),
+            'backends': {upstream.name: upstream.stats() for upstream in upstreams},
+        }
+
+    def close(self):
+        """
+        Close the connections and stop the loop thread; the next call starts
+        afresh, with closed breakers and empty metrics.
+        """
+        with self._lock:
+            loop, backends = self._loop, self._backends
+            self._loop, self._backends, self._upstreams = None, {}, {}
+        if loop is None or self._pid != os.getpid():
+            return
+        for backend in backends.values():
+            asyncio.run_coroutine_threadsafe(backend.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+translator_client = TranslatorClient()
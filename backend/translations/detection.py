@@ -0,0 +1,116 @@
+"""
+Local language detection.
+
+Each language has a profile of character 1- to 3-gram counts built from
+language_profiles.TRAINING_TEXTS, and a text is scored against every
+profile as a naive Bayes classifier over its n-grams. Detection takes
+well under a millisecond for the texts sent to the translate endpoints, so
+translate() can resolve src='auto' and skip texts already in the
+destination language without calling the translator.
+
+A classifier always picks one of its classes, so texts in other languages
+are caught two ways and reported as UNDETERMINED. Languages close to the
+supported ones (language_profiles.CONTRAST_TEXTS) have profiles too, and
+texts closest to one of them are undetermined. Texts too unlike every
+profile, in languages nobody profiled, fall below MIN_MEAN_LOG_PROBABILITY.
+"""
+import math
+import re
+import threading
+from collections import Counter, namedtuple
+
+from .language_profiles import CONTRAST_TEXTS, TRAINING_TEXTS
+
+NGRAM_SIZES = (1, 2, 3)
+# Only the start of long texts is scored, which is plenty to tell languages apart
+MAX_CHARS = 1000
+# Texts with fewer letters than this are not detected
+MIN_LETTERS = 4
+SMOOTHING = 0.5
+# Mean log-probability per n-gram under the best profile below which a text
+# is in none of the profiled languages. Supported-language samples of
+# benchmark_language_detection stay above -6.6, other languages mostly below
+MIN_MEAN_LOG_PROBABILITY = -6.6
+
+# ISO 639-2 code for an undetermined language
+UNDETERMINED = 'und'
+
+# Words, keeping Catalan "l·l" and elided articles such as "l'" or "d'" together
+WORD = re.compile(r"[^\W\d_]+(?:['·][^\W\d_]+)*")
+
+Detection = namedtuple('Detection', ['language', 'confidence'])
+
+_profiles = None
+_profiles_lock = threading.Lock()
+
+
+def ngrams(text):
+    grams = []
+    for word in WORD.findall(text.lower().replace('’', "'")):
+        padded = f' {word} '
+        for size in NGRAM_SIZES:
+            grams.extend(padded[i:i + size] for i in range(len(padded) - size + 1) if padded[i:i + size] != ' ')
+    return grams
+
+
+class Profile:
+    """Smoothed log-probabilities of the n-grams of one language."""
+
+    def __init__(self, counts, vocabulary_size):
+        total = sum(counts.values()) + SMOOTHING * vocabulary_size
+        self.log_probabilities = {gram: math.log((count + SMOOTHING) / total) for gram, count in counts.items()}
+        self.unseen = math.log(SMOOTHING / total)
+
+    def score(self, grams):
+        get = self.log_probabilities.get
+        unseen = self.unseen
+        return sum(get(gram, unseen) for gram in grams)
+
+
+def build_profiles(texts):
+    counts = {language: Counter(ngrams(text)) for language, text in texts.items()}
+    vocabulary_size = len(set().union(*counts.values()))
+    return {language: Profile(grams, vocabulary_size) for language, grams in counts.items()}
+
+
+def get_profiles():
+    global _profiles
+    if _profiles is None:
+        with _profiles_lock:
+            if _profiles is None:
+                _profiles = build_profiles({**TRAINING_TEXTS, **CONTRAST_TEXTS})
+    return _profiles
+
+
+def language_scores(text):
+    """
+    Posterior probability of each supported language and of UNDETERMINED
+    for text, or {} when it has too few letters.
+    """
+    text = text[:MAX_CHARS]
+    if sum(1 for char in text if char.isalpha()) < MIN_LETTERS:
+        return {}
+    grams = ngrams(text)
+    scores = {language: profile.score(grams) for language, profile in get_profiles().items()}
+    best = max(scores.values())
+    if best / len(grams) < MIN_MEAN_LOG_PROBABILITY:
+        return {UNDETERMINED: 1.0}
+    # Every letter is counted once per n-gram size, and the overlapping n-grams
+    # are far from independent, so the posterior is tempered by that count
+    weights = {language: math.exp((score - best) / len(NGRAM_SIZES)) for language, score in scores.items()}
+    total = sum(weights.values())
+    probabilities = {language: weights[language] / total for language in TRAINING_TEXTS}
+    probabilities[UNDETERMINED] = sum(weights[language] for language in CONTRAST_TEXTS) / total
+    return probabilities
+
+
+def detect_language(text):
+    """
+    Return the most likely Detection(language, confidence) for text, where
+    language may be UNDETERMINED, or None when text is too short to tell.
+    """
+    scores = language_scores(text)
+    if not scores:
+        return None
+    language = max(scores, key=scores.get)
+    return Detection(language, scores[language])
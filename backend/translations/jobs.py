@@ -0,0 +1,161 @@
+"""
+Whole-document translation jobs.
+
+A job extracts the text of a Document, splits it into segments and
+translates them in batches through translate_segments, saving the
+translations after every batch. Once every segment is translated the text
+is saved as a new .txt Document in the same classroom.
+"""
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .backends import BackendUnavailable
+from .services import translate_segments
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+')
+WHITESPACE = re.compile(r'\s+')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TranslationJobError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TRANSLATION_JOB_WORKERS', 2),
+                thread_name_prefix='translation-jobs',
+            )
+        return _executor
+
+
+def _cut(line, max_chars):
+    """Return (end of piece, start of rest) for a line longer than max_chars."""
+    for pattern in (SENTENCE_END, WHITESPACE):
+        cut = None
+        for match in pattern.finditer(line, 0, max_chars + 1):
+            if match.start() > 0:
+                cut = match
+        if cut is not None:
+            return cut.start(), cut.end()
+    return max_chars, max_chars
+
+
+def segment_text(text, max_chars):
+    """
+    Split text into [segment, separator] pairs that join back into text:
+    one segment per line, with lines over max_chars split at sentence ends
+    (or whitespace) so each fits in a single translation request.
+    """
+    segments = []
+    lines = text.split('\n')
+    for number, line in enumerate(lines):
+        while len(line) > max_chars:
+            end, start = _cut(line, max_chars)
+            segments.append([line[:end], line[end:start]])
+            line = line[start:]
+        segments.append([line, '\n' if number < len(lines) - 1 else ''])
+    return segments
+
+
+def save_result(job, translations):
+    """Create the translated Document next to the source and queue its processing."""
+    from materials.models import Document, validate_file_limit
+    from materials.processing import schedule_document_processing
+
+    source = job.document
+    text = ''.join(translation + separator for translation, (_, separator) in zip(translations, job.segments))
+    suffix = f' ({job.dest})'
+    name = source.name[:Document._meta.get_field('name').max_length - len(suffix)] + suffix
+    filename = f'{os.path.splitext(os.path.basename(source.file.name))[0]}_{job.dest}.txt'
+
+    with transaction.atomic():
+        validate_file_limit(source.classroom)
+        document = Document.objects.create(
+            name=name, classroom=source.classroom, file=ContentFile(text.encode('utf-8'), name=filename)
+        )
+        document.tags.set(source.tags.all())
+    schedule_document_processing(document)
+    return document
+
+
+def run_translation_job(job_id):
+    """
+    Run or resume a job. Only pending and failed jobs are picked up, so a
+    job is never run twice at once.
+    """
+    from materials.extraction import get_document_text
+    from .models import TranslationJob
+
+    claimed = TranslationJob.objects.filter(
+        pk=job_id, status__in=[TranslationJob.PENDING, TranslationJob.FAILED]
+    ).update(status=TranslationJob.RUNNING, error='', retryable=False, attempts=F('attempts') + 1,
+             updated_at=timezone.now())
+    if not claimed:
+        return
+    job = TranslationJob.objects.select_related('document__classroom').get(pk=job_id)
+    jobs = TranslationJob.objects.filter(pk=job_id)
+
+    try:
+        if not job.segments:
+            job.segments = segment_text(get_document_text(job.document), settings.TRANSLATION_SEGMENT_MAX_CHARS)
+            job.total_segments = len(job.segments)
+            jobs.update(segments=job.segments, total_segments=job.total_segments)
+
+        batch_size = settings.TRANSLATION_JOB_BATCH_SIZE
+        translations = job.translations
+        while len(translations) < job.total_segments:
+            batch = job.segments[len(translations):len(translations) + batch_size]
+            results = translate_segments([text for text, _ in batch], src=job.src, dest=job.dest)
+            # Segments translated before the failure are in the cache, so a
+            # retry of the batch only sends the failed ones upstream
+            failures = [result for result in results if 'error' in result]
+            if failures:
+                raise TranslationJobError(
+                    failures[0]['error'], retryable=isinstance(failures[0].get('exception'), BackendUnavailable)
+                )
+            translations.extend(result['translated_text'] for result in results)
+            jobs.update(translations=translations, completed_segments=len(translations), updated_at=timezone.now())
+
+        document = save_result(job, translations)
+    except Exception as e:
+        logger.exception('Translation job %s failed', job_id)
+        retryable = isinstance(e, BackendUnavailable) or getattr(e, 'retryable', False)
+        jobs.update(status=TranslationJob.FAILED, error=str(e)[:255], retryable=retryable, updated_at=timezone.now())
+        return
+
+    jobs.update(status=TranslationJob.COMPLETED, result=document, updated_at=timezone.now())
+
+
+def _run_in_background(job_id):
+    try:
+        run_translation_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_translation_job(job):
+    """Queue a job to run once the current transaction commits."""
+    job_id = job.pk
+    if getattr(settings, 'TRANSLATION_JOBS_ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_background, job_id))
+    else:
+        transaction.on_commit(lambda: run_translation_job(job_id))
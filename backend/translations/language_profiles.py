@@ -0,0 +1,226 @@
+"""
+Training text for the local language detector (translations.detection).
+
+Plain prose in each supported language, mixing everyday and classroom
+vocabulary. Profiles are built from it when the detector is first used;
+adding a language is a matter of adding a text here.
+"""
+
+TRAINING_TEXTS = {
+    'es': """
+La célula es la unidad básica de todos los seres vivos. Todos los organismos están formados por una o
+más células, y cada una de ellas procede de otra célula anterior. En clase vamos a estudiar las partes de
+la célula y las funciones que realizan. Lee con atención el texto y responde a las preguntas que aparecen
+al final de la página. No olvides escribir tu nombre y la fecha en la hoja de respuestas. El examen tendrá
+lugar el próximo martes por la mañana y durará una hora. Se valorará la ortografía, la presentación y la
+claridad de las respuestas. Los alumnos que necesiten más tiempo pueden hablar con el profesor después de
+clase. Ayer fuimos al museo con nuestros compañeros y vimos una exposición sobre la historia de la ciudad.
+Mi hermana pequeña quiere ser médica cuando sea mayor, porque le gusta mucho ayudar a los demás. Hace
+mucho calor en verano, así que solemos ir a la playa con la familia durante las vacaciones. ¿Por qué el
+agua hierve a cien grados? Explica tu respuesta con un ejemplo de la vida cotidiana. Las plantas
+necesitan luz, agua y dióxido de carbono para fabricar su propio alimento mediante la fotosíntesis.
+Durante la Edad Media, la mayoría de la población vivía en el campo y trabajaba la tierra. Escribe una
+redacción de doscientas palabras sobre tu libro favorito y explica por qué lo recomendarías. Los
+números decimales se utilizan para expresar cantidades que no son enteras. Hoy no hay deberes, pero
+mañana tenéis que traer el cuaderno de matemáticas y la calculadora. Según el horario, la reunión con
+las familias será el jueves a las cinco de la tarde en el salón de actos del colegio. Cuando llegamos a
+casa, nuestra madre ya había preparado la cena y estaba esperándonos en la cocina.
+Hola a todos, buenas tardes y bienvenidos. Uno, dos, tres, cuatro, cinco, seis, siete, ocho, nueve y diez.
+Los días de la semana son lunes, martes, miércoles, jueves, viernes, sábado y domingo. Todo el mundo tiene
+que traer su propio material, y quien no lo tenga puede pedirlo en secretaría. ¿Qué hora es? Son las tres
+y media. Mi abuelo tiene un perro muy grande que siempre quiere jugar con nosotros en el jardín.
+""",
+    'en': """
+The cell is the basic unit of all living things. Every organism is made of one or more cells, and each
+of them comes from an earlier cell. In class we are going to study the parts of the cell and the work
+they do. Read the text carefully and answer the questions at the bottom of the page. Do not forget to
+write your name and the date on the answer sheet. The exam will take place next Tuesday morning and will
+last one hour. Spelling, presentation and the clarity of your answers will be taken into account.
+Students who need more time can talk to the teacher after class. Yesterday we went to the museum with
+our classmates and saw an exhibition about the history of the city. My little sister wants to be a
+doctor when she grows up, because she really likes helping other people. It is very hot in the summer,
+so we usually go to the beach with the family during the holidays. Why does water boil at one hundred
+degrees? Explain your answer with an example from everyday life. Plants need light, water and carbon
+dioxide to make their own food through photosynthesis. During the Middle Ages, most of the population
+lived in the countryside and worked the land. Write an essay of two hundred words about your favourite
+book and explain why you would recommend it. Decimal numbers are used to express amounts that are not
+whole. There is no homework today, but tomorrow you have to bring your maths notebook and a calculator.
+According to the timetable, the meeting with families will be on Thursday at five in the afternoon in
+the school hall. When we got home, our mother had already made dinner and was waiting for us in the
+kitchen. They would have finished the project earlier if they had worked together with the others.
+Hello everyone, good afternoon and welcome. One, two, three, four, five, six, seven, eight, nine and ten.
+The days of the week are Monday, Tuesday, Wednesday, Thursday, Friday, Saturday and Sunday. Everybody has
+to bring their own materials, and anyone who does not have them can ask for them at the office. What time
+is it? It is half past three. My grandfather has a very big dog that always wants to play with us in the garden.
+""",
+    'ca': """
+La cèl·lula és la unitat bàsica de tots els éssers vius. Tots els organismes estan formats per una o més
+cèl·lules, i cadascuna d'elles prové d'una altra cèl·lula anterior. A classe estudiarem les parts de la
+cèl·lula i les funcions que fan. Llegiu amb atenció el text i responeu les preguntes que hi ha al final de
+la pàgina. No oblideu escriure el vostre nom i la data al full de respostes. L'examen serà el dimarts
+vinent al matí i durarà una hora. Es valorarà l'ortografia, la presentació i la claredat de les
+respostes. Els alumnes que necessitin més temps poden parlar amb el professor després de la classe. Ahir
+vam anar al museu amb els companys i vam veure una exposició sobre la història de la ciutat. La meva
+germana petita vol ser metgessa quan sigui gran, perquè li agrada molt ajudar els altres. A l'estiu fa
+molta calor, així que solem anar a la platja amb la família durant les vacances. Per què l'aigua bull a
+cent graus? Expliqueu la resposta amb un exemple de la vida quotidiana. Les plantes necessiten llum,
+aigua i diòxid de carboni per fabricar el seu propi aliment mitjançant la fotosíntesi. Durant l'edat
+mitjana, la majoria de la població vivia al camp i treballava la terra. Escriviu una redacció de dues-centes
+paraules sobre el vostre llibre preferit i expliqueu per què el recomanaríeu. Els nombres decimals
+s'utilitzen per expressar quantitats que no són enteres. Avui no hi ha deures, però demà heu de portar
+la llibreta de matemàtiques i la calculadora. Segons l'horari, la reunió amb les famílies serà dijous a
+les cinc de la tarda a la sala d'actes de l'escola. Quan vam arribar a casa, la nostra mare ja havia
+preparat el sopar i ens esperava a la cuina. Aquesta setmana també hem après moltes coses noves.
+Hola a tothom, bona tarda i benvinguts. Un, dos, tres, quatre, cinc, sis, set, vuit, nou i deu. Els dies
+de la setmana són dilluns, dimarts, dimecres, dijous, divendres, dissabte i diumenge. Tothom ha de portar
+el seu propi material, i qui no el tingui el pot demanar a secretaria. Quina hora és? Són les tres i
+mitja. El meu avi té un gos molt gran que sempre vol jugar amb nosaltres al jardí.
+""",
+    'fr': """
+La cellule est l'unité de base de tous les êtres vivants. Tous les organismes sont formés d'une ou de
+plusieurs cellules, et chacune d'elles provient d'une cellule antérieure. En classe, nous allons étudier
+les parties de la cellule et les fonctions qu'elles remplissent. Lisez attentivement le texte et répondez
+aux questions qui se trouvent en bas de la page. N'oubliez pas d'écrire votre nom et la date sur la
+feuille de réponses. L'examen aura lieu mardi prochain dans la matinée et durera une heure.
+L'orthographe, la présentation et la clarté des réponses seront prises en compte. Les élèves qui ont
+besoin de plus de temps peuvent parler au professeur après le cours. Hier, nous sommes allés au musée
+avec nos camarades et nous avons vu une exposition sur l'histoire de la ville. Ma petite sœur veut
+devenir médecin quand elle sera grande, parce qu'elle aime beaucoup aider les autres. Il fait très
+chaud en été, alors nous allons souvent à la plage en famille pendant les vacances. Pourquoi l'eau
+bout-elle à cent degrés ? Expliquez votre réponse avec un exemple de la vie quotidienne. Les plantes ont
+besoin de lumière, d'eau et de dioxyde de carbone pour fabriquer leur propre nourriture grâce à la
+photosynthèse. Au Moyen Âge, la plupart de la population vivait à la campagne et travaillait la terre.
+Écrivez une rédaction de deux cents mots sur votre livre préféré et expliquez pourquoi vous le
+recommanderiez. Les nombres décimaux servent à exprimer des quantités qui ne sont pas entières. Il n'y a
+pas de devoirs aujourd'hui, mais demain vous devez apporter le cahier de mathématiques et la
+calculatrice. D'après l'emploi du temps, la réunion avec les familles aura lieu jeudi à dix-sept heures
+dans la salle des fêtes de l'école. Quand nous sommes rentrés, notre mère avait déjà préparé le dîner et
+nous attendait dans la cuisine.
+Bonjour à tous, bon après-midi et bienvenue. Un, deux, trois, quatre, cinq, six, sept, huit, neuf et dix.
+Les jours de la semaine sont lundi, mardi, mercredi, jeudi, vendredi, samedi et dimanche. Tout le monde
+doit apporter son propre matériel, et ceux qui ne l'ont pas peuvent le demander au secrétariat. Quelle
+heure est-il ? Il est trois heures et demie. Mon grand-père a un très grand chien qui veut toujours
+jouer avec nous dans le jardin.
+""",
+}
+
+# Languages close to the supported ones, or common in schools here, that are
+# not translated from locally: a text scoring closest to one of these is
+# reported as undetermined, so the translator detects it instead
+CONTRAST_TEXTS = {
+    'pt': """
+A célula é a unidade básica de todos os seres vivos. Todos os organismos são formados por uma ou mais
+células, e cada uma delas provém de outra célula anterior. Na aula vamos estudar as partes da célula e as
+funções que desempenham. Lê o texto com atenção e responde às perguntas que aparecem no fim da página.
+Não te esqueças de escrever o teu nome e a data na folha de respostas. O exame será na próxima
+terça-feira de manhã e vai durar uma hora. Serão avaliadas a ortografia, a apresentação e a clareza das
+respostas. Os alunos que precisarem de mais tempo podem falar com o professor depois da aula. Ontem
+fomos ao museu com os nossos colegas e vimos uma exposição sobre a história da cidade. A minha irmã mais
+nova quer ser médica quando for grande, porque gosta muito de ajudar os outros. Faz muito calor no verão,
+por isso costumamos ir à praia com a família durante as férias. Porque é que a água ferve a cem graus?
+Explica a tua resposta com um exemplo do dia a dia. As plantas precisam de luz, água e dióxido de carbono
+para produzirem o seu próprio alimento através da fotossíntese. Durante a Idade Média, a maior parte da
+população vivia no campo e trabalhava a terra. Escreve uma redação de duzentas palavras sobre o teu livro
+preferido e explica porque o recomendarias. Os números decimais são usados para exprimir quantidades que
+não são inteiras. Hoje não há trabalhos de casa, mas amanhã têm de trazer o caderno de matemática e a
+calculadora. Segundo o horário, a reunião com as famílias será na quinta-feira às cinco da tarde no
+auditório da escola. Quando chegámos a casa, a nossa mãe já tinha preparado o jantar e estava à nossa
+espera na cozinha. Olá a todos, boa tarde e bem-vindos. Um, dois, três, quatro, cinco, seis, sete, oito,
+nove e dez. Os dias da semana são segunda-feira, terça-feira, quarta-feira, quinta-feira, sexta-feira,
+sábado e domingo. Toda a gente tem de trazer o seu próprio material, e quem não o tiver pode pedi-lo na
+secretaria. Que horas são? São três e meia. O meu avô tem um cão muito grande que quer sempre brincar
+connosco no jardim.
+""",
+    'gl': """
+A célula é a unidade básica de todos os seres vivos. Todos os organismos están formados por unha ou máis
+células, e cada unha delas procede doutra célula anterior. Na clase imos estudar as partes da célula e as
+funcións que realizan. Le con atención o texto e responde ás preguntas que aparecen ao final da páxina.
+Non esquezas escribir o teu nome e a data na folla de respostas. O exame terá lugar o vindeiro martes
+pola mañá e durará unha hora. Valorarase a ortografía, a presentación e a claridade das respostas. Os
+alumnos que necesiten máis tempo poden falar co profesor despois da clase. Onte fomos ao museo cos nosos
+compañeiros e vimos unha exposición sobre a historia da cidade. A miña irmá pequena quere ser médica cando
+sexa maior, porque lle gusta moito axudar aos demais. Fai moita calor no verán, así que adoitamos ir á
+praia coa familia durante as vacacións. Por que ferve a auga a cen graos? Explica a túa resposta cun
+exemplo da vida cotiá. As plantas necesitan luz, auga e dióxido de carbono para fabricar o seu propio
+alimento mediante a fotosíntese. Durante a Idade Media, a maioría da poboación vivía no campo e
+traballaba a terra. Escribe unha redacción de douscentas palabras sobre o teu libro favorito e explica por
+que o recomendarías. Os números decimais utilízanse para expresar cantidades que non son enteiras. Hoxe
+non hai deberes, pero mañá tedes que traer o caderno de matemáticas e a calculadora. Segundo o horario, a
+reunión coas familias será o xoves ás cinco da tarde no salón de actos do colexio. Cando chegamos á casa,
+a nosa nai xa preparara a cea e estaba agardando por nós na cociña. Ola a todos, boas tardes e benvidos.
+Un, dous, tres, catro, cinco, seis, sete, oito, nove e dez. Os días da semana son luns, martes, mércores,
+xoves, venres, sábado e domingo. Todo o mundo ten que traer o seu propio material, e quen non o teña pode
+pedilo na secretaría. Que hora é? Son as tres e media. O meu avó ten un can moi grande que sempre quere
+xogar connosco no xardín.
+""",
+    'it': """
+La cellula è l'unità fondamentale di tutti gli esseri viventi. Tutti gli organismi sono formati da una o
+più cellule, e ognuna di esse deriva da un'altra cellula precedente. In classe studieremo le parti della
+cellula e le funzioni che svolgono. Leggi attentamente il testo e rispondi alle domande che si trovano in
+fondo alla pagina. Non dimenticare di scrivere il tuo nome e la data sul foglio delle risposte. L'esame si
+terrà martedì prossimo di mattina e durerà un'ora. Saranno valutate l'ortografia, la presentazione e la
+chiarezza delle risposte. Gli alunni che hanno bisogno di più tempo possono parlare con il professore dopo
+la lezione. Ieri siamo andati al museo con i nostri compagni e abbiamo visto una mostra sulla storia della
+città. Mia sorella minore vuole fare il medico da grande, perché le piace molto aiutare gli altri.
+D'estate fa molto caldo, quindi di solito andiamo al mare con la famiglia durante le vacanze. Perché
+l'acqua bolle a cento gradi? Spiega la tua risposta con un esempio della vita quotidiana. Le piante hanno
+bisogno di luce, acqua e anidride carbonica per produrre il proprio nutrimento attraverso la fotosintesi.
+Durante il Medioevo, la maggior parte della popolazione viveva in campagna e lavorava la terra. Scrivi un
+tema di duecento parole sul tuo libro preferito e spiega perché lo consiglieresti. I numeri decimali si
+usano per esprimere quantità che non sono intere. Oggi non ci sono compiti, ma domani dovete portare il
+quaderno di matematica e la calcolatrice. Secondo l'orario, la riunione con le famiglie sarà giovedì alle
+cinque del pomeriggio nell'aula magna della scuola. Quando siamo arrivati a casa, nostra madre aveva già
+preparato la cena e ci stava aspettando in cucina. Ciao a tutti, buon pomeriggio e benvenuti. Uno, due,
+tre, quattro, cinque, sei, sette, otto, nove e dieci. I giorni della settimana sono lunedì, martedì,
+mercoledì, giovedì, venerdì, sabato e domenica. Ognuno deve portare il proprio materiale, e chi non ce
+l'ha può chiederlo in segreteria. Che ore sono? Sono le tre e mezza. Mio nonno ha un cane molto grande
+che vuole sempre giocare con noi in giardino.
+""",
+    'de': """
+Die Zelle ist die Grundeinheit aller Lebewesen. Jeder Organismus besteht aus einer oder mehreren Zellen,
+und jede von ihnen stammt von einer früheren Zelle ab. Im Unterricht werden wir die Teile der Zelle und
+ihre Aufgaben untersuchen. Lies den Text aufmerksam durch und beantworte die Fragen am Ende der Seite.
+Vergiss nicht, deinen Namen und das Datum auf den Antwortbogen zu schreiben. Die Prüfung findet am
+nächsten Dienstagmorgen statt und dauert eine Stunde. Bewertet werden die Rechtschreibung, die
+Darstellung und die Klarheit der Antworten. Schüler, die mehr Zeit brauchen, können nach dem Unterricht
+mit dem Lehrer sprechen. Gestern sind wir mit unseren Mitschülern ins Museum gegangen und haben eine
+Ausstellung über die Geschichte der Stadt gesehen. Meine kleine Schwester möchte Ärztin werden, wenn sie
+groß ist, weil sie sehr gern anderen hilft. Im Sommer ist es sehr heiß, deshalb fahren wir in den Ferien
+meistens mit der Familie an den Strand. Warum kocht Wasser bei hundert Grad? Erkläre deine Antwort mit
+einem Beispiel aus dem Alltag. Pflanzen brauchen Licht, Wasser und Kohlendioxid, um durch die
+Photosynthese ihre eigene Nahrung herzustellen. Im Mittelalter lebte der größte Teil der Bevölkerung auf
+dem Land und bearbeitete die Felder. Schreibe einen Aufsatz von zweihundert Wörtern über dein
+Lieblingsbuch und erkläre, warum du es empfehlen würdest. Dezimalzahlen werden verwendet, um Mengen
+auszudrücken, die keine ganzen Zahlen sind. Heute gibt es keine Hausaufgaben, aber morgen müsst ihr das
+Mathematikheft und den Taschenrechner mitbringen. Laut Stundenplan findet das Elterntreffen am
+Donnerstag um fünf Uhr nachmittags in der Aula der Schule statt. Als wir nach Hause kamen, hatte unsere
+Mutter schon das Abendessen gekocht und wartete in der Küche auf uns. Hallo zusammen, guten Tag und
+herzlich willkommen. Eins, zwei, drei, vier, fünf, sechs, sieben, acht, neun und zehn. Die Wochentage sind
+Montag, Dienstag, Mittwoch, Donnerstag, Freitag, Samstag und Sonntag. Jeder muss sein eigenes Material
+mitbringen, und wer keines hat, kann es im Sekretariat holen. Wie spät ist es? Es ist halb vier. Mein
+Großvater hat einen sehr großen Hund, der immer mit uns im Garten spielen will.
+""",
+    'eu': """
+Zelula izaki bizidun guztien oinarrizko unitatea da. Organismo guztiak zelula batez edo gehiagoz osatuta
+daude, eta horietako bakoitza aurreko beste zelula batetik dator. Klasean zelularen atalak eta betetzen
+dituzten funtzioak aztertuko ditugu. Irakurri testua arretaz eta erantzun orriaren amaieran agertzen
+diren galderei. Ez ahaztu zure izena eta data erantzun orrian idaztea. Azterketa datorren asteartean
+izango da goizean, eta ordubete iraungo du. Ortografia, aurkezpena eta erantzunen argitasuna baloratuko
+dira. Denbora gehiago behar duten ikasleek irakaslearekin hitz egin dezakete klasearen ondoren. Atzo
+museora joan ginen gure ikaskideekin eta hiriaren historiari buruzko erakusketa bat ikusi genuen. Nire
+ahizpa txikiak medikua izan nahi du handia denean, besteei laguntzea asko gustatzen zaiolako. Udan bero
+handia egiten du, beraz oporretan familiarekin hondartzara joan ohi gara. Zergatik irakiten du urak ehun
+gradutan? Azaldu zure erantzuna eguneroko bizitzako adibide batekin. Landareek argia, ura eta karbono
+dioxidoa behar dituzte beren elikagaia fotosintesiaren bidez egiteko. Erdi Aroan, biztanle gehienak
+landan bizi ziren eta lurra lantzen zuten. Idatzi berrehun hitzeko idazlan bat zure liburu gogokoenari
+buruz eta azaldu zergatik gomendatuko zenukeen. Zenbaki hamartarrak osoak ez diren kantitateak
+adierazteko erabiltzen dira. Gaur ez dago etxerako lanik, baina bihar matematikako koadernoa eta
+kalkulagailua ekarri behar dituzue. Ordutegiaren arabera, familiekiko bilera ostegunean izango da
+arratsaldeko bostetan ikastetxeko ekitaldi aretoan. Etxera iritsi ginenean, gure amak afaria prestatuta
+zeukan eta sukaldean zain zegoen. Kaixo guztioi, arratsalde on eta ongi etorri. Bat, bi, hiru, lau, bost,
+sei, zazpi, zortzi, bederatzi eta hamar. Asteko egunak astelehena, asteartea, asteazkena, osteguna,
+ostirala, larunbata eta igandea dira. Bakoitzak bere materiala ekarri behar du, eta ez duenak
+idazkaritzan eska dezake. Zer ordu da? Hirurak eta erdiak dira. Nire aitonak txakur oso handi bat dauka,
+beti gurekin lorategian jolastu nahi duena.
+""",
+}
@@ -0,0 +1,134 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from translations.detection import UNDETERMINED, detect_language, get_profiles
+
+# Labelled texts not taken from the training text, from short phrases to paragraphs
+SAMPLES = [
+    ('es', 'Buenos días a todos.'),
+    ('es', 'Abrid el libro por la página cuarenta y dos.'),
+    ('es', 'El río Ebro desemboca en el mar Mediterráneo formando un delta.'),
+    ('es', '¿Quién escribió Don Quijote de la Mancha?'),
+    ('es', 'Recuerda que la entrega del trabajo es el viernes.'),
+    ('es', 'Los volcanes se forman cuando el magma sale a la superficie terrestre.'),
+    ('es', 'Calcula el área de un triángulo cuya base mide ocho centímetros.'),
+    ('es', 'Mis padres trabajan en un hospital cerca de la estación de tren.'),
+    ('es', 'La Revolución Francesa comenzó en 1789 y cambió la historia de Europa para siempre.'),
+    ('es', 'Si tienes alguna duda, pregúntale a tu tutor antes de empezar el ejercicio.'),
+    ('es', 'Nos gustaría organizar una excursión al parque natural durante la primavera, '
+           'siempre que el tiempo lo permita y las familias estén de acuerdo.'),
+    ('es', 'Gracias por tu ayuda.'),
+    ('en', 'Good morning, everyone.'),
+    ('en', 'Open your book to page forty-two.'),
+    ('en', 'The Ebro river flows into the Mediterranean Sea, forming a delta.'),
+    ('en', 'Who wrote Don Quixote?'),
+    ('en', 'Remember that the assignment is due on Friday.'),
+    ('en', 'Volcanoes form when magma reaches the surface of the Earth.'),
+    ('en', 'Calculate the area of a triangle whose base is eight centimetres long.'),
+    ('en', 'My parents work at a hospital near the train station.'),
+    ('en', 'The French Revolution began in 1789 and changed the history of Europe forever.'),
+    ('en', 'If you have any questions, ask your tutor before starting the exercise.'),
+    ('en', 'We would like to organise a trip to the nature park in spring, '
+           'as long as the weather allows it and the families agree.'),
+    ('en', 'Thanks for your help.'),
+    ('ca', 'Bon dia a tothom.'),
+    ('ca', 'Obriu el llibre per la pàgina quaranta-dos.'),
+    ('ca', "El riu Ebre desemboca al mar Mediterrani i forma un delta."),
+    ('ca', 'Qui va escriure el Quixot?'),
+    ('ca', "Recordeu que l'entrega del treball és divendres."),
+    ('ca', 'Els volcans es formen quan el magma surt a la superfície terrestre.'),
+    ('ca', "Calculeu l'àrea d'un triangle que té una base de vuit centímetres."),
+    ('ca', "Els meus pares treballen en un hospital a prop de l'estació de tren."),
+    ('ca', "La Revolució Francesa va començar el 1789 i va canviar la història d'Europa per sempre."),
+    ('ca', "Si tens cap dubte, pregunta-ho al teu tutor abans de començar l'exercici."),
+    ('ca', "Ens agradaria organitzar una excursió al parc natural durant la primavera, "
+           "sempre que el temps ho permeti i les famílies hi estiguin d'acord."),
+    ('ca', "Gràcies per l'ajuda."),
+    ('fr', 'Bonjour à tous.'),
+    ('fr', 'Ouvrez votre livre à la page quarante-deux.'),
+    ('fr', "L'Èbre se jette dans la mer Méditerranée en formant un delta."),
+    ('fr', 'Qui a écrit Don Quichotte ?'),
+    ('fr', 'Rappelez-vous que le devoir est à rendre vendredi.'),
+    ('fr', 'Les volcans se forment quand le magma atteint la surface de la Terre.'),
+    ('fr', "Calculez l'aire d'un triangle dont la base mesure huit centimètres."),
+    ('fr', "Mes parents travaillent dans un hôpital près de la gare."),
+    ('fr', "La Révolution française a commencé en 1789 et a changé l'histoire de l'Europe pour toujours."),
+    ('fr', "Si tu as des questions, demande à ton tuteur avant de commencer l'exercice."),
+    ('fr', "Nous aimerions organiser une sortie au parc naturel au printemps, "
+           "pourvu que le temps le permette et que les familles soient d'accord."),
+    ('fr', 'Merci pour ton aide.'),
+    # Other languages, which must not be mistaken for a supported one
+    (UNDETERMINED, 'Abram o livro na página quarenta e dois.'),
+    (UNDETERMINED, 'Lembrem-se de que o trabalho deve ser entregue na sexta-feira.'),
+    (UNDETERMINED, 'Os vulcões formam-se quando o magma chega à superfície da Terra.'),
+    (UNDETERMINED, 'Abride o libro na páxina corenta e dous.'),
+    (UNDETERMINED, 'Lembrade que o traballo hai que entregalo o venres.'),
+    (UNDETERMINED, 'Os volcáns fórmanse cando o magma chega á superficie da Terra.'),
+    (UNDETERMINED, 'Denkt daran, dass die Hausaufgabe am Freitag abgegeben werden muss.'),
+    (UNDETERMINED, 'Vulkane entstehen, wenn Magma an die Erdoberfläche gelangt.'),
+    (UNDETERMINED, 'Aprite il libro a pagina quarantadue.'),
+    (UNDETERMINED, 'I vulcani si formano quando il magma raggiunge la superficie terrestre.'),
+    (UNDETERMINED, 'Gogoratu lana ostiralean entregatu behar dela.'),
+    (UNDETERMINED, 'Sumendiak magma lurrazalera iristen denean sortzen dira.'),
+    (UNDETERMINED, 'Open het boek op pagina tweeënveertig en lees de tekst.'),
+    (UNDETERMINED, 'Pamiętajcie, że praca domowa jest na piątek.'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Measure accuracy and speed of the local language detector on a labelled es/en/ca/fr sample set, '
+            'with texts in other languages that must come out undetermined.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Times the sample set is detected when measuring speed.')
+        parser.add_argument('--min-confidence', type=float, default=None,
+                            help='Confidence needed to resolve src=auto (default: TRANSLATION_DETECTION_MIN_CONFIDENCE).')
+        parser.add_argument('--verbose-errors', action='store_true', help='List misclassified samples.')
+
+    def handle(self, *args, **options):
+        threshold = options['min_confidence']
+        if threshold is None:
+            threshold = settings.TRANSLATION_DETECTION_MIN_CONFIDENCE
+
+        start = time.perf_counter()
+        get_profiles()
+        build_seconds = time.perf_counter() - start
+
+        languages = sorted({language for language, _ in SAMPLES})
+        confusion = {language: dict.fromkeys(languages + ['none'], 0) for language in languages}
+        resolved = resolved_correct = 0
+        errors = []
+        for language, text in SAMPLES:
+            detection = detect_language(text)
+            detected = detection.language if detection else 'none'
+            confusion[language][detected] = confusion[language].get(detected, 0) + 1
+            if detected != language:
+                errors.append((language, detection, text))
+            if detection and detected != UNDETERMINED and detection.confidence >= threshold:
+                resolved += 1
+                resolved_correct += detected == language
+
+        start = time.perf_counter()
+        for _ in range(options['repeat']):
+            for _, text in SAMPLES:
+                detect_language(text)
+        per_text = (time.perf_counter() - start) / (options['repeat'] * len(SAMPLES))
+
+        correct = sum(confusion[language][language] for language in languages)
+        self.stdout.write(f'Profiles built in {build_seconds * 1000:.1f} ms')
+        self.stdout.write(f"{'actual':>8} " + ' '.join(f'{column:>6}' for column in languages + ['none']))
+        for language in languages:
+            row = confusion[language]
+            self.stdout.write(f'{language:>8} ' + ' '.join(f'{row[column]:>6}' for column in languages + ['none']))
+        self.stdout.write(f'Accuracy: {correct}/{len(SAMPLES)} ({correct / len(SAMPLES):.1%})')
+        self.stdout.write(
+            f'Resolved locally at confidence >= {threshold}: {resolved}/{len(SAMPLES)}, '
+            f'{resolved_correct} of them correct'
+        )
+        self.stdout.write(f'Mean detection time: {per_text * 1e6:.0f} µs per text')
+        if options['verbose_errors']:
+            for language, detection, text in errors:
+                self.stdout.write(f'  {language} detected as {detection}: {text}')
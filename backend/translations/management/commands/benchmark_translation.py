@@ -0,0 +1,76 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from translations.backends import ServiceURLTransport
+from translations.client import TranslatorClient
+from translations.standin import StandInServer
+
+
+def per_request_translate(service_url, text, src, dest):
+    """What translate_text did before the shared client: a new Translator and event loop per call."""
+    from googletrans import Translator
+
+    translator = Translator(raise_exception=True)
+    translator.client = httpx.AsyncClient(transport=ServiceURLTransport(service_url), headers=translator.client.headers)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(translator.translate(text, src=src, dest=dest))
+    finally:
+        loop.run_until_complete(translator.client.aclose())
+        loop.close()
+
+
+def run_threads(translate, texts, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(translate, texts))
+
+
+async def run_async(client, texts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(text):
+        async with semaphore:
+            return await client.atranslate(text, 'es', 'en')
+
+    await asyncio.gather(*(one(text) for text in texts))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark translation requests/sec against a local stand-in server (no cache, no network).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--latency', type=float, default=0.02,
+                            help='Simulated upstream latency of the stand-in server, in seconds.')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        self.stdout.write(f"{'concurrency':>11} {'engine':>12} {'time (s)':>10} {'req/s':>10}")
+        with StandInServer(latency=options['latency']) as server, \
+                override_settings(TRANSLATION_SERVICE_URL=server.url):
+            client = TranslatorClient()
+            try:
+                for concurrency in options['concurrency']:
+                    # Distinct texts per run, as the cache is not involved
+                    engines = [
+                        ('per-request', lambda texts: run_threads(
+                            lambda text: per_request_translate(server.url, text, 'es', 'en'), texts, concurrency)),
+                        ('shared-sync', lambda texts: run_threads(
+                            lambda text: client.translate(text, 'es', 'en'), texts, concurrency)),
+                        ('shared-async', lambda texts: asyncio.run(run_async(client, texts, concurrency))),
+                    ]
+                    for name, run in engines:
+                        texts = [f'{name} {concurrency} frase {number}' for number in range(count)]
+                        start = time.perf_counter()
+                        run(texts)
+                        seconds = time.perf_counter() - start
+                        self.stdout.write(f"{concurrency:>11} {name:>12} {seconds:>10.3f} {count / seconds:>10.1f}")
+            finally:
+                client.close()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from translations.models import CachedTranslation
+
+
+class Command(BaseCommand):
+    help = 'Delete every stored translation, e.g. after changing translation provider.'
+
+    def handle(self, *args, **options):
+        deleted, _ = CachedTranslation.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} cached translations.'))
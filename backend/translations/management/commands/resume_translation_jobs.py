@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from translations.jobs import run_translation_job
+from translations.models import TranslationJob
+
+
+class Command(BaseCommand):
+    help = ('Resume pending translation jobs, running ones left behind by a stopped worker and failed ones '
+            'whose error is transient, up to TRANSLATION_JOB_MAX_ATTEMPTS runs per job.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-seconds', type=int, default=600,
+                            help='Treat running jobs not updated for this long as interrupted.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['stale_seconds'])
+        TranslationJob.objects.filter(status=TranslationJob.RUNNING, updated_at__lt=cutoff).update(
+            status=TranslationJob.FAILED, error='Interrupted', retryable=True
+        )
+        # Failures such as an unsupported language would only fail again
+        retryable = Q(status=TranslationJob.FAILED, retryable=True,
+                      attempts__lt=settings.TRANSLATION_JOB_MAX_ATTEMPTS)
+        job_ids = list(TranslationJob.objects.filter(Q(status=TranslationJob.PENDING) | retryable)
+                       .values_list('id', flat=True))
+        for job_id in job_ids:
+            run_translation_job(job_id)
+        completed = TranslationJob.objects.filter(id__in=job_ids, status=TranslationJob.COMPLETED).count()
+        self.stdout.write(self.style.SUCCESS(f'Resumed {len(job_ids)} translation jobs, {completed} completed.'))
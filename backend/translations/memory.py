@@ -0,0 +1,60 @@
+"""
+Sentence-level translation memory.
+
+Texts are split into sentences, and each sentence is a unit of the
+translation cache on its own. Boilerplate such as exam instructions or
+rubric lines is then translated once and reused inside any text that
+contains it, and only the sentences never seen before go upstream.
+"""
+import re
+
+# Sentence ends followed by whitespace and the start of a new sentence, or line breaks
+SENTENCE_BREAK = re.compile(
+    r'(?:(?<=[.!?…])|(?<=[.!?…]["»”’)\]]))[^\S\n]+(?=[¿¡"«“(\[]*[A-ZÀ-ÖØ-Þ0-9])'
+    r'|\s*\n\s*'
+)
+
+# Abbreviations (lowercase, without the final period) that do not end a sentence
+ABBREVIATIONS = {
+    # Spanish and Catalan
+    'sr', 'sra', 'srta', 'dr', 'dra', 'dña', 'etc', 'pág', 'págs', 'núm', 'art', 'ej', 'aprox',
+    'prof', 'profa', 'vol', 'cap', 'av', 'avda', 'ud', 'uds', 'sres', 'tel', 'pl', 'ctra', 'ntra',
+    # English and French
+    'mr', 'mrs', 'ms', 'st', 'vs', 'e.g', 'i.e', 'cf', 'fig', 'pp', 'approx', 'mme', 'mlle',
+}
+
+_WORD_BEFORE = re.compile(r'(\S+)[.]["»”’)\]]?$')
+
+
+def _is_abbreviation(head):
+    match = _WORD_BEFORE.search(head)
+    if match is None:
+        return False
+    word = match.group(1).lstrip('(["«“¿¡').lower()
+    # Initials such as "J. Smith" are not sentence ends either
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def split_sentences(text):
+    """
+    Split text into [sentence, separator] pairs that join back into text.
+    Leading whitespace comes back as a pair with an empty sentence, and
+    trailing whitespace as the separator of the last sentence.
+    """
+    body = text.strip()
+    if not body:
+        return [['', text]]
+    start = len(text) - len(text.lstrip())
+    end = start + len(body)
+    pieces = [['', text[:start]]] if start else []
+    for match in SENTENCE_BREAK.finditer(text, start, end):
+        if '\n' not in match.group() and _is_abbreviation(text[start:match.start()]):
+            continue
+        pieces.append([text[start:match.start()], match.group()])
+        start = match.end()
+    pieces.append([text[start:end], text[end:]])
+    return pieces
+
+
+def join_sentences(translations, pieces):
+    return ''.join(translation + separator for translation, (_, separator) in zip(translations, pieces))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.18 on 2026-10-18 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedTranslation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('src', models.CharField(max_length=16)),
+                ('dest', models.CharField(max_length=16)),
+                ('text', models.TextField()),
+                ('translated_text', models.TextField()),
+                ('detected_src', models.CharField(max_length=16)),
+                ('pronunciation', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0002_translationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='translationjob',
+            name='retryable',
+            field=models.BooleanField(default=False),
+        ),
+    ]
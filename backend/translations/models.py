@@ -0,0 +1,65 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class CachedTranslation(models.Model):
+    """Stored result of translating a normalized text between two languages, shared by every user."""
+    # SHA-256 of the language pair and the normalized text, see translations.cache
+    key = models.CharField(max_length=64, unique=True)
+    src = models.CharField(max_length=16)
+    dest = models.CharField(max_length=16)
+    text = models.TextField()
+    translated_text = models.TextField()
+    # Language reported by the translator, which resolves src="auto"
+    detected_src = models.CharField(max_length=16)
+    pronunciation = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.src} -> {self.dest}: {self.text[:50]}'
+
+
+class TranslationJob(models.Model):
+    """
+    Translation of a whole Document into a new Document of the same
+    classroom, run in the background in batches of segments. Translated
+    segments are saved after every batch, so a failed job resumes where it
+    stopped.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='translation_jobs')
+    document = models.ForeignKey('materials.Document', on_delete=models.CASCADE, related_name='translation_jobs')
+    src = models.CharField(max_length=16, default='auto')
+    dest = models.CharField(max_length=16)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    # Source segments as [text, separator] pairs, and the translations done so far
+    segments = models.JSONField(default=list, editable=False)
+    translations = models.JSONField(default=list, editable=False)
+    total_segments = models.PositiveIntegerField(default=0)
+    completed_segments = models.PositiveIntegerField(default=0)
+    result = models.ForeignKey(
+        'materials.Document', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    error = models.CharField(max_length=255, blank=True)
+    # Runs started so far, and whether the last failure is worth retrying
+    # automatically (backend down or timed out, worker stopped)
+    attempts = models.PositiveIntegerField(default=0)
+    retryable = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Translation of {self.document} to {self.dest} ({self.completed_segments}/{self.total_segments})'
@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+from materials.extraction import get_extension, is_supported
+from materials.models import Document
+from .models import TranslationJob
+
+
+class TranslationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TranslationJob
+        fields = [
+            'id', 'document', 'src', 'dest', 'status', 'total_segments', 'completed_segments', 'progress',
+            'result', 'error', 'created_at', 'updated_at',
+        ]
+        read_only_fields = [
+            'status', 'total_segments', 'completed_segments', 'result', 'error', 'created_at', 'updated_at',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            # Only the user's own materials can be translated
+            self.fields['document'].queryset = Document.objects.filter(classroom__creator=request.user)
+
+    def get_progress(self, obj):
+        if not obj.total_segments:
+            return 1.0 if obj.status == TranslationJob.COMPLETED else 0.0
+        return obj.completed_segments / obj.total_segments
+
+    def validate_document(self, value):
+        extension = get_extension(value.file.name)
+        if not is_supported(extension):
+            raise serializers.ValidationError(f'Text extraction is not supported for .{extension} files')
+        return value
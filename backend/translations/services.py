@@ -0,0 +1,372 @@
+"""Translation entry points used by the API, with results served from translations.cache."""
+import logging
+import math
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from common.singleflight import SingleFlight
+
+from .backends import BackendUnavailable, InvalidLanguage
+from .cache import translation_cache, translation_key
+from .client import translator_client
+from .detection import UNDETERMINED, detect_language
+from .memory import join_sentences, split_sentences
+
+logger = logging.getLogger(__name__)
+
+translation_flight = SingleFlight('translation')
+
+
+def call_translator(text, src, dest):
+    """Translate with the shared googletrans client, returning a result dict as stored in the cache."""
+    return translator_client.translate(text, src, dest)
+
+
+def call_translator_many(texts, src, dest, concurrency, timeout=None):
+    return translator_client.translate_many(texts, src, dest, concurrency, timeout)
+
+
+async def acall_translator(text, src, dest):
+    return await translator_client.atranslate(text, src, dest)
+
+
+async def acall_translator_many(texts, src, dest, concurrency, timeout=None):
+    return await translator_client.atranslate_many(texts, src, dest, concurrency, timeout)
+
+
+def _remaining(deadline):
+    """Seconds left until a time.monotonic() deadline, or None without one."""
+    return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+
+class TranslationError(Exception):
+    pass
+
+
+def _raise_error(result):
+    """Raise the failure of a segment result, as its original exception when there is one."""
+    raise result.get('exception') or TranslationError(result['error'])
+
+
+def _uses_memory(text):
+    """Whether text goes through the sentence memory rather than as one unit."""
+    if not getattr(settings, 'TRANSLATION_MEMORY', True):
+        return False
+    return sum(1 for sentence, _ in split_sentences(text) if sentence) > 1
+
+
+def resolve_src(text, src):
+    """
+    Detect the language of text locally when src is 'auto'. Returns (src,
+    detection): src becomes the detected language only when the detector is
+    confident the text is in one of its supported languages, and stays
+    'auto' otherwise, so only then can a text be returned untranslated.
+    detection is None when it did not run or the text is too short to tell.
+    """
+    if src != 'auto' or not getattr(settings, 'TRANSLATION_DETECTION', True):
+        return src, None
+    detection = detect_language(text)
+    if (detection is not None and detection.language != UNDETERMINED
+            and detection.confidence >= settings.TRANSLATION_DETECTION_MIN_CONFIDENCE):
+        return detection.language, detection
+    return src, detection
+
+
+def _with_detection(result, detection):
+    if detection is None or 'error' in result:
+        return result
+    return {**result, 'detected_language': detection.language, 'detection_confidence': round(detection.confidence, 3)}
+
+
+def _untranslated(text, dest):
+    """Result for a text already in the destination language."""
+    return {'translated_text': text, 'src': dest, 'dest': dest, 'pronunciation': None, 'cached': None}
+
+
+def cached_translation(text, src, dest):
+    """translate()'s result for text when the cache has all of it, else None."""
+    if _uses_memory(text):
+        pieces = split_sentences(text)
+        units = [sentence for sentence, _ in pieces]
+        keys, unique = _plan_units(units, src, dest)
+        # Not counted yet: on a miss the sentences are looked up again on their way upstream
+        found = translation_cache.get_many(list(unique.values()), src, dest, record=False)
+        if len(found) < len(unique):
+            return None
+        translation_cache.record(found, len(unique))
+        results = {key: {**result, 'cached': tier} for key, (result, tier) in found.items()}
+        return _join_results(pieces, _unit_results(units, keys, results, src, dest), src, dest)
+    result, tier = translation_cache.get(text, src, dest)
+    return None if result is None else {**result, 'cached': tier}
+
+
+async def acached_translation(text, src, dest):
+    if not _uses_memory(text):
+        result = translation_cache.get_from_memory(text, src, dest)
+        if result is not None:
+            return {**result, 'cached': 'memory'}
+    return await sync_to_async(cached_translation)(text, src, dest)
+
+
+def _fetch(text, src, dest):
+    if _uses_memory(text):
+        result = translate_segments([text], src=src, dest=dest)[0]
+        if 'error' in result:
+            _raise_error(result)
+        return result
+    result = call_translator(text, src, dest)
+    # Fallback translations are served but not cached, so the primary backend replaces them once it recovers
+    if not result.get('fallback'):
+        translation_cache.put(text, src, dest, result)
+    return {**result, 'cached': None}
+
+
+async def _afetch(text, src, dest):
+    if _uses_memory(text):
+        result = (await atranslate_segments([text], src=src, dest=dest))[0]
+        if 'error' in result:
+            _raise_error(result)
+        return result
+    result = await acall_translator(text, src, dest)
+    if not result.get('fallback'):
+        await sync_to_async(translation_cache.put)(text, src, dest, result)
+    return {**result, 'cached': None}
+
+
+def translate(text, src='auto', dest='en'):
+    """
+    Translate text, calling the translator only when neither cache tier has
+    the (text, src, dest) triple. src='auto' is resolved locally when
+    possible, and texts already in dest are returned as they are. Texts of
+    several sentences are translated sentence by sentence through the
+    translation memory. Identical requests in flight at the same time share
+    one translation (translation_flight), across workers when
+    SINGLE_FLIGHT_CACHE is set. Returns the result dict with a "cached" key
+    set to 'memory', 'database' or None.
+    """
+    src, detection = resolve_src(text, src)
+    if src == dest:
+        return _with_detection(_untranslated(text, dest), detection)
+    result = cached_translation(text, src, dest)
+    if result is None:
+        result = translation_flight.do(
+            translation_key(text, src, dest),
+            lambda: _fetch(text, src, dest),
+            lookup=lambda: cached_translation(text, src, dest),
+        )
+    return _with_detection(result, detection)
+
+
+async def atranslate(text, src='auto', dest='en'):
+    """Async translate(): memory hits return without leaving the event loop."""
+    src, detection = resolve_src(text, src)
+    if src == dest:
+        return _with_detection(_untranslated(text, dest), detection)
+    result = await acached_translation(text, src, dest)
+    if result is None:
+        result = await translation_flight.ado(
+            translation_key(text, src, dest),
+            lambda: _afetch(text, src, dest),
+            lookup=lambda: acached_translation(text, src, dest),
+        )
+    return _with_detection(result, detection)
+
+
+def _plan_units(units, src, dest):
+    """Deduplicate units by cache key. Returns (keys, {key: text}) with None keys for blank units."""
+    keys = [translation_key(unit, src, dest) if unit.strip() else None for unit in units]
+    unique = {}
+    for unit, key in zip(units, keys):
+        if key is not None:
+            unique.setdefault(key, unit)
+    return keys, unique
+
+
+def _store_units(results, misses, translated, src, dest):
+    stored = []
+    for (key, text), result in zip(misses, translated):
+        if isinstance(result, Exception):
+            results[key] = {'error': str(result), 'exception': result}
+        else:
+            results[key] = {**result, 'cached': None}
+            if not result.get('fallback'):
+                stored.append((text, result))
+    return stored
+
+
+def _unit_results(units, keys, results, src, dest):
+    blank = {'src': src, 'dest': dest, 'pronunciation': None, 'cached': None}
+    return [
+        results[key] if key is not None else {**blank, 'translated_text': unit}
+        for unit, key in zip(units, keys)
+    ]
+
+
+def translate_units(units, src='auto', dest='en', concurrency=None, deadline=None):
+    """
+    Translate a list of texts as they are. Each distinct text is looked up
+    in the cache once, and only the misses go upstream, at most concurrency
+    at a time and until the time.monotonic() deadline, if any. Returns one
+    result per text in input order, or {'error': message, 'exception':
+    exception} for texts whose translation failed or ran out of time.
+    Blank texts are returned as they are.
+    """
+    concurrency = concurrency or settings.TRANSLATION_BATCH_CONCURRENCY
+    keys, unique = _plan_units(units, src, dest)
+    results = {
+        key: {**result, 'cached': tier}
+        for key, (result, tier) in translation_cache.get_many(list(unique.values()), src, dest).items()
+    }
+    misses = [(key, text) for key, text in unique.items() if key not in results]
+    if misses:
+        translated = call_translator_many([text for _, text in misses], src, dest, concurrency,
+                                          _remaining(deadline))
+        translation_cache.put_many(_store_units(results, misses, translated, src, dest), src, dest)
+    return _unit_results(units, keys, results, src, dest)
+
+
+async def atranslate_units(units, src='auto', dest='en', concurrency=None, deadline=None):
+    concurrency = concurrency or settings.TRANSLATION_BATCH_CONCURRENCY
+    keys, unique = _plan_units(units, src, dest)
+    found = await sync_to_async(translation_cache.get_many)(list(unique.values()), src, dest)
+    results = {key: {**result, 'cached': tier} for key, (result, tier) in found.items()}
+    misses = [(key, text) for key, text in unique.items() if key not in results]
+    if misses:
+        translated = await acall_translator_many([text for _, text in misses], src, dest, concurrency,
+                                                 _remaining(deadline))
+        stored = _store_units(results, misses, translated, src, dest)
+        await sync_to_async(translation_cache.put_many)(stored, src, dest)
+    return _unit_results(units, keys, results, src, dest)
+
+
+def _join_results(pieces, results, src, dest):
+    """Reassemble the sentence results of one segment."""
+    errors = [result for result in results if 'error' in result]
+    if errors:
+        return errors[0]
+    sentences = [result for (sentence, _), result in zip(pieces, results) if sentence]
+    if len(sentences) == 1 and len(pieces) == 1:
+        return sentences[0]
+    tiers = {result['cached'] for result in sentences}
+    detected = Counter(result['src'] for result in sentences).most_common(1)
+    return {
+        'translated_text': join_sentences([result['translated_text'] for result in results], pieces),
+        'src': detected[0][0] if detected else src,
+        'dest': dest,
+        'pronunciation': None,
+        'cached': None if None in tiers else ('database' if 'database' in tiers else 'memory'),
+        'fallback': next((result['fallback'] for result in sentences if result.get('fallback')), None),
+    }
+
+
+def _split_segments(segments):
+    if not getattr(settings, 'TRANSLATION_MEMORY', True):
+        return [[[segment, '']] for segment in segments]
+    return [split_sentences(segment) for segment in segments]
+
+
+def _group_segments(segments, src, dest):
+    """
+    Resolve the source language of each segment. Returns (detections,
+    groups), groups mapping each source language to the indexes of its
+    segments; segments already in dest are left out of every group.
+    """
+    detections = []
+    groups = {}
+    for index, segment in enumerate(segments):
+        segment_src, detection = resolve_src(segment, src)
+        detections.append(detection)
+        if segment_src != dest:
+            groups.setdefault(segment_src, []).append(index)
+    return detections, groups
+
+
+def _segment_results(segments, dest, detections, translated):
+    return [
+        _with_detection(translated[index] if index in translated else _untranslated(segment, dest), detection)
+        for index, (segment, detection) in enumerate(zip(segments, detections))
+    ]
+
+
+def _translate_split(segments, src, dest, concurrency, deadline):
+    split = _split_segments(segments)
+    results = iter(translate_units(
+        [sentence for pieces in split for sentence, _ in pieces], src=src, dest=dest, concurrency=concurrency,
+        deadline=deadline,
+    ))
+    return [_join_results(pieces, [next(results) for _ in pieces], src, dest) for pieces in split]
+
+
+async def _atranslate_split(segments, src, dest, concurrency, deadline):
+    split = _split_segments(segments)
+    results = iter(await atranslate_units(
+        [sentence for pieces in split for sentence, _ in pieces], src=src, dest=dest, concurrency=concurrency,
+        deadline=deadline,
+    ))
+    return [_join_results(pieces, [next(results) for _ in pieces], src, dest) for pieces in split]
+
+
+def translate_segments(segments, src='auto', dest='en', concurrency=None, timeout=None):
+    """
+    Translate a list of segments through the translation memory: segments
+    are split into sentences, all their distinct sentences are translated
+    together with translate_units, and each segment is put back together.
+    With src='auto' each segment's language is detected on its own, and
+    segments already in dest are returned as they are. Returns one
+    translate() result or {'error': message} per segment. With timeout,
+    segments not translated within that many seconds in all fail with a
+    BackendTimeout error.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    detections, groups = _group_segments(segments, src, dest)
+    translated = {}
+    for group_src, indexes in groups.items():
+        results = _translate_split([segments[index] for index in indexes], group_src, dest, concurrency, deadline)
+        translated.update(zip(indexes, results))
+    return _segment_results(segments, dest, detections, translated)
+
+
+async def atranslate_segments(segments, src='auto', dest='en', concurrency=None, timeout=None):
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    detections, groups = _group_segments(segments, src, dest)
+    translated = {}
+    for group_src, indexes in groups.items():
+        results = await _atranslate_split([segments[index] for index in indexes], group_src, dest, concurrency,
+                                          deadline)
+        translated.update(zip(indexes, results))
+    return _segment_results(segments, dest, detections, translated)
+
+
+def response_data(text, result):
+    """Body of a translate response, shared by the sync and async views."""
+    return {
+        'original_text': text,
+        'translated_text': result['translated_text'],
+        'src': result['src'],
+        'dest': result['dest'],
+        'pronunciation': result['pronunciation'],
+        'cached': result['cached'] is not None,
+        'fallback': bool(result.get('fallback')),
+        'detected_language': result.get('detected_language'),
+        'detection_confidence': result.get('detection_confidence'),
+    }
+
+
+def error_response(exception):
+    """
+    (body, status, headers) of a failed translate request, shared by the
+    sync and async views: 400 for unsupported languages, 503 with
+    Retry-After when the backend is down or timed out, 500 otherwise.
+    Call it from the except block handling exception.
+    """
+    if isinstance(exception, InvalidLanguage):
+        return {'error': str(exception)}, 400, {}
+    if isinstance(exception, BackendUnavailable):
+        logger.warning('Translation unavailable: %s', exception)
+        retry_after = getattr(exception, 'retry_after', None)
+        return {'error': str(exception)}, 503, {'Retry-After': str(math.ceil(retry_after))} if retry_after else {}
+    logger.exception('Translation failed')
+    return {'error': str(exception)}, 500, {}
@@ -0,0 +1,84 @@
+"""
+Local stand-in for the Google Translate endpoint used by googletrans, for
+benchmarks and tests that must not reach the network. Point
+TRANSLATION_SERVICE_URL at StandInServer.url to use it.
+
+Translations are deterministic: "[dest] text", with src echoed back (or
+"en" for src=auto). An optional latency simulates the upstream round trip.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def standin_translation(text, dest):
+    return f'[{dest}] {text}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the benchmark measures connection reuse
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/translate_a/single':
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        text = params.get('q', [''])[0]
+        src = params.get('sl', ['auto'])[0]
+        dest = params.get('tl', ['en'])[0]
+        self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = json.dumps(
+            [[[standin_translation(text, dest), text, None, None, 10]], None, 'en' if src == 'auto' else src]
+        ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    """A threaded stand-in server on a free local port, usable as a context manager."""
+
+    def __init__(self, latency=0.0, port=0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='translation-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,663 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from common.testing import TemporaryMediaMixin
+from users.models import CustomUser
+from .cache import MemoryLRU, TranslationCache, translation_cache, translation_key
+from .models import CachedTranslation
+
+
+def fake_result(text, src, dest):
+    return {'translated_text': f'[{dest}] {text}', 'src': 'es' if src == 'auto' else src,
+            'dest': dest, 'pronunciation': None}
+
+
+class TranslationCacheTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        translation_cache.memory.clear()
+
+    def test_repeated_translation_skips_upstream(self):
+        url = reverse('materials-translate-text')
+        with mock.patch('translations.services.call_translator', side_effect=fake_result) as upstream:
+            first = self.client.post(url, {'text': 'Hola clase', 'src': 'auto', 'dest': 'en'}, format='json')
+            second = self.client.post(url, {'text': '  Hola clase\r\n', 'src': 'auto', 'dest': 'en'}, format='json')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertFalse(first.data['cached'])
+        self.assertTrue(second.data['cached'])
+        self.assertEqual(second.data['translated_text'], '[en] Hola clase')
+        self.assertEqual(second.data['src'], 'es')
+        self.assertEqual(upstream.call_count, 1)
+
+    def test_sentences_are_counted_once_per_request(self):
+        def counters():
+            stats = translation_cache.stats()
+            return stats['memory_hits'] + stats['database_hits'], stats['misses']
+
+        def fake_many(texts, src, dest, concurrency, timeout=None):
+            return [fake_result(text, src, dest) for text in texts]
+
+        url = reverse('materials-translate-text')
+        text = 'Hoy empieza la unidad. Traed el cuaderno.'
+        with mock.patch('translations.services.call_translator_many', side_effect=fake_many):
+            hits, misses = counters()
+            self.client.post(url, {'text': text, 'src': 'es', 'dest': 'en'}, format='json')
+            self.assertEqual(counters(), (hits, misses + 2))
+
+            response = self.client.post(url, {'text': text, 'src': 'es', 'dest': 'en'}, format='json')
+            self.assertEqual(counters(), (hits + 2, misses + 2))
+        self.assertEqual(response.data['translated_text'], '[en] Hoy empieza la unidad. [en] Traed el cuaderno.')
+        self.assertTrue(response.data['cached'])
+
+    def test_database_tier_survives_memory_eviction(self):
+        cache = TranslationCache(max_bytes=4096)
+        cache.put('Hola', 'es', 'en', fake_result('Hola', 'es', 'en'))
+        self.assertEqual(CachedTranslation.objects.get(key=translation_key('Hola', 'es', 'en')).text, 'Hola')
+
+        cache.memory.clear()
+        self.assertEqual(cache.get('Hola', 'es', 'en')[1], 'database')
+        self.assertEqual(cache.get('Hola', 'es', 'en')[1], 'memory')
+        self.assertEqual(cache.get('Hola', 'es', 'fr'), (None, None))
+        stats = cache.stats()
+        self.assertEqual((stats['memory_hits'], stats['database_hits'], stats['misses']), (1, 1, 1))
+
+    def test_memory_tier_is_bounded_by_bytes(self):
+        lru = MemoryLRU(max_bytes=1000)
+        for number in range(10):
+            lru.put(str(number), fake_result('x' * 100, 'es', 'en'))
+        self.assertLessEqual(lru.size, 1000)
+        self.assertIsNone(lru.get('0'))
+        self.assertIsNotNone(lru.get('9'))
+
+    def test_stats_are_staff_only(self):
+        url = reverse('materials-translation-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_rate', response.data)
+
+
+class TranslatorClientTests(APITestCase):
+    def setUp(self):
+        from .standin import StandInServer
+
+        self.server = StandInServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = self.settings(TRANSLATION_SERVICE_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        translation_cache.memory.clear()
+
+    def test_shared_client_reuses_loop_and_translator(self):
+        from .client import TranslatorClient
+
+        client = TranslatorClient()
+        self.addCleanup(client.close)
+        self.assertEqual(client.translate('Hola', 'es', 'en')['translated_text'], '[en] Hola')
+        loop, backend = client._loop, client._backends['googletrans']
+        self.assertEqual(client.translate('Adiós', 'es', 'fr')['translated_text'], '[fr] Adiós')
+        self.assertIs(client._loop, loop)
+        self.assertIs(client._backends['googletrans'], backend)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_async_view(self):
+        from asgiref.sync import async_to_sync
+        from django.test import RequestFactory
+        from .client import translator_client
+        from .views import translate_view
+
+        self.addCleanup(translator_client.close)
+        user = CustomUser.objects.create_user(username='teacher', email='teacher@example.com', password='pw')
+        token = Token.objects.create(user=user)
+        factory = RequestFactory()
+
+        request = factory.post('/api/materials/translate/', {'text': 'Bon dia', 'src': 'ca', 'dest': 'es'},
+                               content_type='application/json', HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = async_to_sync(translate_view)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'[es] Bon dia', response.content)
+
+        request = factory.post('/api/materials/translate/', {'text': 'Bon dia'}, content_type='application/json')
+        self.assertEqual(async_to_sync(translate_view)(request).status_code, 401)
+
+    def test_async_view_is_routed_by_setting(self):
+        import importlib
+        from django.urls import clear_url_caches, resolve
+        import api.urls
+        import backend.urls
+        from .views import translate_view
+
+        def reload_urls():
+            importlib.reload(api.urls)
+            importlib.reload(backend.urls)
+            clear_url_caches()
+
+        self.assertIsNot(resolve('/api/materials/translate/').func, translate_view)
+        with override_settings(TRANSLATION_ASYNC_VIEW=True):
+            reload_urls()
+            # Runs after the override is gone, restoring the default routes
+            self.addCleanup(reload_urls)
+            self.assertIs(resolve('/api/materials/translate/').func, translate_view)
+
+
+class BatchTranslationTests(APITestCase):
+    def setUp(self):
+        from .standin import StandInServer
+        from .client import translator_client
+
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.server = StandInServer(latency=0.05).start()
+        self.addCleanup(self.server.stop)
+        settings_override = self.settings(TRANSLATION_SERVICE_URL=self.server.url, TRANSLATION_BATCH_CONCURRENCY=4)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(translator_client.close)
+        translation_cache.memory.clear()
+
+    def test_segments_are_deduplicated_and_kept_in_order(self):
+        import time
+        from .client import translator_client
+
+        translation_cache.put('Nombre:', 'es', 'en', fake_result('Nombre:', 'es', 'en'))
+        segments = ['Nombre:', 'Pregunta 1', '', 'Pregunta 2', 'Pregunta 1'] + [f'Frase {n}' for n in range(8)]
+
+        # Build the shared client first so only the batch itself is timed
+        translator_client.translate('Hola', 'es', 'fr')
+        start = time.perf_counter()
+        response = self.client.post(reverse('materials-translate-batch'),
+                                    {'segments': segments, 'src': 'es', 'dest': 'en'}, format='json')
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['original_text'] for result in results], segments)
+        self.assertEqual(results[1]['translated_text'], '[en] Pregunta 1')
+        self.assertEqual(results[4]['translated_text'], '[en] Pregunta 1')
+        self.assertEqual(results[2]['translated_text'], '')
+        self.assertTrue(results[0]['cached'])
+        # 10 distinct uncached segments, 4 at a time against 50 ms of latency
+        self.assertEqual(self.server.requests, 1 + 10)
+        self.assertLess(elapsed, 10 * 0.05)
+
+        response = self.client.post(reverse('materials-translate-batch'),
+                                    {'segments': segments, 'src': 'es', 'dest': 'en'}, format='json')
+        self.assertTrue(all(result['cached'] for result in response.data['results'] if result['original_text']))
+        self.assertEqual(self.server.requests, 1 + 10)
+
+    def test_validation(self):
+        url = reverse('materials-translate-batch')
+        self.assertEqual(self.client.post(url, {'segments': []}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'segments': [1, 2]}, format='json').status_code, 400)
+        with self.settings(TRANSLATION_BATCH_MAX=2):
+            self.assertEqual(self.client.post(url, {'segments': ['a', 'b', 'c']}, format='json').status_code, 400)
+
+
+@override_settings(TRANSLATION_JOBS_ASYNC=False, MATERIALS_PROCESSING_ASYNC=False, TRANSLATION_JOB_BATCH_SIZE=2)
+class TranslationJobTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from classrooms.models import Classroom
+        from materials.models import Document
+        from .client import translator_client
+        from .standin import StandInServer
+
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.server = StandInServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = self.settings(TRANSLATION_SERVICE_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(translator_client.close)
+        translation_cache.memory.clear()
+
+        self.classroom = Classroom.objects.create(
+            name='TestClassroom',
+            academic_course='Test Course',
+            description='Test Description',
+            academic_year='2023-2024',
+            creator=self.user
+        )
+        self.text = 'Unidad 3\n\nLa célula.\nEl núcleo.\nLa membrana.\n'
+        self.document = Document.objects.create(
+            name='Unidad 3', classroom=self.classroom,
+            file=SimpleUploadedFile('test_unidad.txt', self.text.encode('utf-8')),
+        )
+
+    def tearDown(self):
+        from classrooms.models import Classroom
+        from materials.media_gc import sweep_deleted_files
+
+        Classroom.objects.all().delete()
+        sweep_deleted_files()
+
+    def test_job_creates_translated_document(self):
+        from materials.extraction import get_document_text
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('translation-jobs-list'),
+                                        {'document': self.document.id, 'src': 'es', 'dest': 'en'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(reverse('translation-jobs-detail', args=[response.data['id']]))
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['progress'], 1.0)
+        self.assertEqual(response.data['total_segments'], 6)
+
+        from materials.models import Document
+        result = Document.objects.get(pk=response.data['result'])
+        self.assertEqual(result.classroom, self.classroom)
+        self.assertEqual(result.name, 'Unidad 3 (en)')
+        self.assertEqual(
+            get_document_text(result),
+            '[en] Unidad 3\n\n[en] La célula.\n[en] El núcleo.\n[en] La membrana.\n'
+        )
+
+    def test_failed_job_resumes_from_checkpoint(self):
+        from .jobs import translate_segments
+
+        calls = []
+
+        def flaky(segments, **kwargs):
+            calls.append(list(segments))
+            if len(calls) == 2:
+                return [{'error': 'Upstream unavailable'} for _ in segments]
+            return translate_segments(segments, **kwargs)
+
+        with mock.patch('translations.jobs.translate_segments', side_effect=flaky):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('translation-jobs-list'),
+                                            {'document': self.document.id, 'src': 'es', 'dest': 'en'},
+                                            format='json')
+            job = self.client.get(reverse('translation-jobs-detail', args=[response.data['id']])).data
+            self.assertEqual(job['status'], 'failed')
+            self.assertEqual(job['error'], 'Upstream unavailable')
+            self.assertEqual(job['completed_segments'], 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('translation-jobs-resume', args=[job['id']]))
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = self.client.get(reverse('translation-jobs-detail', args=[job['id']])).data
+        self.assertEqual(job['status'], 'completed')
+        # The first batch was not translated again
+        self.assertEqual(calls[2], ['La célula.', 'El núcleo.'])
+        self.assertEqual(self.client.post(reverse('translation-jobs-resume', args=[job['id']])).status_code, 400)
+
+    def test_resume_command_retries_transient_failures_only(self):
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .backends import BackendTimeout, InvalidLanguage
+        from .jobs import run_translation_job
+        from .models import TranslationJob
+
+        def create_job(**fields):
+            return TranslationJob.objects.create(user=self.user, document=self.document, src='es', dest='en', **fields)
+
+        # Failures are classified as they happen
+        transient, permanent = create_job(), create_job()
+        for job, exception in [(transient, BackendTimeout('Timed out')), (permanent, InvalidLanguage('Bad dest'))]:
+            failure = [{'error': str(exception), 'exception': exception}]
+            with mock.patch('translations.jobs.translate_segments', side_effect=lambda segments, **kwargs: failure):
+                run_translation_job(job.id)
+        transient.refresh_from_db()
+        permanent.refresh_from_db()
+        self.assertEqual((transient.status, transient.retryable, transient.attempts), ('failed', True, 1))
+        self.assertEqual((permanent.status, permanent.retryable, permanent.attempts), ('failed', False, 1))
+
+        exhausted = create_job(status=TranslationJob.FAILED, retryable=True, attempts=5)
+        interrupted = create_job(status=TranslationJob.RUNNING, attempts=1)
+        TranslationJob.objects.filter(pk=interrupted.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        output = StringIO()
+        call_command('resume_translation_jobs', stdout=output)
+        self.assertIn('Resumed 2 translation jobs, 2 completed.', output.getvalue())
+        statuses = dict(TranslationJob.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[transient.id], 'completed')
+        self.assertEqual(statuses[interrupted.id], 'completed')
+        self.assertEqual(statuses[permanent.id], 'failed')
+        self.assertEqual(statuses[exhausted.id], 'failed')
+
+    def test_long_lines_are_split_and_rejoined(self):
+        from .jobs import segment_text
+
+        text = 'Primera frase. Segunda frase algo más larga. Tercera.\nCorta\n' + 'x' * 25
+        segments = segment_text(text, 20)
+        self.assertEqual(''.join(segment + separator for segment, separator in segments), text)
+        self.assertTrue(all(len(segment) <= 20 for segment, _ in segments))
+        self.assertEqual(segments[0], ['Primera frase.', ' '])
+
+    def test_only_own_materials(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pw')
+        self.client.force_authenticate(other)
+        response = self.client.post(reverse('translation-jobs-list'),
+                                    {'document': self.document.id, 'dest': 'en'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TranslationMemoryTests(APITestCase):
+    def setUp(self):
+        from .client import translator_client
+        from .standin import StandInServer
+
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.server = StandInServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = self.settings(TRANSLATION_SERVICE_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(translator_client.close)
+        translation_cache.memory.clear()
+
+    def test_only_new_sentences_go_upstream(self):
+        url = reverse('materials-translate-text')
+        instructions = 'Lee el texto con atención. Responde en la hoja de respuestas.'
+
+        response = self.client.post(url, {'text': f'{instructions}\nPregunta 1: ¿Qué es la célula?',
+                                          'src': 'es', 'dest': 'en'}, format='json')
+        self.assertEqual(response.data['translated_text'], '[en] Lee el texto con atención. '
+                                                           '[en] Responde en la hoja de respuestas.\n'
+                                                           '[en] Pregunta 1: ¿Qué es la célula?')
+        self.assertEqual(self.server.requests, 3)
+        self.assertFalse(response.data['cached'])
+
+        response = self.client.post(url, {'text': f'Pregunta 2: ¿Qué es el núcleo?\n\n{instructions}',
+                                          'src': 'es', 'dest': 'en'}, format='json')
+        self.assertEqual(self.server.requests, 4)
+        self.assertTrue(response.data['translated_text'].endswith('\n\n[en] Lee el texto con atención. '
+                                                                  '[en] Responde en la hoja de respuestas.'))
+
+        response = self.client.post(url, {'text': instructions, 'src': 'es', 'dest': 'en'}, format='json')
+        self.assertTrue(response.data['cached'])
+        self.assertEqual(self.server.requests, 4)
+
+    def test_sentences_rejoin_exactly(self):
+        from .memory import split_sentences
+
+        text = '  El Sr. García llegó. ¿Y tú? «Bien». Ver pág. 3 del libro.\n\nJ. Smith wrote it.  '
+        pieces = split_sentences(text)
+        self.assertEqual(''.join(sentence + separator for sentence, separator in pieces), text)
+        self.assertEqual([sentence for sentence, _ in pieces if sentence], [
+            'El Sr. García llegó.', '¿Y tú?', '«Bien».', 'Ver pág. 3 del libro.', 'J. Smith wrote it.'
+        ])
+
+
+class LanguageDetectionTests(APITestCase):
+    def setUp(self):
+        from .client import translator_client
+        from .standin import StandInServer
+
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.server = StandInServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = self.settings(TRANSLATION_SERVICE_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(translator_client.close)
+        translation_cache.memory.clear()
+
+    def test_labelled_samples(self):
+        from .detection import detect_language
+        from .management.commands.benchmark_language_detection import SAMPLES
+
+        correct = sum(1 for language, text in SAMPLES if getattr(detect_language(text), 'language', None) == language)
+        self.assertGreaterEqual(correct / len(SAMPLES), 0.95)
+        self.assertIsNone(detect_language('OK'))
+        self.assertLess(detect_language('Hola').confidence, 0.9)
+
+    def test_auto_is_resolved_locally(self):
+        url = reverse('materials-translate-text')
+
+        response = self.client.post(url, {'text': 'Remember that the exam is next Tuesday.', 'dest': 'en'},
+                                    format='json')
+        self.assertEqual(response.data['translated_text'], 'Remember that the exam is next Tuesday.')
+        self.assertEqual(response.data['src'], 'en')
+        self.assertEqual(response.data['detected_language'], 'en')
+        self.assertGreaterEqual(response.data['detection_confidence'], 0.9)
+        self.assertEqual(self.server.requests, 0)
+
+        # The detected language is sent upstream and keys the cache
+        response = self.client.post(url, {'text': 'Recordeu que l\'examen és dimarts.', 'dest': 'en'}, format='json')
+        self.assertEqual(response.data['src'], 'ca')
+        self.assertEqual(response.data['detected_language'], 'ca')
+        self.assertEqual(self.server.requests, 1)
+        response = self.client.post(url, {'text': 'Recordeu que l\'examen és dimarts.', 'src': 'ca', 'dest': 'en'},
+                                    format='json')
+        self.assertTrue(response.data['cached'])
+        self.assertIsNone(response.data['detected_language'])
+
+        # Too short to tell: left to the translator
+        response = self.client.post(url, {'text': 'Hola', 'dest': 'fr'}, format='json')
+        self.assertEqual(response.data['translated_text'], '[fr] Hola')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_unprofiled_languages_are_undetermined(self):
+        from .detection import UNDETERMINED, detect_language
+
+        for text in [
+            'Hoje vamos estudar a fotossíntese e o papel das folhas na produção de alimento.',
+            'Hoxe imos estudar a fotosíntese e o papel das follas na produción de alimento.',
+            'Heute lernen wir die Photosynthese und die Rolle der Blätter bei der Ernährung der Pflanze.',
+            'Oggi studiamo la fotosintesi e il ruolo delle foglie nella produzione del cibo.',
+            'Gaur fotosintesia eta hostoek elikagaiak sortzeko duten zeregina ikasiko dugu.',
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(detect_language(text).language, UNDETERMINED)
+
+    def test_unprofiled_language_is_not_returned_untranslated(self):
+        from .detection import UNDETERMINED
+
+        url = reverse('materials-translate-text')
+
+        # Close to Spanish, but only the translator can tell what it is
+        for requests, text in enumerate([
+            'Os alumnos teñen que entregar o traballo antes do venres.',
+            'Os alunos têm de entregar o trabalho antes de sexta-feira.',
+        ], start=1):
+            response = self.client.post(url, {'text': text, 'dest': 'es'}, format='json')
+            self.assertEqual(response.data['translated_text'], f'[es] {text}')
+            # Sent upstream as 'auto', which the stand-in answers as English
+            self.assertEqual(response.data['src'], 'en')
+            self.assertEqual(response.data['detected_language'], UNDETERMINED)
+            self.assertEqual(self.server.requests, requests)
+
+    def test_batch_detects_each_segment(self):
+        response = self.client.post(reverse('materials-translate-batch'), {
+            'segments': ['Les plantes ont besoin de lumière.', 'Las plantas necesitan luz.',
+                         'Les plantes necessiten llum.'],
+            'dest': 'es',
+        }, format='json')
+        results = response.data['results']
+        self.assertEqual([result['detected_language'] for result in results], ['fr', 'es', 'ca'])
+        self.assertEqual([result['translated_text'] for result in results], [
+            '[es] Les plantes ont besoin de lumière.', 'Las plantas necesitan luz.', '[es] Les plantes necessiten llum.'
+        ])
+        self.assertEqual(self.server.requests, 2)
+
+
+class FailingBackend:
+    async def translate(self, text, src, dest):
+        raise ConnectionError('Upstream unreachable')
+
+    async def aclose(self):
+        pass
+
+
+@override_settings(TRANSLATION_BACKENDS={'failing': 'translations.tests.FailingBackend'},
+                   TRANSLATION_BREAKER_FAILURES=2, TRANSLATION_BREAKER_RESET_TIMEOUT=60)
+class TranslationBackendTests(APITestCase):
+    def setUp(self):
+        from .client import translator_client
+
+        self.user = CustomUser.objects.create_user(
+            username='testuser',
+            email='testuser@example.com',
+            password='testpassword',
+            is_staff=True,
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.addCleanup(translator_client.close)
+        translator_client.close()
+        translation_cache.memory.clear()
+
+    def translate(self, text):
+        return self.client.post(reverse('materials-translate-text'), {'text': text, 'src': 'es', 'dest': 'en'},
+                                format='json')
+
+    def test_breaker_opens_and_half_opens(self):
+        from .backends import CircuitOpen
+        from .breaker import CircuitBreaker
+
+        now = [0.0]
+        breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+
+        now[0] = 11
+        breaker.before_call()
+        # Only one trial call while half-open
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.stats()['retry_after'], 10)
+
+        now[0] = 22
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.stats(), {'state': 'closed', 'consecutive_failures': 0, 'times_opened': 2,
+                                           'retry_after': 0.0})
+
+    @override_settings(TRANSLATION_BACKEND='standin', TRANSLATION_STANDIN_LATENCY=5, TRANSLATION_TIMEOUT=0.1)
+    def test_slow_backend_times_out_then_fails_fast(self):
+        import time
+
+        start = time.perf_counter()
+        for _ in range(2):
+            response = self.translate('Hola clase')
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        response = self.translate('Hola clase')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertLess(time.perf_counter() - start, 1)
+
+        upstream = self.client.get(reverse('materials-translation-cache-stats')).data['upstream']
+        stats = upstream['backends']['standin']
+        self.assertEqual((stats['calls'], stats['timeouts'], stats['rejected']), (3, 2, 1))
+        self.assertEqual(stats['breaker']['state'], 'open')
+        self.assertEqual(stats['latency_ms']['samples'], 2)
+
+    @override_settings(TRANSLATION_BACKEND='standin', TRANSLATION_STANDIN_LATENCY=0.3, TRANSLATION_TIMEOUT=5,
+                       TRANSLATION_BATCH_TIMEOUT=0.5, TRANSLATION_BATCH_CONCURRENCY=1)
+    def test_batch_deadline(self):
+        import time
+
+        start = time.perf_counter()
+        response = self.client.post(reverse('materials-translate-batch'), {
+            'segments': ['Uno', 'Dos', 'Tres', 'Cuatro'], 'src': 'es', 'dest': 'en',
+        }, format='json')
+        self.assertLess(time.perf_counter() - start, 1)
+        results = response.data['results']
+        self.assertEqual(results[0]['translated_text'], '[en] Uno')
+        self.assertEqual([result.get('error') for result in results[1:]],
+                         ['Not translated before the batch deadline'] * 3)
+
+        # Cancelled calls say nothing about the backend
+        stats = self.client.get(reverse('materials-translation-cache-stats')).data['upstream']['backends']['standin']
+        self.assertEqual(stats['breaker']['state'], 'closed')
+        self.assertEqual(stats['failures'], 0)
+
+    @override_settings(TRANSLATION_BACKEND='failing', TRANSLATION_FALLBACK_BACKEND='standin')
+    def test_fallback_results_are_not_cached(self):
+        for _ in range(3):
+            response = self.translate('Hola clase')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['translated_text'], '[en] Hola clase')
+            self.assertTrue(response.data['fallback'])
+            self.assertFalse(response.data['cached'])
+        self.assertFalse(CachedTranslation.objects.exists())
+
+        from .client import translator_client
+        backends = translator_client.stats()['backends']
+        self.assertEqual(backends['failing']['failures'], 2)
+        self.assertEqual(backends['failing']['rejected'], 1)
+        self.assertEqual(backends['standin']['calls'], 3)
+
+        # Batch segments fall back one by one
+        response = self.client.post(reverse('materials-translate-batch'),
+                                    {'segments': ['Uno', 'Dos'], 'src': 'es', 'dest': 'fr'}, format='json')
+        self.assertEqual([result['translated_text'] for result in response.data['results']], ['[fr] Uno', '[fr] Dos'])
+
+
+class SingleFlightTranslationTests(APITestCase):
+    def setUp(self):
+        from .client import translator_client
+        from .standin import StandInServer
+
+        self.server = StandInServer(latency=0.2).start()
+        self.addCleanup(self.server.stop)
+        settings_override = self.settings(TRANSLATION_SERVICE_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(translator_client.close)
+        translation_cache.memory.clear()
+
+    def test_identical_requests_share_one_upstream_call(self):
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from .services import atranslate, translation_flight
+
+        async def translate_together():
+            return await asyncio.gather(*(atranslate('Hola clase', src='es', dest='en') for _ in range(5)))
+
+        followers = translation_flight.stats()['followers']
+        results = async_to_sync(translate_together)()
+        self.assertEqual({result['translated_text'] for result in results}, {'[en] Hola clase'})
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(translation_flight.stats()['followers'] - followers, 4)
@@ -0,0 +1,100 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from materials.views import classroom_upload_error
+from .jobs import schedule_translation_job
+from .models import TranslationJob
+from .serializers import TranslationJobSerializer
+from .services import atranslate, error_response, response_data
+
+
+def _authenticate(drf_request):
+    # Touching .user runs the DRF authenticators, CSRF check included for sessions
+    user = drf_request.user
+    if not (user and user.is_authenticated):
+        raise exceptions.NotAuthenticated()
+    return drf_request.data
+
+
+@csrf_exempt
+async def translate_view(request):
+    """
+    Natively async version of DocumentViewSet.translate_text, routed in its
+    place when TRANSLATION_ASYNC_VIEW is on. Authentication and
+    parsing go through DRF on a worker thread; the translation itself is
+    awaited on the shared client without holding a thread.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'},
+                            status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    drf_request = Request(
+        request,
+        parsers=[JSONParser(), FormParser(), MultiPartParser()],
+        authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        data = await sync_to_async(_authenticate)(drf_request)
+    except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as e:
+        # Same status and header as DRF's APIView.permission_denied
+        header = drf_request.authenticators[0].authenticate_header(drf_request)
+        response = JsonResponse({'detail': str(e.detail)}, status=401 if header else 403)
+        if header:
+            response['WWW-Authenticate'] = header
+        return response
+    except exceptions.APIException as e:
+        return JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+
+    text = data.get('text')
+    src = data.get('src', 'auto')
+    dest = data.get('dest', 'en')
+    if not text:
+        return JsonResponse({"error": "Text parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        result = await atranslate(text, src=src, dest=dest)
+    except Exception as e:
+        data, status_code, headers = error_response(e)
+        return JsonResponse(data, status=status_code, headers=headers)
+    return JsonResponse(response_data(text, result))
+
+
+class TranslationJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                            viewsets.GenericViewSet):
+    """
+    Whole-document translations: POST starts a job for a material, GET
+    reports its progress and, once completed, the translated material in
+    "result". POST resume/ restarts a failed job from its last checkpoint.
+    """
+    serializer_class = TranslationJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return TranslationJob.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # The translation becomes a new material, so the classroom needs room for it
+        error = classroom_upload_error(request.user, serializer.validated_data['document'].classroom_id)
+        if error:
+            return error
+        job = serializer.save(user=request.user)
+        schedule_translation_job(job)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        job = self.get_object()
+        if job.status != TranslationJob.FAILED:
+            return Response({'error': 'Only failed jobs can be resumed.'}, status=status.HTTP_400_BAD_REQUEST)
+        schedule_translation_job(job)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)